@@ -47,6 +47,7 @@ from .serializers import PublicFacilitySerializer
 from .serializers import RoleSerializer
 from kolibri.core import error_constants
 from kolibri.core.logger.models import UserSessionLog
+from kolibri.core.logger.utils.user_session import has_pending_user_session
 from kolibri.core.mixins import BulkCreateMixin
 from kolibri.core.mixins import BulkDeleteMixin
 
@@ -335,7 +336,7 @@ class SessionViewSet(viewsets.ViewSet):
             # If so, they will not have any UserSessionLogs until we call get_session.
             request.session["first_login"] = not UserSessionLog.objects.filter(
                 user=user
-            ).exists()
+            ).exists() and not has_pending_user_session(user.id)
             return Response(self.get_session(request))
         elif (
             not password
@@ -0,0 +1,156 @@
+"""
+Maintenance of MembershipClosures and RoleClosures, the denormalized records of which
+collections each user is a member of, and has roles for, through the collection hierarchy.
+
+The records for a user are rebuilt whenever their Memberships or Roles change, and for
+everyone affected whenever a Collection changes. Syncing inserts facility data without
+sending signals, so the records for a whole facility dataset are rebuilt after each sync.
+Any role lookups cached for the current request are cleared whenever records are changed.
+"""
+from collections import defaultdict
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Q
+
+from .role_cache import clear_role_cache
+
+
+def _get_models(apps):
+    return (
+        apps.get_model("kolibriauth", name)
+        for name in (
+            "FacilityUser",
+            "Collection",
+            "Membership",
+            "Role",
+            "MembershipClosure",
+            "RoleClosure",
+        )
+    )
+
+
+def _get_hierarchy(Collection, users):
+    """
+    Read the hierarchy of every facility the users belong to in one query, returning maps of
+    each collection to its parent and its children, so that ancestors and descendants can be
+    found without querying for each collection.
+    """
+    parents = {}
+    children = defaultdict(list)
+    for collection_id, parent_id in Collection.objects.filter(
+        dataset_id__in=users.values("dataset_id")
+    ).values_list("id", "parent_id"):
+        parents[collection_id] = parent_id
+        if parent_id:
+            children[parent_id].append(collection_id)
+    return parents, children
+
+
+def _get_membership_closures(Membership, users, user_facilities, parents):
+    # FacilityUsers are always members of their own facility
+    memberships = set(
+        (user_id, facility_id)
+        for user_id, facility_id in user_facilities.items()
+        if facility_id in parents
+    )
+    for user_id, collection_id in Membership.objects.filter(user__in=users).values_list(
+        "user_id", "collection_id"
+    ):
+        while collection_id in parents:
+            memberships.add((user_id, collection_id))
+            collection_id = parents[collection_id]
+    return memberships
+
+
+def _get_role_closures(Role, users, parents, children):
+    roles = set()
+    for user_id, collection_id, kind in Role.objects.filter(user__in=users).values_list(
+        "user_id", "collection_id", "kind"
+    ):
+        stack = [collection_id] if collection_id in parents else []
+        while stack:
+            collection_id = stack.pop()
+            roles.add((user_id, collection_id, kind))
+            stack.extend(children[collection_id])
+    return roles
+
+
+def rebuild_closures(users, apps=django_apps):
+    """
+    Rebuild the closure records for the users in the FacilityUser queryset users.
+    The models are looked up from apps, so that this can also be used in migrations.
+    """
+    (
+        FacilityUser,
+        Collection,
+        Membership,
+        Role,
+        MembershipClosure,
+        RoleClosure,
+    ) = _get_models(apps)
+
+    user_facilities = dict(users.values_list("id", "facility_id"))
+    if not user_facilities:
+        return
+
+    parents, children = _get_hierarchy(Collection, users)
+    memberships = _get_membership_closures(Membership, users, user_facilities, parents)
+    roles = _get_role_closures(Role, users, parents, children)
+
+    with transaction.atomic():
+        MembershipClosure.objects.filter(user__in=users).delete()
+        RoleClosure.objects.filter(user__in=users).delete()
+        MembershipClosure.objects.bulk_create(
+            MembershipClosure(user_id=user_id, collection_id=collection_id)
+            for user_id, collection_id in memberships
+        )
+        RoleClosure.objects.bulk_create(
+            RoleClosure(user_id=user_id, collection_id=collection_id, kind=kind)
+            for user_id, collection_id, kind in roles
+        )
+    clear_role_cache()
+
+
+def rebuild_user_closures(user_id):
+    from .models import FacilityUser
+
+    rebuild_closures(FacilityUser.objects.filter(id=user_id))
+
+
+def rebuild_collection_closures(collection):
+    """
+    Rebuild the closure records of everyone whose memberships or roles could be affected by a change
+    to collection: anyone with a role for it or above it, or a membership of it or below it.
+    """
+    from .models import FacilityUser
+
+    rebuild_closures(
+        FacilityUser.objects.filter(
+            Q(roles__collection__in=collection.get_ancestors(include_self=True))
+            | Q(
+                memberships__collection__in=collection.get_descendants(
+                    include_self=True
+                )
+            )
+        ).distinct()
+    )
+
+
+def rebuild_dataset_closures(dataset_ids):
+    from .models import FacilityUser
+
+    rebuild_closures(FacilityUser.objects.filter(dataset_id__in=dataset_ids))
+
+
+def delete_closures(user_id=None, collection_id=None):
+    """
+    Delete the closure records for a user or collection that has been deleted.
+    """
+    from .models import MembershipClosure
+    from .models import RoleClosure
+
+    lookup = {"user_id": user_id} if user_id else {"collection_id": collection_id}
+    MembershipClosure.objects.filter(**lookup).delete()
+    RoleClosure.objects.filter(**lookup).delete()
+    clear_role_cache()
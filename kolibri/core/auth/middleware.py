@@ -1,10 +1,18 @@
+import logging
+
 from django.apps import apps
 from django.conf import settings
 from django.contrib.auth import get_user
 from django.contrib.auth.middleware import AuthenticationMiddleware
 from django.core.exceptions import ImproperlyConfigured
+from django.utils.deprecation import MiddlewareMixin
 from django.utils.functional import SimpleLazyObject
 
+from .role_cache import end_role_cache
+from .role_cache import start_role_cache
+
+logger = logging.getLogger(__name__)
+
 
 def get_anonymous_user_model():
     """
@@ -64,3 +72,23 @@ class CustomAuthenticationMiddleware(AuthenticationMiddleware):
             "'kolibri.core.auth.middleware.CustomAuthenticationMiddleware'."
         )
         request.user = SimpleLazyObject(lambda: _get_user(request))
+
+
+class RoleCacheMiddleware(MiddlewareMixin):
+    """
+    Cache the role lookups made by permission checks for the length of each request.
+    """
+
+    def process_request(self, request):
+        start_role_cache()
+
+    def process_response(self, request, response):
+        role_cache = end_role_cache()
+        if role_cache is not None:
+            logger.debug(
+                "Role lookups for %s: %d cache hits, %d cache misses",
+                request.path,
+                role_cache.hits,
+                role_cache.misses,
+            )
+        return response
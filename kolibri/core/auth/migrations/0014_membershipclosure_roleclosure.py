@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-17 07:56
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations
+from django.db import models
+
+from kolibri.core.auth.closures import rebuild_closures
+
+
+def populate_closures(apps, schema_editor):
+    FacilityUser = apps.get_model("kolibriauth", "FacilityUser")
+    rebuild_closures(FacilityUser.objects.all(), apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("kolibriauth", "0013_auto_20180917_1213")]
+
+    operations = [
+        migrations.CreateModel(
+            name="MembershipClosure",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "collection",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="kolibriauth.Collection",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RoleClosure",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("admin", "Admin"),
+                            ("coach", "Coach"),
+                            (
+                                "classroom assignable coach",
+                                "Classroom Assignable Coach",
+                            ),
+                        ],
+                        max_length=26,
+                    ),
+                ),
+                (
+                    "collection",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="kolibriauth.Collection",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name="roleclosure", unique_together=set([("user", "collection", "kind")])
+        ),
+        migrations.AlterUniqueTogether(
+            name="membershipclosure", unique_together=set([("user", "collection")])
+        ),
+        migrations.RunPython(populate_closures, migrations.RunPython.noop),
+    ]
@@ -33,6 +33,7 @@ from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import DEFERRED
 from django.db.models.query import F
 from django.db.utils import IntegrityError
 from django.utils.encoding import python_2_unicode_compatible
@@ -66,6 +67,7 @@ from .permissions.general import IsAdminForOwnFacility
 from .permissions.general import IsFromSameFacility
 from .permissions.general import IsOwn
 from .permissions.general import IsSelf
+from .role_cache import cached_role_lookup
 from kolibri.core.auth.constants.morango_scope_definitions import FULL_FACILITY
 from kolibri.core.auth.constants.morango_scope_definitions import SINGLE_USER
 from kolibri.core.errors import KolibriValidationError
@@ -74,6 +76,8 @@ from kolibri.utils.time_utils import local_now
 
 logger = logging.getLogger(__name__)
 
+SESSION_DATA_CACHE_KEY = "session_data_{user_id}"
+
 
 def _has_permissions_class(obj):
     return hasattr(obj, "permissions") and isinstance(obj.permissions, BasePermissions)
@@ -673,22 +677,32 @@ class FacilityUser(KolibriAbstractBaseUser, AbstractFacilityDataModel):
 
     @property
     def session_data(self):
-        roles = list(self.roles.values_list("kind", flat=True).distinct())
-
-        if self.is_superuser:
-            roles.insert(0, user_kinds.SUPERUSER)
-
-        if not roles:
-            roles = [user_kinds.LEARNER]
+        key = SESSION_DATA_CACHE_KEY.format(user_id=self.id)
+        session_data = cache.get(key)
+        if session_data is None:
+            roles = list(self.roles.values_list("kind", flat=True).distinct())
+
+            if self.is_superuser:
+                roles.insert(0, user_kinds.SUPERUSER)
+
+            if not roles:
+                roles = [user_kinds.LEARNER]
+
+            session_data = {
+                "username": self.username,
+                "full_name": self.full_name,
+                "user_id": self.id,
+                "kind": roles,
+                "can_manage_content": self.can_manage_content,
+                "facility_id": self.facility_id,
+            }
+            cache.set(key, session_data, 60 * 10)
+        # return a copy, as the session data is added to before it is returned to the frontend
+        return dict(session_data)
 
-        return {
-            "username": self.username,
-            "full_name": self.full_name,
-            "user_id": self.id,
-            "kind": roles,
-            "can_manage_content": self.can_manage_content,
-            "facility_id": self.facility_id,
-        }
+    @classmethod
+    def clear_session_data_cache(cls, user_id):
+        cache.delete(SESSION_DATA_CACHE_KEY.format(user_id=user_id))
 
     @property
     def can_manage_content(self):
@@ -707,51 +721,40 @@ class FacilityUser(KolibriAbstractBaseUser, AbstractFacilityDataModel):
             return False
         if coll.kind == collection_kinds.FACILITY:
             return True  # FacilityUser is always a member of her own facility
-        return (
-            HierarchyRelationsFilter(FacilityUser.objects.all())
-            .filter_by_hierarchy(target_user=F("id"), ancestor_collection=coll.id)
-            .filter(id=self.id)
-            .exists()
-        )
+        return MembershipClosure.objects.filter(user=self, collection=coll).exists()
 
+    @cached_role_lookup
     def get_roles_for_user(self, user):
         if self.is_superuser:
             # a superuser has admin role for all users on the device
             return set([role_kinds.ADMIN])
         if not hasattr(user, "dataset_id") or self.dataset_id != user.dataset_id:
             return set([])
-        role_instances = (
-            HierarchyRelationsFilter(Role)
-            .filter_by_hierarchy(
-                ancestor_collection=F("collection"),
-                source_user=F("user"),
-                target_user=user,
-            )
-            .filter(user=self)
-        )
         return set(
-            [instance["kind"] for instance in role_instances.values("kind").distinct()]
+            RoleClosure.objects.filter(
+                user=self,
+                collection_id__in=MembershipClosure.objects.filter(user=user).values(
+                    "collection_id"
+                ),
+            )
+            .values_list("kind", flat=True)
+            .distinct()
         )
 
+    @cached_role_lookup
     def get_roles_for_collection(self, coll):
         if self.is_superuser:
             # a superuser has admin role for all collections on the device
             return set([role_kinds.ADMIN])
         if self.dataset_id != coll.dataset_id:
             return set([])
-        role_instances = (
-            HierarchyRelationsFilter(Role)
-            .filter_by_hierarchy(
-                ancestor_collection=F("collection"),
-                source_user=F("user"),
-                descendant_collection=coll,
-            )
-            .filter(user=self)
-        )
         return set(
-            [instance["kind"] for instance in role_instances.values("kind").distinct()]
+            RoleClosure.objects.filter(user=self, collection=coll).values_list(
+                "kind", flat=True
+            )
         )
 
+    @cached_role_lookup
     def has_role_for_user(self, kinds, user):
         if self.is_superuser:
             if isinstance(kinds, six.string_types):
@@ -762,18 +765,17 @@ class FacilityUser(KolibriAbstractBaseUser, AbstractFacilityDataModel):
             return False
         if not hasattr(user, "dataset_id") or self.dataset_id != user.dataset_id:
             return False
-        return (
-            HierarchyRelationsFilter(Role)
-            .filter_by_hierarchy(
-                ancestor_collection=F("collection"),
-                source_user=F("user"),
-                role_kind=kinds,
-                target_user=user,
-            )
-            .filter(user=self)
-            .exists()
-        )
-
+        if isinstance(kinds, six.string_types):
+            kinds = [kinds]
+        return RoleClosure.objects.filter(
+            user=self,
+            kind__in=kinds,
+            collection_id__in=MembershipClosure.objects.filter(user=user).values(
+                "collection_id"
+            ),
+        ).exists()
+
+    @cached_role_lookup
     def has_role_for_collection(self, kinds, coll):
         if self.is_superuser:
             if isinstance(kinds, six.string_types):
@@ -784,17 +786,11 @@ class FacilityUser(KolibriAbstractBaseUser, AbstractFacilityDataModel):
             return False
         if self.dataset_id != coll.dataset_id:
             return False
-        return (
-            HierarchyRelationsFilter(Role)
-            .filter_by_hierarchy(
-                ancestor_collection=F("collection"),
-                source_user=F("user"),
-                role_kind=kinds,
-                descendant_collection=coll,
-            )
-            .filter(user=self)
-            .exists()
-        )
+        if isinstance(kinds, six.string_types):
+            kinds = [kinds]
+        return RoleClosure.objects.filter(
+            user=self, kind__in=kinds, collection=coll
+        ).exists()
 
     def can_create_instance(self, obj):
         if self.is_superuser:
@@ -843,9 +839,11 @@ class FacilityUser(KolibriAbstractBaseUser, AbstractFacilityDataModel):
         if self.is_superuser:
             return queryset
         if _has_permissions_class(queryset.model):
-            return queryset.model.permissions.readable_by_user_filter(
-                self, queryset
-            ).distinct()
+            permissions = queryset.model.permissions
+            queryset = permissions.readable_by_user_filter(self, queryset)
+            if permissions.readable_filter_needs_distinct:
+                queryset = queryset.distinct()
+            return queryset
         else:
             return queryset.none()
 
@@ -904,6 +902,8 @@ class Collection(MorangoMPTTModel, AbstractFacilityDataModel):
         if self._KIND:
             kwargs["kind"] = self._KIND
         super(Collection, self).__init__(*args, **kwargs)
+        # the parent when loaded, so that the closures can be rebuilt when it changes
+        self._original_parent_id = self.__dict__.get("parent_id", DEFERRED)
 
     def calculate_partition(self):
         return "{dataset_id}:allusers-ro".format(dataset_id=self.dataset_id)
@@ -915,6 +915,7 @@ class Collection(MorangoMPTTModel, AbstractFacilityDataModel):
     def save(self, *args, **kwargs):
         self._ensure_kind()
         super(Collection, self).save(*args, **kwargs)
+        self._original_parent_id = self.parent_id
 
     def _ensure_kind(self):
         """
@@ -928,8 +929,8 @@ class Collection(MorangoMPTTModel, AbstractFacilityDataModel):
             return FacilityUser.objects.filter(
                 dataset=self.dataset
             )  # FacilityUser is always a member of her own facility
-        return HierarchyRelationsFilter(FacilityUser).filter_by_hierarchy(
-            target_user=F("id"), ancestor_collection=self
+        return FacilityUser.objects.filter(
+            id__in=MembershipClosure.objects.filter(collection=self).values("user_id")
         )
 
     def get_coaches(self):
@@ -1183,6 +1184,53 @@ class Role(AbstractFacilityDataModel):
         )
 
 
+class MembershipClosure(models.Model):
+    """
+    Records that a ``FacilityUser`` is a member of a ``Collection``, whether through a ``Membership`` of that
+    ``Collection``, of a ``Collection`` below it in the tree, or, for a ``Facility``, by belonging to it.
+    These are derived from ``Memberships``, and maintained by the functions in ``kolibri.core.auth.closures``,
+    so that checking membership is an indexed lookup, rather than a join through the collection hierarchy.
+    They are not synced, as each device derives its own.
+    """
+
+    # The users and collections are not constrained in the database, as their rows may be
+    # rebuilt while the users and collections they refer to are being deleted.
+    user = models.ForeignKey(
+        "FacilityUser",
+        related_name="+",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+    )
+    collection = models.ForeignKey(
+        "Collection", related_name="+", db_constraint=False, on_delete=models.DO_NOTHING
+    )
+
+    class Meta:
+        unique_together = (("user", "collection"),)
+
+
+class RoleClosure(models.Model):
+    """
+    Records that a ``FacilityUser`` has a kind of role for a ``Collection``, whether through a ``Role`` for that
+    ``Collection``, or for a ``Collection`` above it in the tree.
+    These are derived from ``Roles``, and maintained by the functions in ``kolibri.core.auth.closures``.
+    """
+
+    user = models.ForeignKey(
+        "FacilityUser",
+        related_name="+",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+    )
+    collection = models.ForeignKey(
+        "Collection", related_name="+", db_constraint=False, on_delete=models.DO_NOTHING
+    )
+    kind = models.CharField(max_length=26, choices=role_kinds.choices)
+
+    class Meta:
+        unique_together = (("user", "collection", "kind"),)
+
+
 class CollectionProxyManager(MorangoMPTTTreeManager):
     def get_queryset(self):
         return (
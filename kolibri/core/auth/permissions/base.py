@@ -1,9 +1,6 @@
 """
 This module defines the base classes for Kolibri's class-based Permissions system.
 """
-from django.db.models import F
-
-
 ####################################################################################################################
 # This section contains base classes that can be inherited and extended to define more complex permissions behavior.
 ####################################################################################################################
@@ -26,6 +23,10 @@ class BasePermissions(object):
 
     """
 
+    # Whether the querysets returned by `readable_by_user_filter` can contain an object more than once,
+    # and so must be made distinct. Classes that only ever filter on fields of the model itself can set this to False.
+    readable_filter_needs_distinct = True
+
     def user_can_create_object(self, user, obj):
         """Returns True if this permission class grants <user> permission to create the provided <obj>.
         Note that the object may not yet have been saved to the database (as this may be a pre-save check)."""
@@ -156,28 +157,34 @@ class RoleBasedPermissions(BasePermissions):
 
         # import here to prevent circular dependencies
         from ..models import Collection
-        from ..filters import HierarchyRelationsFilter
+        from ..models import MembershipClosure
+        from ..models import RoleClosure
 
         if user.is_anonymous():
             return queryset.none()
 
-        query = {"source_user": user, "role_kind": self.can_be_read_by}
+        # the collections the user has a role for that lets them read the objects
+        collection_ids = RoleClosure.objects.filter(
+            user=user, kind__in=self.can_be_read_by
+        ).values("collection_id")
 
         if self.target_field == ".":
-            if issubclass(queryset.model, Collection):
-                query["descendant_collection"] = F("id")
-            else:
-                query["target_user"] = F("id")
+            target_field = "id"
+            related_model = queryset.model
         else:
+            target_field = self.target_field
             related_model = queryset.model._meta.get_field(
                 self.target_field
             ).remote_field.model
-            if issubclass(related_model, Collection):
-                query["descendant_collection"] = F(self.target_field)
-            else:
-                query["target_user"] = F(self.target_field)
 
-        return HierarchyRelationsFilter(queryset).filter_by_hierarchy(**query)
+        if issubclass(related_model, Collection):
+            target_ids = collection_ids
+        else:
+            target_ids = MembershipClosure.objects.filter(
+                collection_id__in=collection_ids
+            ).values("user_id")
+
+        return queryset.filter(**{target_field + "__in": target_ids})
 
 
 ####################################################################################################################
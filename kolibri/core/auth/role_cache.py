@@ -0,0 +1,86 @@
+"""
+A cache of the answers to role lookups on FacilityUsers, kept for the length of a single
+request, as permission checks for the objects in a list ask the same questions many times.
+
+The cache is only active between ``start_role_cache`` and ``end_role_cache``, which the
+``RoleCacheMiddleware`` calls around each request, and is cleared whenever the records that
+roles are looked up from change. Counts of cache hits and misses are kept for profiling.
+"""
+import threading
+from functools import wraps
+
+import six
+
+_local = threading.local()
+
+
+class RoleCache(object):
+    def __init__(self):
+        self.decisions = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.decisions.clear()
+
+
+def start_role_cache():
+    _local.role_cache = RoleCache()
+    return _local.role_cache
+
+
+def end_role_cache():
+    """
+    Stop caching role lookups on this thread, returning the cache, so that its counts can be read.
+    """
+    role_cache = get_role_cache()
+    _local.role_cache = None
+    return role_cache
+
+
+def get_role_cache():
+    return getattr(_local, "role_cache", None)
+
+
+def clear_role_cache():
+    role_cache = get_role_cache()
+    if role_cache is not None:
+        role_cache.clear()
+
+
+def _get_key_part(arg):
+    if isinstance(arg, six.string_types):
+        return arg
+    if hasattr(arg, "_meta"):
+        return (arg._meta.label, arg.pk)
+    if hasattr(arg, "__iter__"):
+        return frozenset(arg)
+    # anonymous users have neither an id nor any roles to look up
+    return arg.__class__
+
+
+def cached_role_lookup(method):
+    """
+    Decorate a role lookup method of a user, so that within a request the lookup
+    for a given user and set of arguments is only made once.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args):
+        role_cache = get_role_cache()
+        if role_cache is None or any(
+            hasattr(arg, "_meta") and arg.pk is None for arg in args
+        ):
+            # unsaved objects cannot be told apart, so their lookups are never cached
+            return method(self, *args)
+        key = (method.__name__, self.pk) + tuple(_get_key_part(arg) for arg in args)
+        try:
+            result = role_cache.decisions[key]
+            role_cache.hits += 1
+        except KeyError:
+            result = role_cache.decisions[key] = method(self, *args)
+            role_cache.misses += 1
+        # return copies of sets of roles, so that callers cannot change the cached sets
+        return set(result) if isinstance(result, set) else result
+
+    return wrapper
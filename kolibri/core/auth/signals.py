@@ -1,8 +1,22 @@
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
+from morango.models import TransferSession
 
+from .closures import delete_closures
+from .closures import rebuild_collection_closures
+from .closures import rebuild_dataset_closures
+from .closures import rebuild_user_closures
+from .models import Classroom
+from .models import Collection
+from .models import Facility
 from .models import FacilityUser
+from .models import LearnerGroup
 from .models import Membership
+from .models import Role
 from kolibri.core.notifications.models import LearnerProgressNotification
 
 
@@ -24,3 +38,80 @@ def cascade_delete_user(sender, instance=None, *args, **kwargs):
     objects whose user is the instance's user.
     """
     LearnerProgressNotification.objects.filter(user_id=instance.id).delete()
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def update_user_closures(sender, instance=None, *args, **kwargs):
+    """
+    Rebuild the membership and role closures of the user of a changed Membership or Role.
+    """
+    rebuild_user_closures(instance.user_id)
+
+
+@receiver(post_save, sender=FacilityUser)
+def create_user_closures(sender, instance=None, created=False, *args, **kwargs):
+    if created:
+        rebuild_user_closures(instance.id)
+
+
+@receiver(post_delete, sender=FacilityUser)
+def delete_user_closures(sender, instance=None, *args, **kwargs):
+    delete_closures(user_id=instance.id)
+
+
+def update_collection_closures(sender, instance=None, created=False, *args, **kwargs):
+    """
+    Give the users with roles for the collections above a new or moved collection those roles for it too,
+    and when it is moved, take away those of the users with roles for the collections it was under.
+    """
+    old_parent_id = instance._original_parent_id
+    if created:
+        rebuild_collection_closures(instance)
+    elif old_parent_id is not DEFERRED and old_parent_id != instance.parent_id:
+        rebuild_collection_closures(instance)
+        if old_parent_id is not None:
+            rebuild_collection_closures(Collection.objects.get(id=old_parent_id))
+
+
+def delete_collection_closures(sender, instance=None, *args, **kwargs):
+    delete_closures(collection_id=instance.id)
+
+
+# Collections are saved and deleted through their proxy models, which send signals
+# with themselves as the sender, so connect the receivers to each of them.
+for collection_model in (Collection, Facility, Classroom, LearnerGroup):
+    post_save.connect(update_collection_closures, sender=collection_model)
+    post_delete.connect(delete_collection_closures, sender=collection_model)
+
+
+@receiver(post_save, sender=TransferSession)
+def update_synced_closures(sender, instance=None, *args, **kwargs):
+    """
+    Syncing saves facility data without sending signals for each model, so rebuild
+    the closures for the facilities synced, once a transfer that received data is closed.
+    """
+    if instance.active:
+        return
+    if instance.push != instance.sync_session.is_server:
+        return
+    # The filter is made up of prefixes of partitions, which all start with a dataset id
+    dataset_ids = set(
+        partition[:32] for partition in instance.filter.split() if partition
+    )
+    transaction.on_commit(lambda: rebuild_dataset_closures(dataset_ids))
+
+
+@receiver(post_save, sender=FacilityUser)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender="device.DevicePermissions")
+@receiver(post_delete, sender="device.DevicePermissions")
+def clear_session_data(sender, instance=None, *args, **kwargs):
+    """
+    Clear the cached session data of a user, when anything it is made from changes.
+    """
+    user_id = instance.id if isinstance(instance, FacilityUser) else instance.user_id
+    FacilityUser.clear_session_data_cache(user_id)
@@ -14,6 +14,7 @@ from rest_framework.test import APITestCase as BaseTestCase
 
 from .. import models
 from ..constants import role_kinds
+from ..constants import user_kinds
 from .helpers import create_superuser
 from .helpers import DUMMY_PASSWORD
 from .helpers import provision_device
@@ -605,6 +606,15 @@ class LoginLogoutTestCase(APITestCase):
         new_expire_date = self.client.session.get_expiry_date()
         self.assertTrue(expire_date < new_expire_date)
 
+    def test_session_kind_updated_when_role_added(self):
+        self.client.login(
+            username=self.user.username, password=DUMMY_PASSWORD, facility=self.facility
+        )
+        url = reverse("kolibri:core:session-detail", kwargs={"pk": "current"})
+        self.assertEqual(self.client.get(url).data["kind"], [user_kinds.LEARNER])
+        self.cr.add_coach(self.user)
+        self.assertEqual(self.client.get(url).data["kind"], [role_kinds.COACH])
+
 
 class AnonSignUpTestCase(APITestCase):
     def setUp(self):
@@ -6,10 +6,14 @@ from django.core.exceptions import ImproperlyConfigured
 from django.test import override_settings
 from django.test import TestCase
 
+from ..constants import role_kinds
 from ..middleware import _get_user
 from ..middleware import CustomAuthenticationMiddleware
 from ..middleware import get_anonymous_user_model
+from ..middleware import RoleCacheMiddleware
 from ..models import KolibriAnonymousUser
+from ..role_cache import get_role_cache
+from .helpers import create_dummy_facility_data
 
 
 class DummyRequestObject(object):
@@ -60,3 +64,46 @@ class AuthMiddlewareTestCase(TestCase):
             ImproperlyConfigured, "that does not exist in the app"
         ):
             get_anonymous_user_model()
+
+
+class RoleCacheMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.data = create_dummy_facility_data()
+        self.coach = self.data["classroom_coaches"][0]
+        self.classroom = self.data["classrooms"][0]
+        self.learner = self.data["learners_one_group"][0][0]
+        self.middleware = RoleCacheMiddleware()
+        self.request = DummyRequestObject()
+        self.request.path = "/"
+        self.middleware.process_request(self.request)
+        self.addCleanup(self.middleware.process_response, self.request, None)
+
+    def test_repeated_lookups_are_cached(self):
+        # the first lookup checks whether the coach is a superuser, then looks up the role
+        with self.assertNumQueries(2):
+            for i in range(5):
+                self.assertTrue(
+                    self.coach.has_role_for_user([role_kinds.COACH], self.learner)
+                )
+        role_cache = get_role_cache()
+        self.assertEqual(role_cache.misses, 1)
+        self.assertEqual(role_cache.hits, 4)
+
+    def test_cache_cleared_on_role_change(self):
+        self.assertTrue(
+            self.coach.has_role_for_collection(role_kinds.COACH, self.classroom)
+        )
+        self.classroom.remove_coach(self.coach)
+        self.assertFalse(
+            self.coach.has_role_for_collection(role_kinds.COACH, self.classroom)
+        )
+
+    def test_cached_roles_cannot_be_changed(self):
+        self.coach.get_roles_for_collection(self.classroom).add(role_kinds.ADMIN)
+        self.assertNotIn(
+            role_kinds.ADMIN, self.coach.get_roles_for_collection(self.classroom)
+        )
+
+    def test_cache_ends_with_request(self):
+        self.middleware.process_response(self.request, None)
+        self.assertIsNone(get_role_cache())
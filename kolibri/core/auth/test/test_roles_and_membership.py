@@ -5,14 +5,23 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import uuid
+
 from django.test import TestCase
+from django.test import TransactionTestCase
+from django.utils import timezone
+from morango.models import SyncSession
+from morango.models import TransferSession
 
+from ..closures import rebuild_dataset_closures
 from ..constants import role_kinds
 from ..models import Classroom
 from ..models import Facility
 from ..models import FacilityUser
 from ..models import KolibriAnonymousUser
 from ..models import LearnerGroup
+from ..models import MembershipClosure
+from ..models import RoleClosure
 from .helpers import create_dummy_facility_data
 from .helpers import create_superuser
 
@@ -264,3 +273,120 @@ class AnonymousUserRolesTestCase(TestCase):
         for user in self.data["all_users"]:
             if not user.is_superuser:
                 self.assertEqual(len(user.get_roles_for(self.anon_user)), 0)
+
+
+class ClosureMaintenanceTestCase(TestCase):
+    def setUp(self):
+        self.data = create_dummy_facility_data()
+        self.classroom = self.data["classrooms"][0]
+        self.coach = self.data["classroom_coaches"][0]
+        self.learner = FacilityUser.objects.create(
+            username="newlearner", password="***", facility=self.data["facility"]
+        )
+
+    def _membership_ids(self, user):
+        return set(
+            MembershipClosure.objects.filter(user=user).values_list(
+                "collection_id", flat=True
+            )
+        )
+
+    def test_new_user_is_member_of_facility_only(self):
+        self.assertEqual(self._membership_ids(self.learner), {self.data["facility"].id})
+
+    def test_membership_added_and_removed(self):
+        group = self.data["learnergroups"][0][0]
+        group.add_learner(self.learner)
+        self.assertEqual(
+            self._membership_ids(self.learner),
+            {self.data["facility"].id, self.classroom.id, group.id},
+        )
+        self.assertTrue(self.coach.has_role_for(role_kinds.COACH, self.learner))
+        group.remove_learner(self.learner)
+        self.assertFalse(self.learner.is_member_of(group))
+        self.assertFalse(self.coach.has_role_for(role_kinds.COACH, self.learner))
+
+    def test_new_group_in_coached_classroom(self):
+        group = LearnerGroup.objects.create(parent=self.classroom)
+        self.assertTrue(self.coach.has_role_for(role_kinds.COACH, group))
+        self.assertTrue(
+            self.data["facility_admin"].has_role_for(role_kinds.ADMIN, group)
+        )
+
+    def test_group_moved_to_another_classroom(self):
+        group = self.data["learnergroups"][0][0]
+        group.add_learner(self.learner)
+        other_classroom = self.data["classrooms"][1]
+        other_coach = self.data["classroom_coaches"][1]
+        group = LearnerGroup.objects.get(id=group.id)
+        group.parent = other_classroom
+        group.save()
+        self.assertEqual(
+            self._membership_ids(self.learner),
+            {self.data["facility"].id, other_classroom.id, group.id},
+        )
+        self.assertFalse(self.coach.has_role_for(role_kinds.COACH, group))
+        self.assertFalse(self.coach.has_role_for(role_kinds.COACH, self.learner))
+        self.assertTrue(other_coach.has_role_for(role_kinds.COACH, group))
+        self.assertTrue(other_coach.has_role_for(role_kinds.COACH, self.learner))
+
+    def test_role_removed(self):
+        self.classroom.remove_coach(self.coach)
+        self.assertFalse(
+            RoleClosure.objects.filter(user=self.coach, kind=role_kinds.COACH).exists()
+        )
+        self.assertFalse(self.coach.has_role_for(role_kinds.COACH, self.classroom))
+
+    def test_collection_deleted(self):
+        ids = [self.classroom.id] + [
+            group.id for group in self.data["learnergroups"][0]
+        ]
+        self.classroom.delete()
+        self.assertFalse(
+            MembershipClosure.objects.filter(collection_id__in=ids).exists()
+        )
+        self.assertFalse(RoleClosure.objects.filter(collection_id__in=ids).exists())
+
+    def test_user_deleted(self):
+        learner = self.data["learners_one_group"][0][0]
+        learner.delete()
+        self.assertFalse(MembershipClosure.objects.filter(user_id=learner.id).exists())
+
+    def test_rebuild_for_records_saved_without_signals(self):
+        group = self.data["learnergroups"][0][0]
+        group.add_learner(self.learner)
+        self.classroom.add_coach(self.learner)
+        # as if the memberships and roles had been synced without sending signals
+        MembershipClosure.objects.filter(user=self.learner).delete()
+        RoleClosure.objects.filter(user=self.learner).delete()
+        self.assertFalse(self.learner.is_member_of(group))
+        rebuild_dataset_closures([self.data["dataset"].id])
+        self.assertTrue(self.learner.is_member_of(group))
+        self.assertTrue(self.learner.has_role_for(role_kinds.COACH, group))
+
+
+class SyncClosureTestCase(TransactionTestCase):
+    def test_closures_rebuilt_after_pull(self):
+        data = create_dummy_facility_data()
+        learner = data["learners_one_group"][0][0]
+        classroom = data["classrooms"][1]
+        classroom.add_member(learner)
+        MembershipClosure.objects.filter(user=learner).delete()
+        sync_session = SyncSession.objects.create(
+            id=uuid.uuid4().hex,
+            last_activity_timestamp=timezone.now(),
+            profile="facilitydata",
+            connection_kind="network",
+            connection_path="http://127.0.0.1:8000",
+        )
+        transfer_session = TransferSession.objects.create(
+            id=uuid.uuid4().hex,
+            filter=data["dataset"].id,
+            push=False,
+            sync_session=sync_session,
+            last_activity_timestamp=timezone.now(),
+        )
+        self.assertFalse(learner.is_member_of(classroom))
+        transfer_session.active = False
+        transfer_session.save()
+        self.assertTrue(learner.is_member_of(classroom))
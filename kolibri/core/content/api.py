@@ -40,6 +40,12 @@ from kolibri.core.content.utils.content_types_tools import (
 )
 from kolibri.core.content.utils.paths import get_channel_lookup_url
 from kolibri.core.content.utils.paths import get_info_url
+from kolibri.core.content.utils.search import filter_by_search_index
+from kolibri.core.content.utils.search import get_search_tiers
+from kolibri.core.content.utils.search import get_search_tokens
+from kolibri.core.content.utils.search import search_content_nodes
+from kolibri.core.content.utils.search import search_content_nodes_by_tokens
+from kolibri.core.content.utils.search import search_index_exists
 from kolibri.core.content.utils.stopwords import stopwords_set
 from kolibri.core.decorators import query_params_required
 from kolibri.core.logger.models import ContentSessionLog
@@ -673,22 +679,90 @@ def union(queries):
     return None
 
 
-@query_params_required(search=str, max_results=int, max_results__default=30)
+@query_params_required(
+    search=str,
+    max_results=int,
+    max_results__default=30,
+    fuzzy=bool,
+    fuzzy__default=False,
+)
 class ContentNodeSearchViewset(ContentNodeSlimViewset):
-    def list(self, request, **kwargs):
+    def search_index(self, tiers, tokens, max_results):
         """
-        Implement various filtering strategies in order to get a wide range of search results.
+        Use the full text search index, and the fuzzy search tokens if any are passed,
+        to find matching nodes, and build the facets from the same results.
         """
+        use_index = bool(tiers) and search_index_exists()
+        # A single index query returns all the available matching nodes in order of relevance
+        matches = search_content_nodes(tiers) if use_index else []
+
+        if tokens:
+            # Misspelling tolerant matches rank after all exact matches
+            matched_ids = set(match["id"] for match in matches)
+            matches += [
+                match
+                for match in search_content_nodes_by_tokens(tokens)
+                if match["id"] not in matched_ids
+            ]
 
-        value = self.kwargs["search"]
-        MAX_RESULTS = self.kwargs["max_results"]
+        queryset = self.get_queryset(prefetch=False)
+
+        if set(self.request.query_params.keys()).intersection(
+            ContentNodeFilter.base_filters
+        ):
+            # Only return results that also satisfy the requested filters
+            filtered_queryset = self.filter_queryset(queryset)
+            filtered_ids = set()
+            if use_index:
+                filtered_ids.update(
+                    filter_by_search_index(filtered_queryset, tiers).values_list(
+                        "id", flat=True
+                    )
+                )
+            if tokens:
+                filtered_ids.update(
+                    filtered_queryset.filter(
+                        search_tokens__token__in=tokens
+                    ).values_list("id", flat=True)
+                )
+            filtered_matches = [
+                match for match in matches if match["id"] in filtered_ids
+            ]
+        else:
+            filtered_matches = matches
 
+        result_ids = []
+        content_ids = set()
+
+        for match in filtered_matches:
+            # filter the dupes
+            if match["content_id"] in content_ids:
+                continue
+            content_ids.add(match["content_id"])
+            if len(result_ids) < max_results:
+                result_ids.append(match["id"])
+
+        nodes = {
+            node.id: node
+            for node in self.prefetch_related(queryset.filter(id__in=result_ids))
+        }
+        results = [nodes[node_id] for node_id in result_ids if node_id in nodes]
+
+        # Use unfiltered matches to collect channel_ids and kinds metadata.
+        return {
+            "channel_ids": sorted(set(match["channel_id"] for match in matches)),
+            "content_kinds": sorted(set(match["kind"] for match in matches)),
+            "results": self.get_serializer(results, many=True).data,
+            "total_results": len(content_ids),
+        }
+
+    def search_queryset(self, all_words, critical_words, max_results):
+        """
+        Implement various filtering strategies in order to get a wide range of search results.
+        Used when the full text search index is not available.
+        """
         queryset = self.filter_queryset(self.get_queryset())
 
-        # all words with punctuation removed
-        all_words = [w for w in re.split('[?.,!";: ]', value) if w]
-        # words in all_words that are not stopwords
-        critical_words = [w for w in all_words if w not in stopwords_set]
         # queries ordered by relevance priority
         all_queries = [
             # all words in title
@@ -712,7 +786,7 @@ class ContentNodeSearchViewset(ContentNodeSlimViewset):
 
         results = []
         content_ids = set()
-        BUFFER_SIZE = MAX_RESULTS * 2  # grab some extras, but not too many
+        BUFFER_SIZE = max_results * 2  # grab some extras, but not too many
 
         # iterate over each query type, and build up search results
         for query in all_queries:
@@ -731,10 +805,10 @@ class ContentNodeSearchViewset(ContentNodeSlimViewset):
                 results.append(match)
 
                 # bail out as soon as we reach the quota
-                if len(results) >= MAX_RESULTS:
+                if len(results) >= max_results:
                     break
             # bail out as soon as we reach the quota
-            if len(results) >= MAX_RESULTS:
+            if len(results) >= max_results:
                 break
 
         # If no queries, just use an empty Q.
@@ -764,15 +838,32 @@ class ContentNodeSearchViewset(ContentNodeSlimViewset):
             .distinct()
         )
 
-        serializer = self.get_serializer(results, many=True)
-        return Response(
-            {
-                "channel_ids": channel_ids,
-                "content_kinds": content_kinds,
-                "results": serializer.data,
-                "total_results": total_results,
-            }
-        )
+        return {
+            "channel_ids": channel_ids,
+            "content_kinds": content_kinds,
+            "results": self.get_serializer(results, many=True).data,
+            "total_results": total_results,
+        }
+
+    def list(self, request, **kwargs):
+        value = self.kwargs["search"]
+        MAX_RESULTS = self.kwargs["max_results"]
+
+        # all words with punctuation removed
+        all_words = [w for w in re.split('[?.,!";: ]', value) if w]
+        # words in all_words that are not stopwords
+        critical_words = [w for w in all_words if w not in stopwords_set]
+
+        tiers = get_search_tiers(all_words, critical_words)
+
+        tokens = get_search_tokens(" ".join(all_words)) if self.kwargs["fuzzy"] else []
+
+        if (tiers and search_index_exists()) or tokens:
+            data = self.search_index(tiers, tokens, MAX_RESULTS)
+        else:
+            data = self.search_queryset(all_words, critical_words, MAX_RESULTS)
+
+        return Response(data)
 
 
 class ContentNodeGranularViewset(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
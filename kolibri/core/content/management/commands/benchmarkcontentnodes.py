@@ -0,0 +1,90 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.test.client import RequestFactory
+
+from kolibri.core.auth.models import KolibriAnonymousUser
+from kolibri.core.content.models import ContentNode
+from kolibri.core.content.serializers import ContentNodeSerializer
+
+
+class Command(BaseCommand):
+    """
+    Measures how many available ContentNodes per second the content node API serializes,
+    both node by node through the nested serializers, and with the serialization of whole lists.
+    Output example:
+
+    Serializing 100 nodes, 10 times
+    * Nested serializers:            (rate) nodes/s
+    * List serialization:            (rate) nodes/s
+    * Speed up:                      (ratio)x
+    """
+
+    help = "Measures how many content nodes per second are serialized for the content node API"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--channel_id",
+            type=str,
+            default=None,
+            help="Only serialize nodes from this channel",
+        )
+        parser.add_argument(
+            "--nodes", type=int, default=100, help="How many nodes to serialize"
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=10,
+            help="How many times to serialize the nodes",
+        )
+
+    def handle(self, *args, **options):
+        queryset = ContentNode.objects.filter(available=True)
+        if options["channel_id"]:
+            queryset = queryset.filter(channel_id=options["channel_id"])
+        node_ids = list(queryset.values_list("id", flat=True)[: options["nodes"]])
+        if not node_ids:
+            raise CommandError("There are no available content nodes to serialize")
+
+        # the same queryset as the content node API lists
+        nodes = (
+            queryset.filter(id__in=node_ids)
+            .prefetch_related("assessmentmetadata", "files", "files__local_file")
+            .select_related("lang")
+        )
+        request = RequestFactory().get("/")
+        request.user = KolibriAnonymousUser()
+        context = {"request": request}
+
+        def serialize_nested():
+            # serializing a list of instances falls back to serializing node by node
+            return ContentNodeSerializer(
+                list(nodes.all()), many=True, context=context
+            ).data
+
+        def serialize_list():
+            return ContentNodeSerializer(nodes.all(), many=True, context=context).data
+
+        self.stdout.write(
+            "Serializing {nodes} nodes, {iterations} times".format(
+                nodes=len(node_ids), iterations=options["iterations"]
+            )
+        )
+        nested_rate = self.measure(serialize_nested, len(node_ids), options)
+        list_rate = self.measure(serialize_list, len(node_ids), options)
+        self.write_line("Nested serializers", "{:.0f} nodes/s".format(nested_rate))
+        self.write_line("List serialization", "{:.0f} nodes/s".format(list_rate))
+        self.write_line("Speed up", "{:.1f}x".format(list_rate / nested_rate))
+
+    def measure(self, serialize, node_count, options):
+        # serialize once first, so that one-off costs, such as url resolver setup, are not measured
+        serialize()
+        start = time.time()
+        for _ in range(options["iterations"]):
+            serialize()
+        return node_count * options["iterations"] / (time.time() - start)
+
+    def write_line(self, parameter, value):
+        self.stdout.write("* {:32}{}".format("{}:".format(parameter), value))
@@ -5,6 +5,7 @@ from ...utils import import_export_content
 from ...utils import paths
 from ...utils import transfer
 from kolibri.core.content.errors import InvalidStorageFilenameError
+from kolibri.core.content.utils.drive_manifest import clear_drive_file_manifest_cache
 from kolibri.core.tasks.management.commands.base import AsyncCommand
 
 logger = logging.getLogger(__name__)
@@ -64,6 +65,13 @@ class Command(AsyncCommand):
             channel_id, node_ids, exclude_node_ids, True
         )
 
+        try:
+            self.export_files(files, total_bytes_to_transfer, data_dir)
+        finally:
+            # Files have been written to the drive, so its cached manifest of files is out of date
+            clear_drive_file_manifest_cache()
+
+    def export_files(self, files, total_bytes_to_transfer, data_dir):
         exported_files = []
 
         with self.start_progress(
@@ -19,10 +19,10 @@ DOWNLOAD_METHOD = "download"
 COPY_METHOD = "copy"
 
 
-def import_channel_by_id(channel_id, cancel_check):
+def import_channel_by_id(channel_id, cancel_check, progress_update=None):
     try:
         channel_import.import_channel_from_local_db(
-            channel_id, cancel_check=cancel_check
+            channel_id, cancel_check=cancel_check, progress_update=progress_update
         )
     except channel_import.InvalidSchemaVersionError:
         raise CommandError(
@@ -131,7 +131,9 @@ class Command(AsyncCommand):
                         )
                 else:
                     try:
-                        import_channel_by_id(channel_id, self.is_cancelled)
+                        import_channel_by_id(
+                            channel_id, self.is_cancelled, progress_update
+                        )
                     except channel_import.ImportCancelError:
                         # This will only occur if is_cancelled is True.
                         pass
@@ -1,9 +1,16 @@
 import logging
 import os
+import threading
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from functools import partial
+from itertools import islice
 from time import sleep
 
 import requests
 from django.core.management.base import CommandError
+from requests.adapters import HTTPAdapter
 
 from ...utils import annotation
 from ...utils import import_export_content
@@ -23,6 +30,31 @@ FILE_TRANSFERRED = 2
 FILE_SKIPPED = 1
 FILE_NOT_TRANSFERRED = 0
 
+# How often, in seconds, to report progress and check for cancellation
+# while files are being downloaded in parallel
+PROGRESS_POLL_INTERVAL = 0.5
+
+
+class TransferProgress(object):
+    """
+    Thread safe accumulator for the number of bytes transferred by worker threads,
+    so that progress is only ever reported from the thread running the command.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.increment = 0
+
+    def add(self, increment):
+        with self.lock:
+            self.increment += increment
+
+    def pop(self):
+        with self.lock:
+            increment = self.increment
+            self.increment = 0
+        return increment
+
 
 class Command(AsyncCommand):
     def add_arguments(self, parser):
@@ -146,159 +178,311 @@ class Command(AsyncCommand):
             renderable_only=renderable_only,
         )
 
-    # fmt: off
-    # HACK - turning off auto-formatting because the method is too complex. Should be refactored!
-    def _transfer(self, method, channel_id, path=None, node_ids=None, exclude_node_ids=None, baseurl=None, renderable_only=True):  # noqa: max-complexity=16
+    def _transfer(
+        self,
+        method,
+        channel_id,
+        path=None,
+        node_ids=None,
+        exclude_node_ids=None,
+        baseurl=None,
+        renderable_only=True,
+    ):
 
         files_to_download, total_bytes_to_transfer = import_export_content.get_files_to_transfer(
-            channel_id, node_ids, exclude_node_ids, False, renderable_only=renderable_only)
-
-        number_of_skipped_files = 0
-        file_checksums_to_annotate = []
-
-        with self.start_progress(total=total_bytes_to_transfer) as overall_progress_update:
-            exception = None  # Exception that is not caught by the retry logic
-
-            if method == DOWNLOAD_METHOD:
-                session = requests.Session()
-
-            for f in files_to_download:
+            channel_id,
+            node_ids,
+            exclude_node_ids,
+            False,
+            renderable_only=renderable_only,
+        )
 
-                if self.is_cancelled():
-                    break
+        num_threads = conf.OPTIONS["Deployment"]["CONTENT_DOWNLOAD_THREADS"]
 
-                filename = f.get_filename()
-                try:
-                    dest = paths.get_content_storage_file_path(filename)
-                except InvalidStorageFilenameError:
-                    # If the destination file name is malformed, just stop now.
-                    overall_progress_update(f.file_size)
-                    continue
-
-                # if the file already exists, add its size to our overall progress, and skip
-                if os.path.isfile(dest) and os.path.getsize(dest) == f.file_size:
-                    overall_progress_update(f.file_size)
-                    file_checksums_to_annotate.append(f.id)
-                    continue
-
-                # determine where we're downloading/copying from, and create appropriate transfer object
-                if method == DOWNLOAD_METHOD:
-                    url = paths.get_content_storage_remote_url(filename, baseurl=baseurl)
-                    filetransfer = transfer.FileDownload(url, dest, session=session)
-                elif method == COPY_METHOD:
-                    try:
-                        srcpath = paths.get_content_storage_file_path(filename, datafolder=path)
-                    except InvalidStorageFilenameError:
-                        # If the source file name is malformed, just stop now.
-                        overall_progress_update(f.file_size)
-                        continue
-                    filetransfer = transfer.FileCopy(srcpath, dest)
-
-                finished = False
-                try:
-                    while not finished:
-                        finished, status = self._start_file_transfer(
-                            f, filetransfer, overall_progress_update)
-
-                        if self.is_cancelled():
-                            break
-
-                        if status == FILE_TRANSFERRED:
-                            file_checksums_to_annotate.append(f.id)
-                        elif status == FILE_SKIPPED:
-                            number_of_skipped_files += 1
-                except Exception as e:
-                    exception = e
-                    break
+        with self.start_progress(
+            total=total_bytes_to_transfer
+        ) as overall_progress_update:
+            # exception is one that is not caught by the retry logic
+            if method == DOWNLOAD_METHOD and num_threads > 1:
+                file_checksums_to_annotate, number_of_skipped_files, exception = self._download_in_parallel(
+                    files_to_download, overall_progress_update, baseurl, num_threads
+                )
+            else:
+                file_checksums_to_annotate, number_of_skipped_files, exception = self._transfer_sequentially(
+                    method, files_to_download, overall_progress_update, path, baseurl
+                )
 
             annotation.annotate_content(channel_id, file_checksums_to_annotate)
 
             if number_of_skipped_files > 0:
                 logger.warning(
                     "{} files are skipped, because errors occurred during the import.".format(
-                        number_of_skipped_files))
+                        number_of_skipped_files
+                    )
+                )
 
             if exception:
                 raise exception
 
             if self.is_cancelled():
                 self.cancel()
-    # fmt: on
 
-    def _start_file_transfer(self, f, filetransfer, overall_progress_update):
+    def _get_files_to_transfer(
+        self, files_to_download, overall_progress_update, file_checksums_to_annotate
+    ):
         """
-        Start to transfer the file from network/disk to the destination.
-        Return value:
-            * True, FILE_TRANSFERRED - successfully transfer the file.
-            * True, FILE_SKIPPED - the file does not exist so it is skipped.
-            * True, FILE_NOT_TRANSFERRED - the transfer is cancelled.
-            * False, FILE_NOT_TRANSFERRED - the transfer fails and needs to retry.
+        Generate (file, filename, destination path) tuples for the files that need to be transferred,
+        accounting for the progress of the files that do not, and stopping if the import is cancelled.
+        """
+        for f in files_to_download:
+
+            if self.is_cancelled():
+                break
+
+            filename = f.get_filename()
+            try:
+                dest = paths.get_content_storage_file_path(filename)
+            except InvalidStorageFilenameError:
+                # If the destination file name is malformed, just stop now.
+                overall_progress_update(f.file_size)
+                continue
+
+            # if the file already exists, add its size to our overall progress, and skip
+            if os.path.isfile(dest) and os.path.getsize(dest) == f.file_size:
+                overall_progress_update(f.file_size)
+                file_checksums_to_annotate.append(f.id)
+                continue
+
+            yield f, filename, dest
+
+    def _create_transfer(
+        self, method, filename, dest, session=None, path=None, baseurl=None
+    ):
         """
+        Return a function that creates a transfer of the file to dest, from where we're
+        downloading/copying from, or None if the source file name is malformed.
+        """
+        if method == DOWNLOAD_METHOD:
+            url = paths.get_content_storage_remote_url(filename, baseurl=baseurl)
+            # Content files are named by their checksum, and verified after download,
+            # so a partial download left by an earlier import can be resumed
+            return partial(
+                transfer.FileDownload,
+                url,
+                dest,
+                session=session,
+                remove_existing_temp_file=False,
+                resumable=True,
+            )
         try:
-            # Save the current progress value
-            original_value = self.progresstrackers[0].progress
-            original_progress = self.progresstrackers[0].get_progress()
-
-            with filetransfer, self.start_progress(
-                total=filetransfer.total_size
-            ) as file_dl_progress_update:
-                for chunk in filetransfer:
-                    if self.is_cancelled():
-                        filetransfer.cancel()
-                        return True, FILE_NOT_TRANSFERRED
-                    length = len(chunk)
-                    overall_progress_update(length)
-                    file_dl_progress_update(length)
-
-                # Ensure that if for some reason the total file size for the transfer
-                # is less than what we have marked in the database that we make up
-                # the difference so that the overall progress is never incorrect.
-                # This could happen, for example for a local transfer if a file
-                # has been replaced or corrupted (which we catch below) or for
-                # a remote transfer if the peer to peer transfer is is compressing
-                # files using gzip.
-                overall_progress_update(f.file_size - filetransfer.total_size)
-
-                # If checksum of the destination file is different from the localfile
-                # id indicated in the database, it means that the destination file
-                # is corrupted, either from origin or during import. Skip importing
-                # this file.
-                checksum_correctness = import_export_content.compare_checksums(
-                    filetransfer.dest, f.id
+            srcpath = paths.get_content_storage_file_path(filename, datafolder=path)
+        except InvalidStorageFilenameError:
+            return None
+        return partial(transfer.FileCopy, srcpath, dest)
+
+    def _transfer_sequentially(
+        self, method, files_to_download, overall_progress_update, path, baseurl
+    ):
+        """
+        Transfer the files one at a time in this thread.
+        Returns a tuple of the checksums of the files to annotate, the number of skipped files,
+        and any exception that was not caught by the retry logic.
+        """
+        file_checksums_to_annotate = []
+        number_of_skipped_files = 0
+
+        session = requests.Session() if method == DOWNLOAD_METHOD else None
+
+        for f, filename, dest in self._get_files_to_transfer(
+            files_to_download, overall_progress_update, file_checksums_to_annotate
+        ):
+            create_transfer = self._create_transfer(
+                method, filename, dest, session=session, path=path, baseurl=baseurl
+            )
+            if create_transfer is None:
+                # If the source file name is malformed, just stop now.
+                overall_progress_update(f.file_size)
+                continue
+
+            try:
+                status = self._transfer_file(
+                    f,
+                    create_transfer,
+                    overall_progress_update,
+                    self.is_cancelled,
+                    sleep,
                 )
-                if not checksum_correctness:
-                    e = "File {} is corrupted.".format(filetransfer.source)
-                    logger.error(
-                        "An error occurred during content import: {}".format(e)
-                    )
-                    os.remove(filetransfer.dest)
-                    return True, FILE_SKIPPED
+            except Exception as e:
+                return file_checksums_to_annotate, number_of_skipped_files, e
 
-            return True, FILE_TRANSFERRED
+            if status == FILE_TRANSFERRED:
+                file_checksums_to_annotate.append(f.id)
+            elif status == FILE_SKIPPED:
+                number_of_skipped_files += 1
 
-        except Exception as e:
-            logger.error("An error occurred during content import: {}".format(e))
-            retry = import_export_content.retry_import(e, skip_404=True)
+        return file_checksums_to_annotate, number_of_skipped_files, None
 
-            if retry:
-                # Restore the previous progress so that the progress bar will
-                # not reach over 100% later
-                self.progresstrackers[0].progress = original_value
+    def _download_in_parallel(
+        self, files_to_download, overall_progress_update, baseurl, num_threads
+    ):
+        """
+        Download files concurrently with a pool of worker threads that share a connection pool.
+        Progress is reported and cancellation is checked from this thread, while the workers
+        are signalled to stop through a shared event.
+        Returns a tuple of the checksums of the files to annotate, the number of skipped files,
+        and any exception that was not caught by the retry logic.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=num_threads)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        progress = TransferProgress()
+        stop = threading.Event()
+        results = {
+            "file_checksums_to_annotate": [],
+            "number_of_skipped_files": 0,
+            "exception": None,
+        }
+
+        downloads = self._get_files_to_transfer(
+            files_to_download,
+            overall_progress_update,
+            results["file_checksums_to_annotate"],
+        )
+        pending = {}
+
+        executor = ThreadPoolExecutor(max_workers=num_threads)
+
+        try:
+            while True:
+                if self.is_cancelled():
+                    stop.set()
+
+                # Keep the workers busy, without queueing up every file in advance
+                if not stop.is_set():
+                    for f, filename, dest in islice(
+                        downloads, num_threads * 2 - len(pending)
+                    ):
+                        future = executor.submit(
+                            self._transfer_file,
+                            f,
+                            self._create_transfer(
+                                DOWNLOAD_METHOD,
+                                filename,
+                                dest,
+                                session=session,
+                                baseurl=baseurl,
+                            ),
+                            progress.add,
+                            stop.is_set,
+                            stop.wait,
+                        )
+                        pending[future] = f
+
+                if not pending:
+                    break
 
-                self.progresstrackers[0].update_callback(
-                    original_progress.progress_fraction, original_progress
+                done, _ = wait(
+                    pending, timeout=PROGRESS_POLL_INTERVAL, return_when=FIRST_COMPLETED
                 )
 
+                overall_progress_update(progress.pop())
+
+                for future in done:
+                    self._record_download_result(pending.pop(future), future, results)
+                    if results["exception"]:
+                        # Stop the other workers, and raise this once they have finished
+                        stop.set()
+        finally:
+            stop.set()
+            executor.shutdown(wait=True)
+            session.close()
+
+        overall_progress_update(progress.pop())
+
+        return (
+            results["file_checksums_to_annotate"],
+            results["number_of_skipped_files"],
+            results["exception"],
+        )
+
+    def _record_download_result(self, f, future, results):
+        try:
+            status = future.result()
+        except Exception as e:
+            results["exception"] = e
+            return
+        if status == FILE_TRANSFERRED:
+            results["file_checksums_to_annotate"].append(f.id)
+        elif status == FILE_SKIPPED:
+            results["number_of_skipped_files"] += 1
+
+    def _transfer_file(self, f, create_transfer, progress_update, is_cancelled, wait):
+        """
+        Transfer a single file, retrying on recoverable errors, and checking its checksum.
+        This is used both in this thread, and in the worker threads that download files in parallel,
+        so progress is reported, cancellation is checked, and retries are waited for with the
+        callables given. create_transfer is called to create a new transfer for each attempt.
+        Return value:
+            * FILE_TRANSFERRED - successfully transfer the file.
+            * FILE_SKIPPED - the file does not exist, or is corrupted, so it is skipped.
+            * FILE_NOT_TRANSFERRED - the transfer is cancelled.
+        """
+        while True:
+            transferred = 0
+            filetransfer = create_transfer()
+            try:
+                with filetransfer:
+                    for chunk in filetransfer:
+                        if is_cancelled():
+                            filetransfer.cancel()
+                            return FILE_NOT_TRANSFERRED
+                        transferred += len(chunk)
+                        progress_update(len(chunk))
+
+                    # Ensure that if for some reason the total file size for the transfer
+                    # is less than what we have marked in the database that we make up
+                    # the difference so that the overall progress is never incorrect.
+                    # This could happen, for example for a local transfer if a file
+                    # has been replaced or corrupted (which we catch below) or for
+                    # a remote transfer if the peer to peer transfer is is compressing
+                    # files using gzip, or for a remote transfer that has resumed a
+                    # previously interrupted download.
+                    progress_update(f.file_size - transferred)
+
+                    # If checksum of the destination file is different from the localfile
+                    # id indicated in the database, it means that the destination file
+                    # is corrupted, either from origin or during import. Skip importing
+                    # this file.
+                    if not import_export_content.compare_checksums(filetransfer, f.id):
+                        e = "File {} is corrupted.".format(filetransfer.source)
+                        logger.error(
+                            "An error occurred during content import: {}".format(e)
+                        )
+                        os.remove(filetransfer.dest)
+                        return FILE_SKIPPED
+
+                return FILE_TRANSFERRED
+
+            except Exception as e:
+                logger.error("An error occurred during content import: {}".format(e))
+                if not import_export_content.retry_import(e, skip_404=True):
+                    progress_update(f.file_size - transferred)
+                    return FILE_SKIPPED
+
+                # Remove the progress of the failed attempt, so that the progress
+                # will not reach over 100% later
+                progress_update(-transferred)
+
                 logger.info(
                     "Waiting for 30 seconds before retrying import: {}\n".format(
                         filetransfer.source
                     )
                 )
-                sleep(30)
-                return False, FILE_NOT_TRANSFERRED
-            else:
-                overall_progress_update(f.file_size)
-                return True, FILE_SKIPPED
+                wait(30)
+                if is_cancelled():
+                    return FILE_NOT_TRANSFERRED
 
     def handle_async(self, *args, **options):
         if options["command"] == "network":
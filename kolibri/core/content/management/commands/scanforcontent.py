@@ -3,13 +3,16 @@ import logging
 from django.core.management.base import BaseCommand
 from sqlalchemy.exc import DatabaseError
 
-from ...utils.annotation import annotate_content
+from ...utils.annotation import set_local_file_availability_from_disk
+from ...utils.annotation import update_content_metadata
 from ...utils.channel_import import FutureSchemaError
 from ...utils.channel_import import import_channel_from_local_db
 from ...utils.channel_import import InvalidSchemaVersionError
 from ...utils.channels import get_channel_ids_for_content_database_dir
 from kolibri.core.content.models import ChannelMetadata
 from kolibri.core.content.utils.paths import get_content_database_dir_path
+from kolibri.core.content.utils.paths import get_content_storage_dir_path
+from kolibri.core.content.utils.storage_scan import scan_content_storage
 
 logger = logging.getLogger(__name__)
 
@@ -31,22 +34,29 @@ class Command(BaseCommand):
             ChannelMetadata.objects.all().values_list("id", flat=True)
         )
         all_channel_ids = set(storage_channel_ids + database_channel_ids)
+        channel_ids_to_annotate = []
         for channel_id in all_channel_ids:
             if channel_id not in database_channel_ids:
                 try:
                     import_channel_from_local_db(channel_id)
-                    annotate_content(channel_id)
                 except (InvalidSchemaVersionError, FutureSchemaError):
                     logger.warning(
                         "Tried to import channel {channel_id}, but database file was incompatible".format(
                             channel_id=channel_id
                         )
                     )
+                    continue
                 except DatabaseError:
                     logger.warning(
                         "Tried to import channel {channel_id}, but database file was corrupted.".format(
                             channel_id=channel_id
                         )
                     )
-            else:
-                annotate_content(channel_id)
+                    continue
+            channel_ids_to_annotate.append(channel_id)
+
+        # The availability of the files of every channel is set at once, from a single listing of content storage
+        storage_manifest = scan_content_storage(get_content_storage_dir_path())
+        set_local_file_availability_from_disk(storage_manifest=storage_manifest)
+        for channel_id in channel_ids_to_annotate:
+            update_content_metadata(channel_id)
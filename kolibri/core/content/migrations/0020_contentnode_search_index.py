@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from kolibri.core.content.utils.search import create_search_index
+from kolibri.core.content.utils.search import update_search_index
+
+
+def build_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if create_search_index(connection):
+        ChannelMetadata = apps.get_model("content", "ChannelMetadata")
+        for channel_id in ChannelMetadata.objects.using(connection.alias).values_list(
+            "id", flat=True
+        ):
+            update_search_index(channel_id, connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("content", "0019_contentnode_slideshow_options")]
+
+    operations = [migrations.RunPython(build_search_index, migrations.RunPython.noop)]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-17 05:35
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.db import migrations
+from django.db import models
+
+import kolibri.core.content.models
+from kolibri.core.content.utils.search import update_search_tokens
+
+
+def generate_search_tokens(apps, schema_editor):
+    ChannelMetadata = apps.get_model("content", "ChannelMetadata")
+    for channel_id in ChannelMetadata.objects.values_list("id", flat=True):
+        update_search_tokens(channel_id, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("content", "0020_contentnode_search_index")]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchToken",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("channel_id", kolibri.core.content.models.UUIDField(db_index=True)),
+                ("token", models.CharField(max_length=50)),
+                (
+                    "contentnode",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="content.ContentNode",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name="searchtoken", index_together=set([("token", "contentnode")])
+        ),
+        migrations.RunPython(generate_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-17 07:06
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("content", "0021_searchtoken")]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentnode",
+            name="on_device_file_size",
+            field=models.BigIntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.AddField(
+            model_name="contentnode",
+            name="on_device_resources",
+            field=models.IntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.AddField(
+            model_name="contentnode",
+            name="total_resources",
+            field=models.IntegerField(blank=True, default=0, null=True),
+        ),
+    ]
@@ -235,6 +235,12 @@ class ContentNode(MPTTModel):
     # Fields used only on Kolibri and not imported from a content database
     # Total number of coach only resources for this node
     num_coach_contents = models.IntegerField(default=0, null=True, blank=True)
+    # Number of renderable resources for this node, including itself
+    total_resources = models.IntegerField(default=0, null=True, blank=True)
+    # Number of renderable resources for this node that are available on the device
+    on_device_resources = models.IntegerField(default=0, null=True, blank=True)
+    # Total size in bytes of the files on the device for the resources of this node
+    on_device_file_size = models.BigIntegerField(default=0, null=True, blank=True)
 
     objects = ContentNodeManager()
 
@@ -393,6 +399,25 @@ class LocalFile(models.Model):
             return None
 
 
+class SearchToken(models.Model):
+    """
+    A fuzzed (stemmed then double metaphoned) token from the title or description of a ContentNode,
+    used for misspelling tolerant search lookups.
+    These are generated locally when a channel is imported, and are never imported from content databases.
+    """
+
+    # No database constraint, as content nodes are deleted with raw SQL during channel import,
+    # stale tokens are removed by channel_id when the tokens for a channel are regenerated.
+    contentnode = models.ForeignKey(
+        ContentNode, related_name="search_tokens", db_constraint=False
+    )
+    channel_id = UUIDField(db_index=True)
+    token = models.CharField(max_length=50)
+
+    class Meta:
+        index_together = [["token", "contentnode"]]
+
+
 class AssessmentMetaData(models.Model):
     """
     A model to describe additional metadata that characterizes assessment behaviour in Kolibri.
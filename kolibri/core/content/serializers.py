@@ -1,26 +1,34 @@
-import os
+import json
+from collections import defaultdict
+from gettext import gettext as _
 
 from django.core.cache import cache
+from django.core.urlresolvers import reverse
 from django.db.models import Manager
 from django.db.models import Sum
+from django.db.models.query import QuerySet
 from django.db.models.query import RawQuerySet
+from django.utils.text import get_valid_filename
 from le_utils.constants import content_kinds
 from rest_framework import serializers
+from six import string_types
 
-from kolibri.core.content.errors import InvalidStorageFilenameError
 from kolibri.core.content.models import AssessmentMetaData
 from kolibri.core.content.models import ChannelMetadata
 from kolibri.core.content.models import ContentNode
 from kolibri.core.content.models import File
 from kolibri.core.content.models import Language
 from kolibri.core.content.models import LocalFile
+from kolibri.core.content.models import PRESET_LOOKUP
 from kolibri.core.content.utils.channels import get_mounted_drives_with_channel_info
 from kolibri.core.content.utils.content_types_tools import (
     renderable_contentnodes_without_topics_q_filter,
 )
+from kolibri.core.content.utils.drive_manifest import get_drive_file_manifest
 from kolibri.core.content.utils.import_export_content import get_num_coach_contents
-from kolibri.core.content.utils.paths import get_content_storage_file_path
+from kolibri.core.content.utils.paths import get_content_storage_file_url
 from kolibri.core.fields import create_timezonestamp
+from kolibri.utils.conf import OPTIONS
 
 
 def _files_for_nodes(nodes):
@@ -290,20 +298,9 @@ def get_summary_logs(content_ids, user):
 
 
 def get_topic_progress_fraction(topic, user):
-    leaf_ids = (
-        topic.get_descendants(include_self=False)
-        .order_by()
-        .exclude(kind=content_kinds.TOPIC)
-        .values_list("content_id", flat=True)
-    )
-    return round(
-        (
-            get_summary_logs(leaf_ids, user).aggregate(Sum("progress"))["progress__sum"]
-            or 0
-        )
-        / (len(leaf_ids) or 1),
-        4,
-    )
+    from kolibri.core.logger.utils.topic_progress import get_topic_progress_fractions
+
+    return get_topic_progress_fractions(user, [topic])[topic.id]
 
 
 def get_content_progress_fraction(content, user):
@@ -327,40 +324,18 @@ def get_topic_and_content_progress_fraction(node, user):
 
 
 def get_topic_and_content_progress_fractions(nodes, user):
-    leaf_ids = (
-        nodes.get_descendants(include_self=True)
-        .order_by()
-        .exclude(available=False)
-        .exclude(kind=content_kinds.TOPIC)
-        .values_list("content_id", flat=True)
-    )
+    from kolibri.core.logger.utils.topic_progress import get_topic_progress_fractions
 
-    leaf_node_logs = get_summary_logs(leaf_ids, user)
+    topics = [node for node in nodes if node.kind == content_kinds.TOPIC]
 
-    overall_progress = {}
-
-    for log in leaf_node_logs.values("content_id", "progress"):
-        overall_progress[log["content_id"]] = round(log["progress"], 4)
+    overall_progress = get_content_progress_fractions(
+        [node for node in nodes if node.kind != content_kinds.TOPIC], user
+    )
 
-    for node in nodes:
-        if node.kind == content_kinds.TOPIC:
-            topic_leaf_ids = (
-                node.get_descendants(include_self=True)
-                .order_by()
-                .exclude(available=False)
-                .exclude(kind=content_kinds.TOPIC)
-                .values_list("content_id", flat=True)
-            )
-
-            overall_progress[node.content_id] = (
-                round(
-                    sum(overall_progress.get(leaf_id, 0) for leaf_id in topic_leaf_ids)
-                    / len(topic_leaf_ids),
-                    4,
-                )
-                if topic_leaf_ids
-                else 0.0
-            )
+    # look up the progress of topics from the user's topic progress rollups
+    topic_progress = get_topic_progress_fractions(user, topics)
+    for topic in topics:
+        overall_progress[topic.content_id] = topic_progress[topic.id]
 
     return overall_progress
 
@@ -383,6 +358,163 @@ def get_content_progress_fractions(nodes, user):
     return overall_progress
 
 
+LANGUAGE_FIELDS = ("id", "lang_code", "lang_subcode", "lang_name", "lang_direction")
+
+# the fields of LanguageSerializer that are lower cased
+LOWER_CASE_LANGUAGE_FIELDS = ("id", "lang_code", "lang_subcode")
+
+CONTENT_NODE_FIELDS = (
+    "id",
+    "author",
+    "available",
+    "channel_id",
+    "coach_content",
+    "content_id",
+    "description",
+    "kind",
+    "license_description",
+    "license_name",
+    "license_owner",
+    "num_coach_contents",
+    "parent_id",
+    "sort_order",
+    "title",
+)
+
+FILE_FIELDS = (
+    "id",
+    "contentnode_id",
+    "priority",
+    "available",
+    "preset",
+    "supplementary",
+    "thumbnail",
+    "local_file_id",
+    "local_file__extension",
+    "local_file__file_size",
+    "local_file__available",
+)
+
+ASSESSMENT_METADATA_FIELDS = (
+    "contentnode_id",
+    "assessment_item_ids",
+    "number_of_assessments",
+    "mastery_model",
+    "randomize",
+    "is_manipulable",
+)
+
+
+def _language_values(prefix):
+    return tuple(prefix + field for field in LANGUAGE_FIELDS)
+
+
+def _language_representation(values, prefix):
+    if values[prefix + "id"] is None:
+        return None
+    language = {}
+    for field in LANGUAGE_FIELDS:
+        value = values[prefix + field]
+        if value is not None and field in LOWER_CASE_LANGUAGE_FIELDS:
+            value = value.lower()
+        language[field] = value
+    return language
+
+
+def _file_representation(values, title):
+    filename = "{checksum}.{extension}".format(
+        checksum=values["local_file_id"], extension=values["local_file__extension"]
+    )
+    preset = PRESET_LOOKUP.get(values["preset"], _("Unknown format"))
+    download_filename = get_valid_filename(
+        "{} ({}).{}".format(title, preset, values["local_file__extension"])
+    )
+    return {
+        "storage_url": get_content_storage_file_url(
+            filename=filename, baseurl=OPTIONS["Deployment"]["URL_PATH_PREFIX"]
+        )
+        if values["local_file__available"]
+        else None,
+        "id": values["id"],
+        "priority": values["priority"],
+        "available": values["available"],
+        "file_size": values["local_file__file_size"],
+        "extension": values["local_file__extension"],
+        "preset": preset,
+        "lang": _language_representation(values, "lang__"),
+        "supplementary": values["supplementary"],
+        "thumbnail": values["thumbnail"],
+        "download_url": reverse(
+            "kolibri:core:downloadcontent",
+            kwargs={"filename": filename, "new_filename": download_filename},
+        ),
+    }
+
+
+def _assessment_metadata_representation(values):
+    assessment_metadata = {
+        field: values[field] for field in ASSESSMENT_METADATA_FIELDS[1:]
+    }
+    # JSON fields are not decoded when read with values
+    for field in ("assessment_item_ids", "mastery_model"):
+        if isinstance(assessment_metadata[field], string_types):
+            assessment_metadata[field] = json.loads(assessment_metadata[field])
+    return assessment_metadata
+
+
+def serialize_content_nodes(nodes):
+    """
+    Serialize the ContentNodes in the queryset nodes, as ContentNodeSerializer does, but reading only
+    the values needed, in a fixed number of queries, and building the representations as plain dicts,
+    which is much faster than serializing each node, file and language through nested serializers.
+    """
+    # prefetching is not possible, or needed, when reading values
+    nodes = nodes.prefetch_related(None)
+    node_values = list(
+        nodes.values(*(CONTENT_NODE_FIELDS + _language_values("lang__")))
+    )
+    if not node_values:
+        return []
+    node_ids = nodes.values("id")
+    titles = {values["id"]: values["title"] for values in node_values}
+
+    files = defaultdict(list)
+    for values in (
+        File.objects.filter(contentnode_id__in=node_ids)
+        .order_by("priority")
+        .values(*(FILE_FIELDS + _language_values("lang__")))
+    ):
+        files[values["contentnode_id"]].append(
+            _file_representation(values, titles[values["contentnode_id"]])
+        )
+
+    assessment_metadata = defaultdict(list)
+    for values in AssessmentMetaData.objects.filter(contentnode_id__in=node_ids).values(
+        *ASSESSMENT_METADATA_FIELDS
+    ):
+        assessment_metadata[values["contentnode_id"]].append(
+            _assessment_metadata_representation(values)
+        )
+
+    result = []
+    for values in node_values:
+        node = {
+            field: values[field]
+            for field in CONTENT_NODE_FIELDS
+            if field != "parent_id"
+        }
+        node.update(
+            {
+                "parent": values["parent_id"],
+                "lang": _language_representation(values, "lang__"),
+                "files": files[values["id"]],
+                "assessmentmetadata": assessment_metadata[values["id"]],
+            }
+        )
+        result.append(node)
+    return result
+
+
 class ContentNodeListSerializer(serializers.ListSerializer):
     def to_representation(self, data):
 
@@ -410,7 +542,7 @@ class ContentNodeListSerializer(serializers.ListSerializer):
             if cache.get(cache_key):
                 return cache.get(cache_key)
 
-        if not data:
+        if not isinstance(data, QuerySet) and not data:
             return data
 
         if (
@@ -423,21 +555,22 @@ class ContentNodeListSerializer(serializers.ListSerializer):
             # Don't annotate topic progress as too expensive
             progress_dict = get_content_progress_fractions(data, user)
 
-        result = []
-        topic_only = True
-
         # Allow results to be limited after all queryset filtering has occurred
         if self.limit:
             data = data[: self.limit]
 
-        for item in data:
-            obj = self.child.to_representation(
-                item,
-                progress_fraction=progress_dict.get(item.content_id),
-                annotate_progress_fraction=False,
-            )
-            topic_only = topic_only and obj.get("kind") == content_kinds.TOPIC
-            result.append(obj)
+        if isinstance(data, QuerySet):
+            result = self.serialize_queryset(data, progress_dict)
+        else:
+            result = [
+                self.child.to_representation(
+                    item,
+                    progress_fraction=progress_dict.get(item.content_id),
+                    annotate_progress_fraction=False,
+                )
+                for item in data
+            ]
+        topic_only = all(obj.get("kind") == content_kinds.TOPIC for obj in result)
 
         # Only store if all nodes are topics, because we don't annotate progress on them
         # This has the happy side effect of not caching our dynamically calculated
@@ -448,6 +581,15 @@ class ContentNodeListSerializer(serializers.ListSerializer):
 
         return result
 
+    def serialize_queryset(self, data, progress_dict):
+        fields = set(self.child.fields)
+        result = []
+        for node in serialize_content_nodes(data):
+            obj = {field: value for field, value in node.items() if field in fields}
+            obj["progress_fraction"] = progress_dict.get(node["content_id"])
+            result.append(obj)
+        return result
+
 
 class ContentNodeSerializer(DynamicFieldsModelSerializer):
     parent = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -533,8 +675,6 @@ class ContentNodeSlimSerializer(DynamicFieldsModelSerializer):
 
 class ContentNodeGranularSerializer(serializers.ModelSerializer):
     num_coach_contents = serializers.SerializerMethodField()
-    total_resources = serializers.SerializerMethodField()
-    on_device_resources = serializers.SerializerMethodField()
     importable = serializers.SerializerMethodField()
 
     class Meta:
@@ -551,23 +691,6 @@ class ContentNodeGranularSerializer(serializers.ModelSerializer):
             "total_resources",
         )
 
-    def get_total_resources(self, instance):
-        return (
-            instance.get_descendants(include_self=True)
-            .filter(renderable_contentnodes_without_topics_q_filter)
-            .distinct()
-            .count()
-        )
-
-    def get_on_device_resources(self, instance):
-        return (
-            instance.get_descendants(include_self=True)
-            .filter(renderable_contentnodes_without_topics_q_filter)
-            .filter(available=True)
-            .distinct()
-            .count()
-        )
-
     def get_num_coach_contents(self, instance):
         # If for exporting, only show what is available on server. For importing,
         # show all of the coach contents in the topic.
@@ -586,10 +709,21 @@ class ContentNodeGranularSerializer(serializers.ModelSerializer):
             return True
 
         # If non-topic ContentNode has no files, then it is not importable.
-        content_files = instance.files.all()
-        if not content_files.exists():
+        # The files are prefetched by the viewset, so don't query for them again.
+        content_files = list(instance.files.all())
+        if not content_files:
             return False
 
+        # Node is importable only if all of its Files are on the external drive
+        manifest = self._get_drive_file_manifest(drive_id)
+        return all(f.local_file.get_filename() in manifest for f in content_files)
+
+    def _get_drive_file_manifest(self, drive_id):
+        # Look up the manifest once for the node and all of its children,
+        # which share the same context
+        if "drive_file_manifest" in self.context:
+            return self.context["drive_file_manifest"]
+
         # Inspecting the external drive's files
         datafolder = cache.get(drive_id, None)
 
@@ -605,26 +739,15 @@ class ContentNodeGranularSerializer(serializers.ModelSerializer):
                     )
                 )
 
-        importable = True
-        for f in content_files:
-            # Node is importable only if all of its Files are on the external drive
-            try:
-                file_path = get_content_storage_file_path(
-                    f.local_file.get_filename(), datafolder
-                )
-                importable = importable and os.path.exists(file_path)
-            except InvalidStorageFilenameError:
-                importable = False
-            if not importable:
-                break
-
-        return importable
+        manifest = get_drive_file_manifest(drive_id, datafolder)
+        self.context["drive_file_manifest"] = manifest
+        return manifest
 
 
 class ContentNodeProgressListSerializer(serializers.ListSerializer):
     def to_representation(self, data):
 
-        if not data:
+        if not isinstance(data, QuerySet) and not data:
             return data
 
         if (
@@ -4,7 +4,9 @@ from django.dispatch import receiver
 
 from .models import ChannelMetadata
 from .models import ContentNode
+from .utils.search import delete_search_index
 from kolibri.core.lessons.models import Lesson
+from kolibri.core.logger.utils.topic_progress import delete_topic_progress_rollups
 from kolibri.core.notifications.models import LearnerProgressNotification
 
 
@@ -39,3 +41,13 @@ def update_lesson_resources_before_delete(sender, instance=None, *args, **kwargs
         if len(updated_resources) < len(lesson.resources):
             lesson.resources = updated_resources
             lesson.save()
+
+
+@receiver(pre_delete, sender=ChannelMetadata)
+def remove_channel_from_search_index(sender, instance=None, *args, **kwargs):
+    delete_search_index(instance.id)
+
+
+@receiver(pre_delete, sender=ChannelMetadata)
+def remove_channel_topic_progress_rollups(sender, instance=None, *args, **kwargs):
+    delete_topic_progress_rollups(instance.id)
@@ -1,3 +1,5 @@
+import os
+import shutil
 import tempfile
 import uuid
 
@@ -5,6 +7,7 @@ from django.core.management import call_command
 from django.db import DataError
 from django.test import TestCase
 from django.test import TransactionTestCase
+from django.utils.six import StringIO
 from le_utils.constants import content_kinds
 from mock import patch
 
@@ -14,6 +17,8 @@ from kolibri.core.content.models import ContentNode
 from kolibri.core.content.models import File
 from kolibri.core.content.models import Language
 from kolibri.core.content.models import LocalFile
+from kolibri.core.content.utils.annotation import _annotate_tree
+from kolibri.core.content.utils.annotation import annotate_content
 from kolibri.core.content.utils.annotation import calculate_included_languages
 from kolibri.core.content.utils.annotation import calculate_published_size
 from kolibri.core.content.utils.annotation import calculate_total_resource_count
@@ -24,6 +29,7 @@ from kolibri.core.content.utils.annotation import (
     set_leaf_node_availability_from_local_file_availability,
 )
 from kolibri.core.content.utils.annotation import set_local_file_availability_from_disk
+from kolibri.core.content.utils.storage_scan import scan_content_storage
 
 
 def get_engine(connection_string):
@@ -320,11 +326,151 @@ class AnnotationTreeRecursion(TransactionTestCase):
         self.assertFalse(root_node.available)
         self.assertFalse(root_node.coach_content)
 
+    def test_deep_tree_coach_content_summed(self):
+        root_node = ContentNode.objects.get(parent=None, channel_id=test_channel_id)
+        parent_node = root_node
+        for i in range(5):
+            parent_node = ContentNode.objects.create(
+                title="topic{}".format(i),
+                id=uuid.uuid4().hex,
+                content_id=uuid.uuid4().hex,
+                channel_id=test_channel_id,
+                parent=parent_node,
+                kind=content_kinds.TOPIC,
+            )
+            ContentNode.objects.create(
+                title="video{}".format(i),
+                id=uuid.uuid4().hex,
+                content_id=uuid.uuid4().hex,
+                channel_id=test_channel_id,
+                parent=parent_node,
+                kind=content_kinds.VIDEO,
+                available=True,
+                coach_content=True,
+            )
+        recurse_annotation_up_tree(channel_id=test_channel_id)
+        topics = ContentNode.objects.filter(title__startswith="topic").order_by("level")
+        self.assertEqual(
+            [topic.num_coach_contents for topic in topics], [5, 4, 3, 2, 1]
+        )
+        self.assertTrue(all(topic.available for topic in topics))
+        self.assertTrue(all(topic.coach_content for topic in topics))
+        root_node.refresh_from_db()
+        self.assertTrue(root_node.available)
+        self.assertEqual(root_node.num_coach_contents, 5)
+
+    def test_annotate_tree_only_returns_changed_nodes(self):
+        # (id, parent_id, level, kind, available, coach_content, num_coach_contents,
+        # total_resources, on_device_resources, on_device_file_size)
+        nodes = [
+            ("root", None, 0, content_kinds.TOPIC, True, False, 0, 2, 1, 10),
+            ("video", "root", 1, content_kinds.VIDEO, True, False, 0, 1, 1, 10),
+            ("exercise", "root", 1, content_kinds.EXERCISE, False, True, 0, 1, 0, 0),
+        ]
+        self.assertEqual(
+            _annotate_tree(nodes, {"video", "exercise"}, {"video": 10}),
+            [("exercise", False, True, 1, 1, 0, 0)],
+        )
+
+    def test_resource_counts(self):
+        LocalFile.objects.all().update(file_size=10)
+        ContentNode.objects.exclude(kind=content_kinds.TOPIC).update(available=True)
+        recurse_annotation_up_tree(channel_id=test_channel_id)
+        root = ContentNode.objects.get(id="da7ecc42e62553eebc8121242746e88a")
+        # Only c1 has renderable files
+        self.assertEqual(root.total_resources, 1)
+        self.assertEqual(root.on_device_resources, 1)
+        # The available files of c1 and c2c1
+        self.assertEqual(root.on_device_file_size, 40)
+        c2 = ContentNode.objects.get(id="2e8bac07947855369fe2d77642dfc870")
+        self.assertEqual(c2.total_resources, 0)
+        self.assertEqual(c2.on_device_file_size, 20)
+
+    def test_resource_counts_not_on_device(self):
+        recurse_annotation_up_tree(channel_id=test_channel_id)
+        root = ContentNode.objects.get(id="da7ecc42e62553eebc8121242746e88a")
+        self.assertEqual(root.total_resources, 1)
+        self.assertEqual(root.on_device_resources, 0)
+
+    def test_benchmark_leaves_annotations_unchanged(self):
+        ContentNode.objects.exclude(kind=content_kinds.TOPIC).update(available=True)
+        recurse_annotation_up_tree(channel_id="6199dde695db4ee4ab392222d5af1e5c")
+        fields = (
+            "id",
+            "available",
+            "coach_content",
+            "num_coach_contents",
+            "total_resources",
+            "on_device_resources",
+            "on_device_file_size",
+        )
+        annotations = set(ContentNode.objects.values_list(*fields))
+        out = StringIO()
+        call_command("benchmarkannotation", iterations=1, stdout=out)
+        self.assertIn("All topics changed", out.getvalue())
+        self.assertEqual(set(ContentNode.objects.values_list(*fields)), annotations)
+
     def tearDown(self):
         call_command("flush", interactive=False)
         super(AnnotationTreeRecursion, self).tearDown()
 
 
+@patch("kolibri.core.content.utils.sqlalchemybridge.get_engine", new=get_engine)
+class IncrementalAnnotation(TransactionTestCase):
+
+    fixtures = ["content_test.json"]
+
+    def setUp(self):
+        super(IncrementalAnnotation, self).setUp()
+        LocalFile.objects.all().update(available=False)
+        File.objects.all().update(available=False)
+        ContentNode.objects.all().update(available=False, on_device_resources=0)
+
+    def test_file_node_and_ancestors_available(self):
+        annotate_content(test_channel_id, ["6bdfea4a01830fdd4a585181c0b8068c"])
+        self.assertTrue(
+            File.objects.get(local_file_id="6bdfea4a01830fdd4a585181c0b8068c").available
+        )
+        self.assertTrue(
+            ContentNode.objects.get(id="32a941fb77c2576e8f6b294cde4c3b0c").available
+        )
+        self.assertTrue(
+            ContentNode.objects.get(id="da7ecc42e62553eebc8121242746e88a").available
+        )
+
+    def test_unrelated_nodes_not_updated(self):
+        # Not an ancestor of the node with the updated file
+        ContentNode.objects.filter(title="c2").update(available=True)
+        annotate_content(test_channel_id, ["6bdfea4a01830fdd4a585181c0b8068c"])
+        self.assertTrue(ContentNode.objects.get(title="c2").available)
+        self.assertEqual(
+            ContentNode.objects.exclude(kind=content_kinds.TOPIC)
+            .filter(available=True)
+            .count(),
+            1,
+        )
+
+    def test_on_device_resources_updated(self):
+        annotate_content(test_channel_id, ["6bdfea4a01830fdd4a585181c0b8068c"])
+        self.assertEqual(
+            ContentNode.objects.get(
+                id="32a941fb77c2576e8f6b294cde4c3b0c"
+            ).on_device_resources,
+            1,
+        )
+        root = ContentNode.objects.get(id="da7ecc42e62553eebc8121242746e88a")
+        self.assertEqual(root.total_resources, 1)
+        self.assertEqual(root.on_device_resources, 1)
+
+    def test_no_checksums(self):
+        annotate_content(test_channel_id, [])
+        self.assertFalse(ContentNode.objects.filter(available=True).exists())
+
+    def tearDown(self):
+        call_command("flush", interactive=False)
+        super(IncrementalAnnotation, self).tearDown()
+
+
 @patch("kolibri.core.content.utils.sqlalchemybridge.get_engine", new=get_engine)
 class LocalFileAvailableByChecksum(TransactionTestCase):
 
@@ -500,6 +646,16 @@ class LocalFileByDisk(TransactionTestCase):
         self.assertEqual(LocalFile.objects.filter(available=True).count(), 2)
         self.assertEqual(LocalFile.objects.exclude(available=True).count(), 3)
 
+    def test_set_all_files_from_storage_manifest(self):
+        missing_file_id = "211523265f53825b82f70ba19218a02e"
+        LocalFile.objects.filter(id=missing_file_id).update(available=True)
+        filename = LocalFile.objects.get(id=self.file_id_1).get_filename()
+        with patch("kolibri.core.content.utils.annotation.os.path.exists") as exists:
+            set_local_file_availability_from_disk(storage_manifest={filename})
+            exists.assert_not_called()
+        self.assertTrue(LocalFile.objects.get(id=self.file_id_1).available)
+        self.assertFalse(LocalFile.objects.get(id=missing_file_id).available)
+
     def test_set_bad_filenames(self):
         local_files = list(LocalFile.objects.all())
         LocalFile.objects.all().delete()
@@ -514,6 +670,40 @@ class LocalFileByDisk(TransactionTestCase):
         super(LocalFileByDisk, self).tearDown()
 
 
+class ScanContentStorageTestCase(TestCase):
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_dir)
+
+    def _create_file(self, *path):
+        if len(path) > 1:
+            dirpath = os.path.join(self.storage_dir, *path[:-1])
+            if not os.path.isdir(dirpath):
+                os.makedirs(dirpath)
+        open(os.path.join(self.storage_dir, *path), "w").close()
+
+    def test_lists_files_in_every_shard(self):
+        self._create_file("a", "b", "ab12.mp4")
+        self._create_file("a", "b", "ab34.pdf")
+        self._create_file("0", "f", "0f56.mp3")
+        self.assertEqual(
+            scan_content_storage(self.storage_dir, workers=2),
+            {"ab12.mp4", "ab34.pdf", "0f56.mp3"},
+        )
+
+    def test_ignores_misplaced_files(self):
+        self._create_file("ab12.mp4")
+        self._create_file("a", "ab34.mp4")
+        self._create_file("a", "b", "cd56.mp4")
+        os.makedirs(os.path.join(self.storage_dir, "a", "b", "ab78.mp4"))
+        self.assertEqual(scan_content_storage(self.storage_dir), frozenset())
+
+    def test_missing_storage_dir(self):
+        self.assertEqual(
+            scan_content_storage(os.path.join(self.storage_dir, "missing")), frozenset()
+        )
+
+
 class CalculateChannelFieldsTestCase(TestCase):
     def setUp(self):
         self.node = ContentNode.objects.create(
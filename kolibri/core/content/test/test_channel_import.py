@@ -6,6 +6,7 @@ import tempfile
 import uuid
 
 from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 from django.test import TransactionTestCase
 from mock import call
@@ -400,7 +401,7 @@ class ContentImportTestBase(TransactionTestCase):
         super(ContentImportTestBase, self).setUp()
 
     @patch("kolibri.core.content.utils.channel_import.get_content_database_file_path")
-    def set_content_fixture(self, db_path_mock):
+    def set_content_fixture(self, db_path_mock, progress_update=None):
         _, self.content_db_path = tempfile.mkstemp(suffix=".sqlite3")
         db_path_mock.return_value = self.content_db_path
         self.content_engine = create_engine(
@@ -439,7 +440,9 @@ class ContentImportTestBase(TransactionTestCase):
             # Double check that we have actually created a valid content db that is recognized as having that schema
             assert channel_metadata.inferred_schema_version == self.schema_name
 
-            import_channel_from_local_db("6199dde695db4ee4ab392222d5af1e5c")
+            import_channel_from_local_db(
+                "6199dde695db4ee4ab392222d5af1e5c", progress_update=progress_update
+            )
 
     def get_engine(self, connection_string):
         if connection_string == get_default_db_string():
@@ -593,6 +596,89 @@ class ImportLongDescriptionsTestCase(ContentImportTestBase, TransactionTestCase)
         )
 
 
+class DiffImportTestCase(ContentImportTestBase):
+    """
+    Integration test for updating an older version of a channel by only writing the rows that differ
+    """
+
+    name = CONTENT_SCHEMA_VERSION
+    legacy_schema = None
+
+    def get_rowid(self, Model, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT rowid FROM {table} WHERE id = %s".format(
+                    table=Model._meta.db_table
+                ),
+                [pk],
+            )
+            return cursor.fetchone()[0]
+
+    def test_only_differences_written(self):
+        channel = ChannelMetadata.objects.first()
+        changed_node = channel.root.get_descendants().first()
+        unchanged_node = channel.root.get_descendants().last()
+        unchanged_node_rowid = self.get_rowid(ContentNode, unchanged_node.id)
+        ContentNode.objects.filter(id=changed_node.id).update(title="changed")
+        residual_file = File.objects.first()
+        residual_file.id = uuid.uuid4().hex
+        residual_file.save()
+        # Decrement current channel version to ensure reimport
+        channel.version -= 1
+        channel.save()
+        progress_update = Mock()
+        self.set_content_fixture(progress_update=progress_update)
+
+        self.assertEqual(
+            progress_update.call_args[1]["extra_data"],
+            {
+                "channel_id": channel.id,
+                "inserted": 0,
+                # the changed node, and the channel metadata for its version
+                "updated": 2,
+                "deleted": 1,
+            },
+        )
+        self.assertEqual(
+            ContentNode.objects.get(id=changed_node.id).title, changed_node.title
+        )
+        self.assertFalse(File.objects.filter(id=residual_file.id).exists())
+        self.assertEqual(
+            self.get_rowid(ContentNode, unchanged_node.id), unchanged_node_rowid
+        )
+        self.assertEqual(
+            ContentNode.objects.get(id=unchanged_node.id).tree_id, channel.root.tree_id
+        )
+
+    def test_removed_node_related_rows_deleted(self):
+        channel = ChannelMetadata.objects.first()
+        node = AssessmentMetaData.objects.first().contentnode
+        # give the node a new id, and copies of its files and assessment metadata,
+        # so that they are not in the new version of the channel
+        removed_node_id = uuid.uuid4().hex
+        ContentNode.objects.filter(id=node.id).update(id=removed_node_id)
+        for related in list(File.objects.filter(contentnode_id=node.id)) + list(
+            AssessmentMetaData.objects.filter(contentnode_id=node.id)
+        ):
+            related.id = uuid.uuid4().hex
+            related.contentnode_id = removed_node_id
+            related.save()
+        # Decrement current channel version to ensure reimport
+        channel.version -= 1
+        channel.save()
+        self.set_content_fixture()
+
+        self.assertFalse(ContentNode.objects.filter(id=removed_node_id).exists())
+        self.assertFalse(File.objects.filter(contentnode_id=removed_node_id).exists())
+        self.assertFalse(
+            AssessmentMetaData.objects.filter(contentnode_id=removed_node_id).exists()
+        )
+        self.assertTrue(File.objects.filter(contentnode_id=node.id).exists())
+        self.assertTrue(
+            AssessmentMetaData.objects.filter(contentnode_id=node.id).exists()
+        )
+
+
 class Version1ImportTestCase(NaiveImportTestCase):
     """
     Integration test for import from no version import
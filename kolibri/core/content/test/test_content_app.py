@@ -2,15 +2,20 @@
 To run this test, type this in command line <kolibri manage test -- kolibri.core.content>
 """
 import datetime
+import os
+import shutil
+import tempfile
 import uuid
 from collections import namedtuple
 
 import mock
 import requests
 from django.core.cache import cache
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
 from django.db.models import Q
 from django.utils import timezone
+from django.utils.six import StringIO
 from le_utils.constants import content_kinds
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -21,10 +26,19 @@ from kolibri.core.auth.models import Facility
 from kolibri.core.auth.models import FacilityUser
 from kolibri.core.auth.test.helpers import provision_device
 from kolibri.core.content import models as content
+from kolibri.core.content.serializers import serialize_content_nodes
+from kolibri.core.content.utils.annotation import update_content_metadata
+from kolibri.core.content.utils.drive_manifest import build_drive_file_manifest
+from kolibri.core.content.utils.drive_manifest import clear_drive_file_manifest_cache
+from kolibri.core.content.utils.paths import get_content_storage_file_path
+from kolibri.core.content.utils.search import update_search_index
+from kolibri.core.content.utils.search import update_search_tokens
 from kolibri.core.device.models import DevicePermissions
 from kolibri.core.device.models import DeviceSettings
 from kolibri.core.logger.models import ContentSessionLog
 from kolibri.core.logger.models import ContentSummaryLog
+from kolibri.core.logger.models import TopicProgressRollup
+from kolibri.core.logger.utils import topic_progress
 
 DUMMY_PASSWORD = "password"
 
@@ -187,6 +201,8 @@ class ContentNodeAPITestCase(APITestCase):
         self.admin.set_password(DUMMY_PASSWORD)
         self.admin.save()
         self.facility.add_admin(self.admin)
+        update_search_index(self.the_channel_id)
+        update_search_tokens(self.the_channel_id)
 
     def test_prerequisite_for_filter(self):
         c1_id = content.ContentNode.objects.get(title="c1").id
@@ -217,11 +233,40 @@ class ContentNodeAPITestCase(APITestCase):
         response = self.client.get(reverse("kolibri:core:contentnode-list"))
         self.assertEqual(len(response.data), expected_output)
 
+    def test_contentnode_list_matches_retrieve(self):
+        response = self.client.get(reverse("kolibri:core:contentnode-list"))
+        for node in response.data:
+            detail = self.client.get(
+                reverse("kolibri:core:contentnode-detail", kwargs={"pk": node["id"]})
+            ).data
+            # progress is only annotated for facility users in lists
+            self.assertEqual(node.pop("progress_fraction"), None)
+            detail.pop("progress_fraction")
+            self.assertEqual(node, detail)
+
+    def test_contentnode_list_fields(self):
+        response = self.client.get(
+            reverse("kolibri:core:contentnode-list"), data={"fields": "id,title"}
+        )
+        self.assertEqual(
+            set(response.data[0].keys()), set(["id", "title", "progress_fraction"])
+        )
+
+    def test_serialize_content_nodes_queries(self):
+        # nodes, files and assessment metadata
+        with self.assertNumQueries(3):
+            serialize_content_nodes(content.ContentNode.objects.all())
+
+    def test_benchmark_content_nodes(self):
+        out = StringIO()
+        call_command("benchmarkcontentnodes", iterations=1, stdout=out)
+        self.assertIn("nodes/s", out.getvalue())
+
     def test_contentnode_granular_network_import(self):
         c1_id = content.ContentNode.objects.get(title="root").id
         c2_id = content.ContentNode.objects.get(title="c1").id
         c3_id = content.ContentNode.objects.get(title="c2").id
-        content.ContentNode.objects.all().update(available=False)
+        content.ContentNode.objects.all().update(available=False, on_device_resources=0)
         response = self.client.get(
             reverse("kolibri:core:contentnode_granular-detail", kwargs={"pk": c1_id})
         )
@@ -270,7 +315,7 @@ class ContentNodeAPITestCase(APITestCase):
         drive_mock.return_value = {"123": DriveData(id="123", datafolder="test/")}
 
         content.LocalFile.objects.update(available=False)
-        content.ContentNode.objects.update(available=False)
+        content.ContentNode.objects.update(available=False, on_device_resources=0)
 
         c1_id = content.ContentNode.objects.get(title="root").id
         c2_id = content.ContentNode.objects.get(title="c1").id
@@ -319,6 +364,47 @@ class ContentNodeAPITestCase(APITestCase):
             },
         )
 
+    @mock.patch("kolibri.core.content.serializers.get_mounted_drives_with_channel_info")
+    def test_contentnode_granular_local_import_files_on_drive(self, drive_mock):
+        datafolder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, datafolder)
+        DriveData = namedtuple("DriveData", ["id", "datafolder"])
+        drive_mock.return_value = {"123": DriveData(id="123", datafolder=datafolder)}
+        clear_drive_file_manifest_cache()
+
+        c1 = content.ContentNode.objects.get(title="c1")
+        for f in c1.files.all():
+            file_path = get_content_storage_file_path(
+                f.local_file.get_filename(), datafolder
+            )
+            if not os.path.isdir(os.path.dirname(file_path)):
+                os.makedirs(os.path.dirname(file_path))
+            open(file_path, "w").close()
+
+        root_id = content.ContentNode.objects.get(title="root").id
+        with mock.patch(
+            "kolibri.core.content.utils.drive_manifest.build_drive_file_manifest",
+            wraps=build_drive_file_manifest,
+        ) as build_mock:
+            response = self.client.get(
+                reverse(
+                    "kolibri:core:contentnode_granular-detail", kwargs={"pk": root_id}
+                ),
+                {"importing_from_drive_id": "123"},
+            )
+            # The drive is only walked once, for all of the children
+            self.assertEqual(build_mock.call_count, 1)
+        self.assertTrue(response.data["children"][0]["importable"])
+
+    def test_drive_file_manifest_ignores_misplaced_files(self):
+        storage_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, storage_dir)
+        os.makedirs(os.path.join(storage_dir, "a", "b"))
+        for filename in ("ab12.mp4", "cd34.mp4"):
+            open(os.path.join(storage_dir, "a", "b", filename), "w").close()
+        open(os.path.join(storage_dir, "ab56.mp4"), "w").close()
+        self.assertEqual(build_drive_file_manifest(storage_dir), {"ab12.mp4"})
+
     def test_contentnode_granular_export_available(self):
         c1_id = content.ContentNode.objects.get(title="c1").id
         response = self.client.get(
@@ -342,7 +428,9 @@ class ContentNodeAPITestCase(APITestCase):
 
     def test_contentnode_granular_export_unavailable(self):
         c1_id = content.ContentNode.objects.get(title="c1").id
-        content.ContentNode.objects.filter(title="c1").update(available=False)
+        content.ContentNode.objects.filter(title="c1").update(
+            available=False, on_device_resources=0
+        )
         response = self.client.get(
             reverse("kolibri:core:contentnode_granular-detail", kwargs={"pk": c1_id})
         )
@@ -988,6 +1076,71 @@ class ContentNodeAPITestCase(APITestCase):
         self.assertEqual(get_progress_fraction(c2), 0.4)
         self.assertEqual(get_progress_fraction(c2c1), 0.7)
 
+    def test_contentnode_progress_updated_with_summary_log(self):
+
+        facility, root, c1, c2, c2c1, c2c3 = self._setup_contentnode_progress()
+        self.client.login(username="learner", password="pass", facility=facility)
+
+        def assert_progress(node, progress):
+            response = self.client.get(
+                reverse(
+                    "kolibri:core:contentnodeprogress-detail", kwargs={"pk": node.id}
+                )
+            )
+            self.assertEqual(response.data["progress_fraction"], progress)
+
+        assert_progress(c2, 0.4)
+        self.assertTrue(TopicProgressRollup.objects.filter(topic_id=c2.id).exists())
+
+        log = ContentSummaryLog.objects.get(content_id=c2c3.content_id)
+        log.progress = 1
+        log.save()
+        assert_progress(root, 0.34)
+        assert_progress(c2, 0.5667)
+
+        log.delete()
+        assert_progress(root, 0.14)
+        assert_progress(c2, 0.2333)
+
+    def test_contentnode_progress_with_summary_log_saved_while_calculating(self):
+
+        facility, root, c1, c2, c2c1, c2c3 = self._setup_contentnode_progress()
+        self.client.login(username="learner", password="pass", facility=facility)
+        calculate_rollups = topic_progress._calculate_rollups
+
+        def save_log_after_calculating(user, topics):
+            rollups = calculate_rollups(user, topics)
+            log = ContentSummaryLog.objects.get(content_id=c2c3.content_id)
+            if log.progress != 1:
+                log.progress = 1
+                log.save()
+            return rollups
+
+        with mock.patch(
+            "kolibri.core.logger.utils.topic_progress._calculate_rollups",
+            side_effect=save_log_after_calculating,
+        ):
+            self.client.get(reverse("kolibri:core:contentnodeprogress-list"))
+        response = self.client.get(
+            reverse("kolibri:core:contentnodeprogress-detail", kwargs={"pk": c2.id})
+        )
+        self.assertEqual(response.data["progress_fraction"], 0.5667)
+
+    @mock.patch("kolibri.core.content.utils.annotation.calculate_channel_fields")
+    @mock.patch("kolibri.core.content.utils.annotation.recurse_annotation_up_tree")
+    @mock.patch(
+        "kolibri.core.content.utils.annotation.set_leaf_node_availability_from_local_file_availability"
+    )
+    def test_contentnode_progress_rollups_deleted_on_annotation(self, *mocks):
+
+        facility, root, c1, c2, c2c1, c2c3 = self._setup_contentnode_progress()
+        self.client.login(username="learner", password="pass", facility=facility)
+        self.client.get(reverse("kolibri:core:contentnodeprogress-list"))
+        self.assertTrue(TopicProgressRollup.objects.exists())
+
+        update_content_metadata(self.the_channel_id)
+        self.assertFalse(TopicProgressRollup.objects.exists())
+
     def test_filtering_coach_content_anon(self):
         response = self.client.get(
             reverse("kolibri:core:contentnode-list"),
@@ -1100,6 +1253,65 @@ class ContentNodeAPITestCase(APITestCase):
         )
         self.assertEqual(len(response.data["results"]), 1)
 
+    def test_search_title_before_description(self):
+        content.ContentNode.objects.filter(title="c2c1").update(description="root")
+        update_search_index(self.the_channel_id)
+        response = self.client.get(
+            reverse("kolibri:core:contentnode_search-list"), data={"search": "root"}
+        )
+        self.assertEqual(
+            [node["title"] for node in response.data["results"]], ["root", "c2c1"]
+        )
+        self.assertEqual(response.data["total_results"], 2)
+
+    def test_search_filtered(self):
+        response = self.client.get(
+            reverse("kolibri:core:contentnode_search-list"),
+            data={"search": "c", "kind": content_kinds.VIDEO},
+        )
+        self.assertTrue(response.data["results"])
+        for node in response.data["results"]:
+            self.assertEqual(node["kind"], content_kinds.VIDEO)
+        # facets are collected from unfiltered results
+        self.assertIn(content_kinds.TOPIC, response.data["content_kinds"])
+
+    def test_search_unavailable_excluded(self):
+        response = self.client.get(
+            reverse("kolibri:core:contentnode_search-list"), data={"search": "c3"}
+        )
+        self.assertEqual([node["title"] for node in response.data["results"]], ["c3c1"])
+
+    @mock.patch("kolibri.core.content.api.search_index_exists", return_value=False)
+    def test_search_without_index(self, search_index_exists_mock):
+        response = self.client.get(
+            reverse("kolibri:core:contentnode_search-list"), data={"search": "root"}
+        )
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["total_results"], 1)
+
+    def test_search_fuzzy(self):
+        response = self.client.get(
+            reverse("kolibri:core:contentnode_search-list"), data={"search": "ruut"}
+        )
+        self.assertEqual(len(response.data["results"]), 0)
+        response = self.client.get(
+            reverse("kolibri:core:contentnode_search-list"),
+            data={"search": "ruut", "fuzzy": "true"},
+        )
+        self.assertEqual([node["title"] for node in response.data["results"]], ["root"])
+
+    def test_search_fuzzy_exact_matches_first(self):
+        content.ContentNode.objects.filter(title="c2c1").update(title="rut")
+        update_search_index(self.the_channel_id)
+        update_search_tokens(self.the_channel_id)
+        response = self.client.get(
+            reverse("kolibri:core:contentnode_search-list"),
+            data={"search": "rut", "fuzzy": "true"},
+        )
+        self.assertEqual(
+            [node["title"] for node in response.data["results"]], ["rut", "root"]
+        )
+
     def _create_session_logs(self):
         content_ids = (
             "f2332710c2fd483386cdeb5ecbdda81f",
@@ -1,13 +1,20 @@
 import os
 import tempfile
+from collections import namedtuple
 
+from django.db import IntegrityError
 from django.test import TestCase
 from mock import patch
 
 from kolibri.core.content.upgrade import import_external_content_dbs
 from kolibri.core.content.utils.channels import get_channel_ids_for_content_database_dir
 from kolibri.core.content.utils.channels import get_channels_for_data_folder
+from kolibri.core.content.utils.channels import (
+    get_mounted_drives_with_cataloged_channel_info,
+)
 from kolibri.core.content.utils.paths import get_content_database_dir_path
+from kolibri.core.discovery.models import DriveChannelCatalogEntry
+from kolibri.core.discovery.utils.filesystem import DriveData
 
 
 class EnumerateChannelTestCase(TestCase):
@@ -58,3 +65,112 @@ class EnumerateChannelTestCase(TestCase):
         # Make sure that the corrupted database file is not going to be listed
         self.assertTrue("6199dde695db4ee4ab392222d5af1e5c" not in channels)
         os.remove(db_file)  # Remove database file for future tests
+
+
+ChannelMetadata = namedtuple(
+    "ChannelMetadata",
+    ["id", "name", "description", "thumbnail", "version", "root_id", "author"],
+)
+
+
+@patch(
+    "kolibri.core.content.utils.channels.read_channel_metadata_from_db_file",
+    return_value=ChannelMetadata(
+        id="6199dde695db4ee4ab392222d5af1e5c",
+        name="channel",
+        description="",
+        thumbnail="",
+        version=1,
+        root_id="6199dde695db4ee4ab392222d5af1e5c",
+        author="",
+    ),
+)
+class DriveChannelCatalogTestCase(TestCase):
+    def setUp(self):
+        self.datafolder = tempfile.mkdtemp()
+        self.db_file = os.path.join(
+            get_content_database_dir_path(self.datafolder),
+            "6199dde695db4ee4ab392222d5af1e5c.sqlite3",
+        )
+        with open(self.db_file, "w") as f:
+            f.write("test")
+
+    def tearDown(self):
+        os.remove(self.db_file)
+
+    def test_unchanged_database_not_read_again(self, read_mock):
+        get_channels_for_data_folder(self.datafolder, drive_id="drive")
+        channels = get_channels_for_data_folder(self.datafolder, drive_id="drive")
+        self.assertEqual(read_mock.call_count, 1)
+        self.assertEqual(channels[0]["id"], "6199dde695db4ee4ab392222d5af1e5c")
+
+    def test_changed_database_read_again(self, read_mock):
+        get_channels_for_data_folder(self.datafolder, drive_id="drive")
+        with open(self.db_file, "a") as f:
+            f.write("changed")
+        get_channels_for_data_folder(self.datafolder, drive_id="drive")
+        self.assertEqual(read_mock.call_count, 2)
+
+    def test_removed_database_removed_from_catalog(self, read_mock):
+        get_channels_for_data_folder(self.datafolder, drive_id="drive")
+        os.rename(self.db_file, self.db_file + ".bak")
+        try:
+            channels = get_channels_for_data_folder(self.datafolder, drive_id="drive")
+        finally:
+            os.rename(self.db_file + ".bak", self.db_file)
+        self.assertEqual(channels, [])
+        self.assertFalse(DriveChannelCatalogEntry.objects.exists())
+
+    def test_database_cataloged_concurrently(self, read_mock):
+        update_or_create = DriveChannelCatalogEntry.objects.update_or_create
+
+        def catalog_concurrently(**kwargs):
+            # another thread creates the entry after this one found none to update
+            if not DriveChannelCatalogEntry.objects.exists():
+                DriveChannelCatalogEntry.objects.create(
+                    drive_id="drive", path=self.db_file, size=0, modified=0
+                )
+                raise IntegrityError("UNIQUE constraint failed")
+            return update_or_create(**kwargs)
+
+        with patch.object(
+            DriveChannelCatalogEntry.objects,
+            "update_or_create",
+            side_effect=catalog_concurrently,
+        ):
+            channels = get_channels_for_data_folder(self.datafolder, drive_id="drive")
+        self.assertEqual(channels[0]["id"], "6199dde695db4ee4ab392222d5af1e5c")
+        entry = DriveChannelCatalogEntry.objects.get()
+        self.assertEqual(entry.size, os.path.getsize(self.db_file))
+        self.assertEqual(entry.channel["id"], "6199dde695db4ee4ab392222d5af1e5c")
+
+    @patch("kolibri.core.content.utils.channels.start_drive_channel_catalog_refresh")
+    @patch("kolibri.core.content.utils.channels.enumerate_mounted_disk_partitions")
+    def test_cataloged_drives_listed_from_catalog(
+        self, enumerate_mock, refresh_mock, read_mock
+    ):
+        enumerate_mock.side_effect = lambda: {
+            "drive": DriveData(
+                id="drive",
+                name="drive",
+                path=self.datafolder,
+                writable=True,
+                datafolder=self.datafolder,
+                freespace=0,
+                totalspace=0,
+                filesystem="",
+                drivetype="",
+                metadata={},
+            )
+        }
+        drives = get_mounted_drives_with_cataloged_channel_info()
+        refresh_mock.assert_not_called()
+        with open(self.db_file, "a") as f:
+            f.write("changed")
+        cataloged_drives = get_mounted_drives_with_cataloged_channel_info()
+        self.assertEqual(read_mock.call_count, 1)
+        refresh_mock.assert_called_once_with()
+        self.assertEqual(
+            drives["drive"].metadata["channels"],
+            cataloged_drives["drive"].metadata["channels"],
+        )
@@ -2,6 +2,7 @@ import os
 import sys
 import tempfile
 import uuid
+from itertools import repeat
 
 from django.core.management import call_command
 from django.test import TestCase
@@ -176,6 +177,7 @@ class ImportChannelTestCase(TestCase):
 
 @patch("kolibri.core.content.management.commands.importcontent.annotation")
 @override_option("Paths", "CONTENT_DIR", tempfile.mkdtemp())
+@override_option("Deployment", "CONTENT_DOWNLOAD_THREADS", 1)
 class ImportContentTestCase(TestCase):
     """
     Test case for the importcontent management command.
@@ -245,7 +247,13 @@ class ImportContentTestCase(TestCase):
         # is_cancelled should be called thrice.
         is_cancelled_mock.assert_has_calls([call(), call(), call()])
         # Should be set to the local path we mocked
-        FileDownloadMock.assert_called_with("notest", local_path, session=Any(Session))
+        FileDownloadMock.assert_called_with(
+            "notest",
+            local_path,
+            session=Any(Session),
+            remove_existing_temp_file=False,
+            resumable=True,
+        )
         # Check that it was cancelled when the command was cancelled, this ensures cleanup
         FileDownloadMock.assert_has_calls([call().cancel()])
         # Check that the command itself was also cancelled.
@@ -642,6 +650,116 @@ class ImportContentTestCase(TestCase):
         annotation_mock.annotate_content.assert_called_with(self.the_channel_id, [])
 
 
+@patch("kolibri.core.content.management.commands.importcontent.annotation")
+@patch(
+    "kolibri.core.content.management.commands.importcontent.paths.get_content_storage_file_path",
+    side_effect=lambda filename: tempfile.mkstemp()[1],
+)
+@patch(
+    "kolibri.core.content.management.commands.importcontent.import_export_content.compare_checksums",
+    return_value=True,
+)
+@patch("kolibri.core.content.management.commands.importcontent.transfer.FileDownload")
+@override_option("Deployment", "CONTENT_DOWNLOAD_THREADS", 3)
+class ImportContentParallelTestCase(TestCase):
+    """
+    Test case for downloading content with multiple threads in the importcontent management command.
+    """
+
+    fixtures = ["content_test.json"]
+    the_channel_id = "6199dde695db4ee4ab392222d5af1e5c"
+
+    def setUp(self):
+        LocalFile.objects.update(available=False, file_size=3)
+
+    def test_all_files_downloaded(
+        self, FileDownloadMock, checksum_mock, local_path_mock, annotation_mock
+    ):
+        FileDownloadMock.return_value.__iter__.return_value = ["a", "b", "c"]
+        call_command("importcontent", "network", self.the_channel_id)
+        downloaded_ids = [c[0][1] for c in checksum_mock.call_args_list]
+        self.assertTrue(downloaded_ids)
+        self.assertEqual(FileDownloadMock.call_count, len(downloaded_ids))
+        # All downloads share a session
+        sessions = set(c[1]["session"] for c in FileDownloadMock.call_args_list)
+        self.assertEqual(len(sessions), 1)
+        annotation_mock.annotate_content.assert_called_once()
+        channel_id, checksums = annotation_mock.annotate_content.call_args[0]
+        self.assertEqual(channel_id, self.the_channel_id)
+        self.assertEqual(sorted(checksums), sorted(downloaded_ids))
+
+    @patch("kolibri.core.content.management.commands.importcontent.AsyncCommand.cancel")
+    @patch(
+        "kolibri.core.content.management.commands.importcontent.AsyncCommand.is_cancelled",
+        return_value=True,
+    )
+    def test_cancel_immediately(
+        self,
+        is_cancelled_mock,
+        cancel_mock,
+        FileDownloadMock,
+        checksum_mock,
+        local_path_mock,
+        annotation_mock,
+    ):
+        call_command("importcontent", "network", self.the_channel_id)
+        FileDownloadMock.assert_not_called()
+        cancel_mock.assert_called_with()
+        annotation_mock.annotate_content.assert_called_with(self.the_channel_id, [])
+
+    def _create_downloads(self, FileDownloadMock, first_error=None):
+        # Downloads that never finish unless they are cancelled, except that the first
+        # one raises first_error, if given
+        downloads = []
+
+        def create_download(*args, **kwargs):
+            download = MagicMock()
+            if first_error and not downloads:
+                download.__iter__.side_effect = first_error
+            else:
+                download.__iter__.side_effect = lambda: repeat("a")
+            downloads.append(download)
+            return download
+
+        FileDownloadMock.side_effect = create_download
+        return downloads
+
+    def test_worker_exception_stops_other_workers(
+        self, FileDownloadMock, checksum_mock, local_path_mock, annotation_mock
+    ):
+        downloads = self._create_downloads(
+            FileDownloadMock, first_error=ValueError("unexpected")
+        )
+        with self.assertRaises(ValueError):
+            call_command("importcontent", "network", self.the_channel_id)
+        self.assertGreater(len(downloads), 1)
+        for download in downloads[1:]:
+            download.cancel.assert_called_with()
+        annotation_mock.annotate_content.assert_called_with(self.the_channel_id, [])
+
+    @patch("kolibri.core.content.management.commands.importcontent.AsyncCommand.cancel")
+    @patch(
+        "kolibri.core.content.management.commands.importcontent.AsyncCommand.is_cancelled"
+    )
+    def test_cancel_during_transfer(
+        self,
+        is_cancelled_mock,
+        cancel_mock,
+        FileDownloadMock,
+        checksum_mock,
+        local_path_mock,
+        annotation_mock,
+    ):
+        downloads = self._create_downloads(FileDownloadMock)
+        # cancel once both of the files to import are being downloaded
+        is_cancelled_mock.side_effect = lambda: len(downloads) >= 2
+        call_command("importcontent", "network", self.the_channel_id)
+        for download in downloads:
+            download.cancel.assert_called_with()
+        cancel_mock.assert_called_with()
+        annotation_mock.annotate_content.assert_called_with(self.the_channel_id, [])
+
+
 @override_option("Paths", "CONTENT_DIR", tempfile.mkdtemp())
 class ExportChannelTestCase(TestCase):
     """
@@ -707,6 +825,16 @@ class ExportContentTestCase(TestCase):
         FileCopyMock.assert_not_called()
         cancel_mock.assert_called_with()
 
+    @patch(
+        "kolibri.core.content.management.commands.exportcontent.clear_drive_file_manifest_cache"
+    )
+    @patch("kolibri.core.content.management.commands.exportcontent.transfer.FileCopy")
+    def test_drive_file_manifest_cache_cleared(self, FileCopyMock, clear_cache_mock):
+        FileCopyMock.return_value.__iter__.return_value = ["one", "two", "three"]
+        call_command("exportcontent", self.the_channel_id, tempfile.mkdtemp())
+        FileCopyMock.assert_called()
+        clear_cache_mock.assert_called_once_with()
+
     @patch(
         "kolibri.core.content.management.commands.exportcontent.AsyncCommand.start_progress"
     )
@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 from django.test import override_settings
 from django.test import TestCase
 from mock import call
@@ -11,6 +14,7 @@ from kolibri.core.content.utils.sqlalchemybridge import ClassNotFoundError
 from kolibri.core.content.utils.sqlalchemybridge import get_class
 from kolibri.core.content.utils.sqlalchemybridge import get_default_db_string
 from kolibri.core.content.utils.sqlalchemybridge import get_engine
+from kolibri.core.content.utils.sqlalchemybridge import get_schema_version
 from kolibri.core.content.utils.sqlalchemybridge import make_session
 from kolibri.core.content.utils.sqlalchemybridge import set_all_class_defaults
 from kolibri.core.content.utils.sqlalchemybridge import sqlite_connection_string
@@ -115,6 +119,17 @@ class SQLAlchemyBridgeSQLAlchemyFunctionsTestCase(TestCase):
     def test_get_engine(self):
         self.assertEquals(type(get_engine("sqlite:///")), Engine)
 
+    def test_get_engine_reused(self):
+        self.assertIs(get_engine("sqlite:///"), get_engine("sqlite:///"))
+
+    def test_get_engine_not_reused_after_fork(self):
+        engine = get_engine("sqlite:///")
+        with patch(
+            "kolibri.core.content.utils.sqlalchemybridge.os.getpid",
+            return_value=os.getpid() + 1,
+        ):
+            self.assertIsNot(engine, get_engine("sqlite:///"))
+
     @patch(
         "kolibri.core.content.utils.sqlalchemybridge.sessionmaker",
         return_value=lambda: "test_session",
@@ -185,6 +200,35 @@ def setUp(self, apps_mock, get_class_mock):
     apps_mock.get_models.return_value = [self.DjangoModelMock]
 
 
+@patch("kolibri.core.content.utils.sqlalchemybridge.db_matches_schema")
+@patch(
+    "kolibri.core.content.utils.sqlalchemybridge.make_session",
+    return_value=(Mock(), Mock()),
+)
+class SQLAlchemyBridgeSchemaVersionTestCase(TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.write(fd, b"test")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.db_path)
+
+    def test_schema_version_cached(self, make_session_mock, db_matches_schema_mock):
+        get_schema_version(self.db_path, "test")
+        get_schema_version(self.db_path, "test")
+        self.assertEqual(make_session_mock.call_count, 1)
+
+    def test_schema_version_not_cached_after_change(
+        self, make_session_mock, db_matches_schema_mock
+    ):
+        get_schema_version(self.db_path, "test")
+        with open(self.db_path, "ab") as f:
+            f.write(b"changed")
+        get_schema_version(self.db_path, "test")
+        self.assertEqual(make_session_mock.call_count, 2)
+
+
 @patch("kolibri.core.content.utils.sqlalchemybridge.get_class")
 @patch("kolibri.core.content.utils.sqlalchemybridge.apps")
 class SQLAlchemyBridgeSetDefaultsTestCase(TestCase):
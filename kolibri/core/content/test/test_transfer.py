@@ -0,0 +1,248 @@
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from mock import MagicMock
+from mock import patch
+from requests.exceptions import ConnectionError
+
+from kolibri.core.content.utils.transfer import CopiedBlock
+from kolibri.core.content.utils.transfer import FileCopy
+from kolibri.core.content.utils.transfer import FileDownload
+from kolibri.core.content.utils.transfer import KERNEL_COPY_FUNCTIONS
+
+
+class FileCopyTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, "source")
+        self.dest = os.path.join(self.directory, "dest")
+        self.content = os.urandom(1024 * 1024 + 7)
+        with open(self.source, "wb") as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_checksum_calculated_during_transfer(self):
+        with FileCopy(self.source, self.dest, block_size=4096) as filecopy:
+            for chunk in filecopy:
+                pass
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(filecopy.checksum, hashlib.md5(self.content).hexdigest())
+
+    def _unsupported_copy(self, src_fd, dest_fd, offset, count):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    def test_copied_in_kernel_in_blocks(self):
+        if not KERNEL_COPY_FUNCTIONS:
+            self.skipTest("No kernel copy available on this platform")
+        with FileCopy(self.source, self.dest, block_size=4096) as filecopy:
+            chunks = list(filecopy)
+        self.assertTrue(all(isinstance(chunk, CopiedBlock) for chunk in chunks))
+        sizes = [len(chunk) for chunk in chunks]
+        self.assertEqual(sum(sizes), len(self.content))
+        self.assertEqual(max(sizes), 4096)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(filecopy.checksum, hashlib.md5(self.content).hexdigest())
+
+    def test_fallback_when_kernel_copy_unsupported(self):
+        with patch(
+            "kolibri.core.content.utils.transfer.KERNEL_COPY_FUNCTIONS",
+            [self._unsupported_copy],
+        ):
+            with FileCopy(self.source, self.dest, block_size=4096) as filecopy:
+                chunks = list(filecopy)
+        self.assertEqual(b"".join(chunks), self.content)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(filecopy.checksum, hashlib.md5(self.content).hexdigest())
+
+    def _copy_nothing(self, src_fd, dest_fd, offset, count):
+        return 0
+
+    def test_fallback_when_kernel_copy_copies_nothing(self):
+        with patch(
+            "kolibri.core.content.utils.transfer.KERNEL_COPY_FUNCTIONS",
+            [self._copy_nothing],
+        ):
+            with FileCopy(self.source, self.dest, block_size=4096) as filecopy:
+                chunks = list(filecopy)
+        self.assertEqual(b"".join(chunks), self.content)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(filecopy.checksum, hashlib.md5(self.content).hexdigest())
+
+    def test_fallback_when_kernel_copy_stops_early(self):
+        if not KERNEL_COPY_FUNCTIONS:
+            self.skipTest("No kernel copy available on this platform")
+        copy = KERNEL_COPY_FUNCTIONS[0]
+
+        def copy_first_block(src_fd, dest_fd, offset, count):
+            return 0 if offset else copy(src_fd, dest_fd, offset, count)
+
+        with patch(
+            "kolibri.core.content.utils.transfer.KERNEL_COPY_FUNCTIONS",
+            [copy_first_block],
+        ):
+            with FileCopy(self.source, self.dest, block_size=4096) as filecopy:
+                chunks = list(filecopy)
+        self.assertIsInstance(chunks[0], CopiedBlock)
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(self.content))
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(filecopy.checksum, hashlib.md5(self.content).hexdigest())
+
+    def test_cancel_during_copy(self):
+        with FileCopy(self.source, self.dest, block_size=4096) as filecopy:
+            for chunk in filecopy:
+                filecopy.cancel()
+                break
+        self.assertFalse(os.path.exists(self.dest + ".transfer"))
+        self.assertFalse(os.path.exists(self.dest))
+
+
+def _response(content, status_code=200, headers=None, error=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.ok = status_code < 400
+    response.headers = {"content-length": str(len(content))}
+    response.headers.update(headers or {})
+
+    def iter_content(block_size):
+        for i in range(0, len(content), block_size):
+            yield content[i : i + block_size]
+            if error:
+                raise error
+
+    response.iter_content.side_effect = iter_content
+    return response
+
+
+class FileDownloadTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dest = os.path.join(self.directory, "dest")
+        self.content = os.urandom(10000)
+        self.session = MagicMock()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_partial(self, length):
+        with open(self.dest + ".transfer", "wb") as f:
+            f.write(self.content[:length])
+
+    def _download(self, **kwargs):
+        kwargs.setdefault("remove_existing_temp_file", False)
+        kwargs.setdefault("resumable", True)
+        with FileDownload(
+            "http://test/file",
+            self.dest,
+            block_size=1024,
+            session=self.session,
+            **kwargs
+        ) as filedownload:
+            for chunk in filedownload:
+                pass
+        return filedownload
+
+    def _assert_downloaded(self, filedownload):
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(filedownload.checksum, hashlib.md5(self.content).hexdigest())
+        self.assertFalse(os.path.exists(self.dest + ".transfer"))
+
+    def test_resume_partial_download(self):
+        self._write_partial(4000)
+        self.session.get.return_value = _response(
+            self.content[4000:],
+            status_code=206,
+            headers={"content-range": "bytes 4000-9999/10000"},
+        )
+        filedownload = self._download()
+        self._assert_downloaded(filedownload)
+        self.assertEqual(
+            self.session.get.call_args[1]["headers"]["Range"], "bytes=4000-"
+        )
+        self.assertEqual(filedownload.total_size, 6000)
+
+    def test_restart_when_range_not_supported(self):
+        self._write_partial(4000)
+        self.session.get.return_value = _response(self.content)
+        filedownload = self._download()
+        self._assert_downloaded(filedownload)
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_restart_when_range_not_satisfiable(self):
+        self._write_partial(4000)
+        self.session.get.side_effect = [
+            _response(b"", status_code=416),
+            _response(self.content),
+        ]
+        filedownload = self._download()
+        self._assert_downloaded(filedownload)
+        self.assertEqual(self.session.get.call_args[1]["headers"], {})
+
+    def test_partial_download_kept_after_error(self):
+        self.session.get.side_effect = [
+            _response(self.content, error=ConnectionError()),
+            _response(
+                self.content[1024:],
+                status_code=206,
+                headers={"content-range": "bytes 1024-9999/10000"},
+            ),
+        ]
+        with self.assertRaises(ConnectionError):
+            self._download()
+        self.assertEqual(os.path.getsize(self.dest + ".transfer"), 1024)
+        self._assert_downloaded(self._download())
+
+    def test_partial_download_not_resumed_by_default(self):
+        self._write_partial(4000)
+        self.session.get.return_value = _response(self.content)
+        self._assert_downloaded(
+            self._download(remove_existing_temp_file=True, resumable=False)
+        )
+        self.assertEqual(self.session.get.call_args[1]["headers"], {})
+
+    def test_partial_download_removed_when_requested(self):
+        self._write_partial(4000)
+        self.session.get.return_value = _response(self.content)
+        self._assert_downloaded(self._download(remove_existing_temp_file=True))
+        self.assertEqual(self.session.get.call_args[1]["headers"], {})
+
+    def test_retry_with_same_transfer(self):
+        self.session.get.side_effect = [
+            _response(self.content, error=ConnectionError()),
+            _response(self.content),
+        ]
+        filedownload = FileDownload(
+            "http://test/file", self.dest, block_size=1024, session=self.session
+        )
+        with self.assertRaises(ConnectionError):
+            with filedownload:
+                for chunk in filedownload:
+                    pass
+        with filedownload:
+            for chunk in filedownload:
+                pass
+        self.assertTrue(filedownload.closed)
+        self.assertTrue(filedownload.dest_file_obj.closed)
+        self._assert_downloaded(filedownload)
+
+    def test_partial_download_removed_when_canceled(self):
+        self.session.get.return_value = _response(self.content)
+        with FileDownload(
+            "http://test/file", self.dest, block_size=1024, session=self.session
+        ) as filedownload:
+            for chunk in filedownload:
+                filedownload.cancel()
+                break
+        self.assertFalse(os.path.exists(self.dest + ".transfer"))
+        self.assertFalse(os.path.exists(self.dest))
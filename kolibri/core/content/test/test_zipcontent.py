@@ -9,6 +9,7 @@ from django.test import TestCase
 from mock import patch
 
 from ..models import LocalFile
+from ..utils import zip_index
 from ..utils.paths import get_content_storage_file_path
 from kolibri.core.auth.test.helpers import provision_device
 from kolibri.utils.tests.helpers import override_option
@@ -42,6 +43,8 @@ class ZipContentTestCase(TestCase):
     test_str_1 = "This is a test!"
     test_name_2 = "testfile2.txt"
     test_str_2 = "And another test..."
+    compressed_name = "compressed.txt"
+    compressed_str = "This is compressed! " * 10000
 
     def setUp(self):
 
@@ -66,6 +69,7 @@ class ZipContentTestCase(TestCase):
             zf.writestr(self.empty_html_name, self.empty_html_str)
             zf.writestr(self.test_name_1, self.test_str_1)
             zf.writestr(self.test_name_2, self.test_str_2)
+            zf.writestr(self.compressed_name, self.compressed_str, zipfile.ZIP_DEFLATED)
 
         self.zip_file_obj = LocalFile(
             id=self.hash, extension=self.extension, available=True
@@ -96,6 +100,89 @@ class ZipContentTestCase(TestCase):
         response = self.client.get(self.zip_file_base_url + self.test_name_2)
         self.assertEqual(next(response.streaming_content).decode(), self.test_str_2)
 
+    def test_zip_file_compressed_internal_file_access(self, filename_patch):
+        response = self.client.get(self.zip_file_base_url + self.compressed_name)
+        self.assertEqual(
+            b"".join(response.streaming_content).decode(), self.compressed_str
+        )
+        self.assertEqual(
+            response["Content-Length"], str(len(self.compressed_str.encode()))
+        )
+
+    def test_stored_file_accepts_ranges(self, filename_patch):
+        response = self.client.get(self.zip_file_base_url + self.test_name_1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_stored_file_range_request(self, filename_patch):
+        response = self.client.get(
+            self.zip_file_base_url + self.test_name_2, HTTP_RANGE="bytes=4-10"
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            b"".join(response.streaming_content).decode(), self.test_str_2[4:11]
+        )
+        self.assertEqual(response["Content-Length"], "7")
+        self.assertEqual(
+            response["Content-Range"], "bytes 4-10/{}".format(len(self.test_str_2))
+        )
+
+    def test_stored_file_open_ended_range_request(self, filename_patch):
+        response = self.client.get(
+            self.zip_file_base_url + self.test_name_2, HTTP_RANGE="bytes=4-"
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            b"".join(response.streaming_content).decode(), self.test_str_2[4:]
+        )
+
+    def test_stored_file_suffix_range_request(self, filename_patch):
+        response = self.client.get(
+            self.zip_file_base_url + self.test_name_2, HTTP_RANGE="bytes=-3"
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            b"".join(response.streaming_content).decode(), self.test_str_2[-3:]
+        )
+
+    def test_stored_file_unsatisfiable_range_request(self, filename_patch):
+        response = self.client.get(
+            self.zip_file_base_url + self.test_name_2, HTTP_RANGE="bytes=1000-"
+        )
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(
+            response["Content-Range"], "bytes */{}".format(len(self.test_str_2))
+        )
+
+    def test_stored_file_invalid_range_request(self, filename_patch):
+        response = self.client.get(
+            self.zip_file_base_url + self.test_name_2, HTTP_RANGE="bytes=5-3"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content).decode(), self.test_str_2)
+
+    def test_stored_file_range_past_end_request(self, filename_patch):
+        response = self.client.get(
+            self.zip_file_base_url + self.test_name_2, HTTP_RANGE="bytes=1000-1010"
+        )
+        self.assertEqual(response.status_code, 416)
+
+    def test_compressed_file_does_not_accept_ranges(self, filename_patch):
+        response = self.client.get(
+            self.zip_file_base_url + self.compressed_name, HTTP_RANGE="bytes=4-10"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "none")
+
+    def test_zip_file_index_parsed_once(self, filename_patch):
+        zip_index._get_zip_index.cache_clear()
+        with patch.object(
+            zip_index, "ZipIndex", wraps=zip_index.ZipIndex
+        ) as zip_index_mock:
+            for name in (self.test_name_1, self.test_name_2, self.test_name_1):
+                self.client.get(self.zip_file_base_url + name)
+            self.assertEqual(zip_index_mock.call_count, 1)
+
     def test_nonexistent_zip_file_access(self, filename_patch):
         bad_base_url = self.zip_file_base_url.replace(
             self.zip_file_base_url[20:25], "aaaaa"
@@ -4,6 +4,7 @@ A file to contain specific logic to handle version upgrades in Kolibri.
 import logging
 import os
 
+from le_utils.constants import content_kinds
 from sqlalchemy import and_
 from sqlalchemy import cast
 from sqlalchemy import exists
@@ -12,11 +13,11 @@ from sqlalchemy import Integer
 from sqlalchemy import select
 from sqlalchemy.exc import DatabaseError
 
-from le_utils.constants import content_kinds
 from kolibri.core.content.apps import KolibriContentConfig
 from kolibri.core.content.models import ChannelMetadata
 from kolibri.core.content.models import ContentNode
 from kolibri.core.content.utils.annotation import annotate_content
+from kolibri.core.content.utils.annotation import recurse_annotation_up_tree
 from kolibri.core.content.utils.channel_import import FutureSchemaError
 from kolibri.core.content.utils.channel_import import import_channel_from_local_db
 from kolibri.core.content.utils.channel_import import InvalidSchemaVersionError
@@ -208,3 +209,16 @@ def update_num_coach_contents():
     trans.commit()
 
     bridge.end()
+
+
+# Resource counts were introduced in 0.13.0, so only annotate
+# when upgrading from versions prior to this.
+@version_upgrade(old_version="<0.13.0")
+def update_resource_counts():
+    """
+    Function to set the resource counts and on device file sizes on all topic trees
+    to account for those that were imported before these annotations were performed
+    """
+    logger.info("Updating resource counts on existing channels")
+    for channel_id in ChannelMetadata.objects.all().values_list("id", flat=True):
+        recurse_annotation_up_tree(channel_id)
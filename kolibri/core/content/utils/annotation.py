@@ -1,17 +1,20 @@
 import datetime
 import logging
 import os
+from collections import defaultdict
+from operator import itemgetter
 
+from django.db.models import Sum
 from le_utils.constants import content_kinds
 from sqlalchemy import and_
-from sqlalchemy import cast
+from sqlalchemy import bindparam
 from sqlalchemy import exists
-from sqlalchemy import func
-from sqlalchemy import Integer
+from sqlalchemy import or_
 from sqlalchemy import select
 
 from .paths import get_content_file_name
 from .paths import get_content_storage_file_path
+from .paths import VALID_STORAGE_FILENAME
 from .sqlalchemybridge import Bridge
 from kolibri.core.content.apps import KolibriContentConfig
 from kolibri.core.content.errors import InvalidStorageFilenameError
@@ -21,6 +24,9 @@ from kolibri.core.content.models import File
 from kolibri.core.content.models import LocalFile
 from kolibri.core.content.serializers import _files_for_nodes
 from kolibri.core.content.serializers import _total_file_size
+from kolibri.core.content.utils.content_types_tools import (
+    renderable_contentnodes_without_topics_q_filter,
+)
 from kolibri.core.device.models import ContentCacheKey
 
 logger = logging.getLogger(__name__)
@@ -29,8 +35,17 @@ CONTENT_APP_NAME = KolibriContentConfig.label
 
 CHUNKSIZE = 10000
 
+# Number of values to filter by in a single IN clause, to stay within the SQLite
+# limit on the number of variables in a query
+FILTER_CHUNKSIZE = 500
 
-def set_leaf_node_availability_from_local_file_availability(channel_id):
+
+def set_leaf_node_availability_from_local_file_availability(channel_id, checksums=None):
+    """
+    Set the availability of File objects from their LocalFile, and of non-topic ContentNode
+    objects in the channel from their Files.
+    If checksums are passed, only update the Files for those LocalFiles, and their ContentNodes.
+    """
     bridge = Bridge(app_name=CONTENT_APP_NAME)
 
     ContentNodeTable = bridge.get_table(ContentNode)
@@ -45,14 +60,6 @@ def set_leaf_node_availability_from_local_file_availability(channel_id):
         .limit(1)
     )
 
-    logger.info("Setting availability of File objects based on LocalFile availability")
-
-    connection.execute(
-        FileTable.update()
-        .values(available=file_statement)
-        .execution_options(autocommit=True)
-    )
-
     contentnode_statement = (
         select([FileTable.c.contentnode_id])
         .where(
@@ -64,11 +71,9 @@ def set_leaf_node_availability_from_local_file_availability(channel_id):
         .where(ContentNodeTable.c.id == FileTable.c.contentnode_id)
     )
 
-    logger.info(
-        "Setting availability of non-topic ContentNode objects based on File availability"
-    )
+    file_update = FileTable.update().values(available=file_statement)
 
-    connection.execute(
+    contentnode_update = (
         ContentNodeTable.update()
         .where(
             and_(
@@ -77,9 +82,46 @@ def set_leaf_node_availability_from_local_file_availability(channel_id):
             )
         )
         .values(available=exists(contentnode_statement))
-        .execution_options(autocommit=True)
     )
 
+    if checksums is None:
+        logger.info(
+            "Setting availability of File objects based on LocalFile availability"
+        )
+
+        connection.execute(file_update.execution_options(autocommit=True))
+
+        logger.info(
+            "Setting availability of non-topic ContentNode objects based on File availability"
+        )
+
+        connection.execute(contentnode_update.execution_options(autocommit=True))
+    else:
+        logger.info(
+            "Setting availability of File and non-topic ContentNode objects for {number} LocalFile objects".format(
+                number=len(checksums)
+            )
+        )
+
+        trans = connection.begin()
+
+        for i in range(0, len(checksums), FILTER_CHUNKSIZE):
+            checksums_chunk = checksums[i : i + FILTER_CHUNKSIZE]
+            connection.execute(
+                file_update.where(FileTable.c.local_file_id.in_(checksums_chunk))
+            )
+            connection.execute(
+                contentnode_update.where(
+                    ContentNodeTable.c.id.in_(
+                        select([FileTable.c.contentnode_id]).where(
+                            FileTable.c.local_file_id.in_(checksums_chunk)
+                        )
+                    )
+                )
+            )
+
+        trans.commit()
+
     bridge.end()
 
 
@@ -122,16 +164,14 @@ def mark_local_files_availability(checksums, availability):
         bridge.end()
 
 
-def set_local_file_availability_from_disk(checksums=None):
-    bridge = Bridge(app_name=CONTENT_APP_NAME)
-
+def _get_local_files(bridge, checksums):
     LocalFileClass = bridge.get_class(LocalFile)
 
     if checksums is None:
         logger.info(
             "Setting availability of LocalFile objects based on disk availability"
         )
-        files = bridge.session.query(
+        return bridge.session.query(
             LocalFileClass.id, LocalFileClass.available, LocalFileClass.extension
         ).all()
     elif type(checksums) == list:
@@ -140,7 +180,7 @@ def set_local_file_availability_from_disk(checksums=None):
                 number=len(checksums)
             )
         )
-        files = (
+        return (
             bridge.session.query(
                 LocalFileClass.id, LocalFileClass.available, LocalFileClass.extension
             )
@@ -153,16 +193,43 @@ def set_local_file_availability_from_disk(checksums=None):
                 checksum=checksums
             )
         )
-        files = [bridge.session.query(LocalFileClass).get(checksums)]
+        return [bridge.session.query(LocalFileClass).get(checksums)]
+
+
+def _get_file_exists(storage_manifest=None):
+    if storage_manifest is None:
+
+        def file_exists(filename):
+            return os.path.exists(get_content_storage_file_path(filename))
+
+    else:
+
+        def file_exists(filename):
+            if not VALID_STORAGE_FILENAME.match(filename):
+                raise InvalidStorageFilenameError()
+            return filename in storage_manifest
+
+    return file_exists
+
+
+def set_local_file_availability_from_disk(checksums=None, storage_manifest=None):
+    """
+    Set the availability of LocalFiles, optionally only those with checksums, from whether their files are on disk.
+    If storage_manifest, the set of filenames in content storage, is passed, files are looked up in it, rather
+    than on disk, so that the storage folder can be listed once for many updates.
+    """
+    file_exists = _get_file_exists(storage_manifest)
+
+    bridge = Bridge(app_name=CONTENT_APP_NAME)
+
+    files = _get_local_files(bridge, checksums)
 
     checksums_to_set_available = []
     checksums_to_set_unavailable = []
     for file in files:
         try:
             # Update if the file exists, *and* the localfile is set as unavailable.
-            if os.path.exists(
-                get_content_storage_file_path(get_content_file_name(file))
-            ):
+            if file_exists(get_content_file_name(file)):
                 if not file.available:
                     checksums_to_set_available.append(file.id)
             # Update if the file does not exist, *and* the localfile is set as available.
@@ -178,129 +245,269 @@ def set_local_file_availability_from_disk(checksums=None):
     mark_local_files_as_unavailable(checksums_to_set_unavailable)
 
 
-def recurse_annotation_up_tree(channel_id):
-    bridge = Bridge(app_name=CONTENT_APP_NAME)
+def _get_resource_stats(channel_id, node_ids=None):
+    """
+    Get the ids of the renderable resources in a channel, and the total size of the files
+    on the device for each resource, optionally only for the nodes with node_ids.
+    """
+    renderable_ids = set()
+    file_sizes = {}
+    if node_ids is None:
+        chunks = [None]
+    else:
+        chunks = [
+            node_ids[i : i + FILTER_CHUNKSIZE]
+            for i in range(0, len(node_ids), FILTER_CHUNKSIZE)
+        ]
+    for ids_chunk in chunks:
+        nodes = ContentNode.objects.filter(channel_id=channel_id).exclude(
+            kind=content_kinds.TOPIC
+        )
+        files = File.objects.filter(
+            contentnode__channel_id=channel_id, local_file__available=True
+        )
+        if ids_chunk is not None:
+            nodes = nodes.filter(id__in=ids_chunk)
+            files = files.filter(contentnode_id__in=ids_chunk)
+        renderable_ids.update(
+            nodes.filter(renderable_contentnodes_without_topics_q_filter)
+            .order_by()
+            .values_list("id", flat=True)
+            .distinct()
+        )
+        file_sizes.update(
+            files.order_by()
+            .values_list("contentnode_id")
+            .annotate(Sum("local_file__file_size"))
+        )
+    return renderable_ids, file_sizes
+
+
+def _annotate_tree(nodes, renderable_ids, file_sizes, topic_ids=None):
+    """
+    Calculate topic availability, coach content, and resource count annotations for a whole tree in memory.
+    Takes an iterable of (id, parent_id, level, kind, available, coach_content, num_coach_contents,
+    total_resources, on_device_resources, on_device_file_size) tuples, the ids of the renderable
+    resources and the size of the files on the device for each resource, as returned by
+    _get_resource_stats, and returns a list of (id, available, coach_content, num_coach_contents,
+    total_resources, on_device_resources, on_device_file_size) tuples for the nodes whose
+    annotations have changed.
+    Topics are available if any of their children are available, are coach content if all of
+    their available children are, and sum the number of coach contents of their available children.
+    Topics without available children are unavailable, and their coach content annotations are
+    left unchanged. The resource counts and file sizes of topics are the sums of those of all their children.
+    If topic_ids is passed, only those topics are annotated, and all other topics keep their
+    current annotations.
+    """
+    # Aggregated annotations of the available children of each topic, keyed by topic id,
+    # as a list of [all children coach content, total number of coach contents]
+    available_children = {}
+    # Summed resource counts of all the children of each topic, keyed by topic id,
+    # as a list of [total resources, on device resources, on device file size]
+    children_resources = defaultdict(lambda: [0, 0, 0])
+    changed = []
+
+    # Go from the deepest level to the shallowest, so that all children of a node
+    # are annotated before the node itself.
+    for node in sorted(nodes, key=itemgetter(2), reverse=True):
+        node_id, parent_id, _, kind, available, coach_content = node[:6]
+        num_coach_contents = node[6]
+        resources = tuple(node[7:])
+        if kind == content_kinds.TOPIC:
+            if topic_ids is None or node_id in topic_ids:
+                children = available_children.pop(node_id, None)
+                available = children is not None
+                if available:
+                    coach_content, num_coach_contents = children
+                resources = tuple(children_resources.pop(node_id, (0, 0, 0)))
+        else:
+            num_coach_contents = int(bool(coach_content))
+            total_resources = int(node_id in renderable_ids)
+            resources = (
+                total_resources,
+                total_resources if available else 0,
+                file_sizes.get(node_id) or 0,
+            )
+
+        if parent_id is not None:
+            parent_resources = children_resources[parent_id]
+            for i, value in enumerate(resources):
+                parent_resources[i] += value or 0
+
+        if available and parent_id is not None:
+            parent = available_children.get(parent_id)
+            if parent is None:
+                available_children[parent_id] = [
+                    bool(coach_content),
+                    num_coach_contents or 0,
+                ]
+            else:
+                parent[0] = parent[0] and bool(coach_content)
+                parent[1] += num_coach_contents or 0
+
+        annotated = (node_id, available, coach_content, num_coach_contents) + resources
+        if annotated[1:] != tuple(node[4:]):
+            changed.append(annotated)
+    return changed
 
-    ContentNodeClass = bridge.get_class(ContentNode)
+
+def _get_ancestor_ids(connection, ContentNodeTable, node_ids):
+    """
+    Walk up the tree from the passed nodes one level at a time, returning the ids of all their ancestors.
+    """
+    ancestor_ids = set()
+    current_ids = list(node_ids)
+    while current_ids:
+        parent_ids = set()
+        for i in range(0, len(current_ids), FILTER_CHUNKSIZE):
+            parent_ids.update(
+                row[0]
+                for row in connection.execute(
+                    select([ContentNodeTable.c.parent_id]).where(
+                        and_(
+                            ContentNodeTable.c.id.in_(
+                                current_ids[i : i + FILTER_CHUNKSIZE]
+                            ),
+                            ContentNodeTable.c.parent_id != None,  # noqa
+                        )
+                    )
+                )
+            )
+        current_ids = list(parent_ids - ancestor_ids)
+        ancestor_ids.update(current_ids)
+    return ancestor_ids
+
+
+def recurse_annotation_up_tree(channel_id, checksums=None):
+    """
+    Annotate the topics of a channel with their availability, coach content, and resource counts.
+    If checksums are passed, only the ancestors of nodes with files for those LocalFiles are annotated.
+    """
+    bridge = Bridge(app_name=CONTENT_APP_NAME)
 
     ContentNodeTable = bridge.get_table(ContentNode)
+    FileTable = bridge.get_table(File)
 
     connection = bridge.get_connection()
 
-    node_depth = (
-        bridge.session.query(func.max(ContentNodeClass.level))
-        .filter_by(channel_id=channel_id)
-        .scalar()
-    )
+    start = datetime.datetime.now()
+
+    columns = [
+        ContentNodeTable.c.id,
+        ContentNodeTable.c.parent_id,
+        ContentNodeTable.c.level,
+        ContentNodeTable.c.kind,
+        ContentNodeTable.c.available,
+        ContentNodeTable.c.coach_content,
+        ContentNodeTable.c.num_coach_contents,
+        ContentNodeTable.c.total_resources,
+        ContentNodeTable.c.on_device_resources,
+        ContentNodeTable.c.on_device_file_size,
+    ]
+
+    if checksums is None:
+        topic_ids = None
+        # Load the tree structure and annotation fields for the whole channel in a single query,
+        # rather than updating the tree with a query per level.
+        nodes = connection.execute(
+            select(columns).where(ContentNodeTable.c.channel_id == channel_id)
+        ).fetchall()
+    else:
+        node_ids = set()
+        for i in range(0, len(checksums), FILTER_CHUNKSIZE):
+            node_ids.update(
+                row[0]
+                for row in connection.execute(
+                    select([FileTable.c.contentnode_id]).where(
+                        and_(
+                            FileTable.c.local_file_id.in_(
+                                checksums[i : i + FILTER_CHUNKSIZE]
+                            ),
+                            FileTable.c.contentnode_id == ContentNodeTable.c.id,
+                            ContentNodeTable.c.channel_id == channel_id,
+                        )
+                    )
+                )
+            )
+        topic_ids = _get_ancestor_ids(connection, ContentNodeTable, node_ids)
+        # Load only the ancestor topics and their children, as all other nodes are unaffected
+        ancestor_ids = list(topic_ids)
+        nodes = {}
+        for i in range(0, len(ancestor_ids), FILTER_CHUNKSIZE):
+            ids_chunk = ancestor_ids[i : i + FILTER_CHUNKSIZE]
+            for row in connection.execute(
+                select(columns).where(
+                    and_(
+                        ContentNodeTable.c.channel_id == channel_id,
+                        or_(
+                            ContentNodeTable.c.id.in_(ids_chunk),
+                            ContentNodeTable.c.parent_id.in_(ids_chunk),
+                        ),
+                    )
+                )
+            ):
+                nodes[row[0]] = row
+        nodes = list(nodes.values())
 
     logger.info(
-        "Annotating ContentNode objects with children for {levels} levels".format(
-            levels=node_depth
-        )
+        "Annotating {count} ContentNode objects with children".format(count=len(nodes))
     )
 
-    child = ContentNodeTable.alias()
-
-    # start a transaction
+    renderable_ids, file_sizes = _get_resource_stats(
+        channel_id,
+        node_ids=None
+        if topic_ids is None
+        else [node[0] for node in nodes if node[3] != content_kinds.TOPIC],
+    )
 
-    trans = connection.begin()
-    start = datetime.datetime.now()
+    changed = _annotate_tree(nodes, renderable_ids, file_sizes, topic_ids=topic_ids)
 
-    # Update all leaf ContentNodes to have num_coach_content to 1 or 0
-    connection.execute(
-        ContentNodeTable.update()
-        .where(
-            and_(
-                # In this channel
-                ContentNodeTable.c.channel_id == channel_id,
-                # That are not topics
-                ContentNodeTable.c.kind != content_kinds.TOPIC,
-            )
-        )
-        .values(num_coach_contents=cast(ContentNodeTable.c.coach_content, Integer()))
+    logger.info(
+        "Updating {count} annotated ContentNode objects".format(count=len(changed))
     )
 
-    # Before starting set availability to False on all topics.
-    connection.execute(
+    # Compile the update statement once, and execute it directly with the database driver,
+    # as per row parameter processing in SQLAlchemy dominates the time taken for large trees.
+    update_statement = (
         ContentNodeTable.update()
-        .where(
-            and_(
-                # In this channel
-                ContentNodeTable.c.channel_id == channel_id,
-                # That are topics
-                ContentNodeTable.c.kind == content_kinds.TOPIC,
-            )
+        .where(ContentNodeTable.c.id == bindparam("node_id"))
+        .values(
+            available=bindparam("available"),
+            coach_content=bindparam("coach_content"),
+            num_coach_contents=bindparam("num_coach_contents"),
+            total_resources=bindparam("total_resources"),
+            on_device_resources=bindparam("on_device_resources"),
+            on_device_file_size=bindparam("on_device_file_size"),
         )
-        .values(available=False)
+        .compile(dialect=connection.dialect)
     )
 
-    # Expression to capture all available child nodes of a contentnode
-    available_nodes = select([child.c.available]).where(
-        and_(
-            child.c.available == True,  # noqa
-            ContentNodeTable.c.id == child.c.parent_id,
-        )
+    fields = (
+        "node_id",
+        "available",
+        "coach_content",
+        "num_coach_contents",
+        "total_resources",
+        "on_device_resources",
+        "on_device_file_size",
     )
 
-    # Expressions for annotation of coach content
+    if update_statement.positional:
+        order = [fields.index(name) for name in update_statement.positiontup]
+        params = [tuple(node[i] for i in order) for node in changed]
+    else:
+        params = [dict(zip(fields, node)) for node in changed]
 
-    # Expression that will resolve a boolean value for all the available children
-    # of a content node, whereby if they all have coach_content flagged on them, it will be true,
-    # but otherwise false.
-    # Everything after the select statement should be identical to the available_nodes expression above.
-    if bridge.engine.name == "sqlite":
-        # Use a min function to simulate an AND.
-        coach_content_nodes = select([func.min(child.c.coach_content)]).where(
-            and_(
-                child.c.available == True,  # noqa
-                ContentNodeTable.c.id == child.c.parent_id,
-            )
-        )
-    elif bridge.engine.name == "postgresql":
-        # Use the postgres boolean AND operator
-        coach_content_nodes = select([func.bool_and(child.c.coach_content)]).where(
-            and_(
-                child.c.available == True,  # noqa
-                ContentNodeTable.c.id == child.c.parent_id,
-            )
-        )
+    # start a transaction
 
-    # Expression that sums the total number of coach contents for each child node
-    # of a contentnode
-    coach_content_num = select([func.sum(child.c.num_coach_contents)]).where(
-        and_(
-            child.c.available == True,  # noqa
-            ContentNodeTable.c.id == child.c.parent_id,
-        )
-    )
+    trans = connection.begin()
 
-    # Go from the deepest level to the shallowest
-    for level in range(node_depth, 0, -1):
+    cursor = connection.connection.cursor()
 
-        logger.info(
-            "Annotating ContentNode objects with children for level {level}".format(
-                level=level
-            )
-        )
-        # Only modify topic availability here
-        connection.execute(
-            ContentNodeTable.update()
-            .where(
-                and_(
-                    ContentNodeTable.c.level == level - 1,
-                    ContentNodeTable.c.channel_id == channel_id,
-                    ContentNodeTable.c.kind == content_kinds.TOPIC,
-                )
-            )
-            # Because we have set availability to False on all topics as a starting point
-            # we only need to make updates to topics with available children.
-            .where(exists(available_nodes))
-            .values(
-                available=exists(available_nodes),
-                coach_content=coach_content_nodes,
-                num_coach_contents=coach_content_num,
-            )
-        )
+    for i in range(0, len(params), CHUNKSIZE):
+        cursor.executemany(str(update_statement), params[i : i + CHUNKSIZE])
+
+    cursor.close()
 
     # commit the transaction
     trans.commit()
@@ -313,20 +520,28 @@ def recurse_annotation_up_tree(channel_id):
     bridge.end()
 
 
-def update_content_metadata(channel_id):
-    set_leaf_node_availability_from_local_file_availability(channel_id)
-    recurse_annotation_up_tree(channel_id)
+def update_content_metadata(channel_id, checksums=None):
+    from kolibri.core.logger.utils.topic_progress import delete_topic_progress_rollups
+
+    set_leaf_node_availability_from_local_file_availability(
+        channel_id, checksums=checksums
+    )
+    recurse_annotation_up_tree(channel_id, checksums=checksums)
     calculate_channel_fields(channel_id)
+    # The resources available in the channel's topics may have changed
+    delete_topic_progress_rollups(channel_id)
     ContentCacheKey.update_cache_key()
 
 
-def annotate_content(channel_id, checksums=None):
+def annotate_content(channel_id, checksums=None, storage_manifest=None):
     if checksums is None:
-        set_local_file_availability_from_disk()
+        set_local_file_availability_from_disk(storage_manifest=storage_manifest)
     else:
         mark_local_files_as_available(checksums)
 
-    update_content_metadata(channel_id)
+    # Only the files with the passed checksums can have changed availability,
+    # so only update their nodes and ancestors
+    update_content_metadata(channel_id, checksums=checksums)
 
 
 def calculate_channel_fields(channel_id):
@@ -9,6 +9,8 @@ from sqlalchemy.sql import text
 from .annotation import update_content_metadata
 from .channels import read_channel_metadata_from_db_file
 from .paths import get_content_database_file_path
+from .search import update_search_index
+from .search import update_search_tokens
 from .sqlalchemybridge import Bridge
 from .sqlalchemybridge import ClassNotFoundError
 from kolibri.core.content.apps import KolibriContentConfig
@@ -36,7 +38,9 @@ merge_models = [ContentTag, LocalFile, Language]
 models_not_to_overwrite = [LocalFile]
 
 models_to_exclude = [
-    apps.get_model(CONTENT_APP_NAME, "ChannelMetadata_included_languages")
+    apps.get_model(CONTENT_APP_NAME, "ChannelMetadata_included_languages"),
+    # Search tokens are generated locally after import
+    apps.get_model(CONTENT_APP_NAME, "SearchToken"),
 ]
 
 
@@ -79,6 +83,13 @@ class ChannelImport(object):
     current_model_being_imported = None
     _sqlite_db_attached = False
 
+    # The tree_id of the older version of the channel being updated in place, if the update is done by
+    # only writing the rows that differ between the versions
+    diff_tree_id = None
+
+    # The temporary table holding the ids of the nodes in the older version of the channel being updated in place
+    diff_scope_table = "temp.diff_import_scope"
+
     # Specific instructions and exceptions for importing table from previous versions of Kolibri
     # Mappings can be:
     # 1) 'per_row', specifying mappings for an entire row, string can either be an attribute
@@ -103,12 +114,18 @@ class ChannelImport(object):
         File: {"per_row": {"available": "default_to_not_available"}},
     }
 
-    def __init__(self, channel_id, channel_version=None, cancel_check=None):
+    def __init__(
+        self, channel_id, channel_version=None, cancel_check=None, progress_update=None
+    ):
         self.channel_id = channel_id
         self.channel_version = channel_version
 
         self.cancel_check = cancel_check
 
+        # called with the counts of rows written so far when updating an older version of the channel
+        self.progress_update = progress_update
+        self.diff_counts = {"inserted": 0, "updated": 0, "deleted": 0}
+
         self.source_db_path = get_content_database_file_path(self.channel_id)
 
         self.source = Bridge(sqlite_file_path=self.source_db_path)
@@ -245,12 +262,11 @@ class ChannelImport(object):
         # If we got here, there is an invalid table mapping
         raise AttributeError("Table mapping specified but no valid method found")
 
-    def raw_attached_sqlite_table_import(
-        self, model, row_mapper, table_mapper, unflushed_rows
-    ):
-
-        self.check_cancelled()
-
+    def get_attached_sqlite_columns(self, model):
+        """
+        Get the destination table for model, the columns to write into it, and for each column, the constant
+        value or source table column reference to write, for importing from the attached source database.
+        """
         source_table = self.source.get_table(model)
         dest_table = self.destination.get_table(model)
 
@@ -302,6 +318,16 @@ class ChannelImport(object):
                 val = convert_to_sqlite_value(model._meta.get_field(col).get_default())
             source_vals.append(val)
 
+        return dest_table, dest_columns, source_vals
+
+    def raw_attached_sqlite_table_import(
+        self, model, row_mapper, table_mapper, unflushed_rows
+    ):
+
+        self.check_cancelled()
+
+        dest_table, dest_columns, source_vals = self.get_attached_sqlite_columns(model)
+
         if model in models_not_to_overwrite:
             method = "INSERT OR IGNORE"
         else:
@@ -319,6 +345,173 @@ class ChannelImport(object):
         # no need to flush/commit as a result of the transfer in this method
         return 1
 
+    def get_diff_scope(self, model):
+        """
+        Get a condition that selects the rows of model in the destination database that belong to
+        the version of the channel being updated, or None if there is no way to select them.
+        """
+        if model is ContentNode:
+            return "tree_id = {tree_id}".format(tree_id=self.diff_tree_id)
+        for field in model._meta.fields:
+            if (
+                isinstance(field, ForeignKey)
+                and field.target_field.model is ContentNode
+            ):
+                # scoped by the nodes of the older version, rather than by the current nodes of the tree,
+                # so that rows belonging to nodes that have already been deleted are still found
+                return "{fk_field} IN (SELECT id FROM {scope_table})".format(
+                    fk_field=field.column, scope_table=self.diff_scope_table
+                )
+        return None
+
+    def create_diff_scope_table(self):
+        """
+        Record the ids of the nodes in the older version of the channel before any rows are written,
+        as nodes that are not in the new version are deleted before the rows of the tables that
+        foreign key onto them are updated.
+        """
+        self.drop_diff_scope_table()
+        self.destination.session.execute(
+            text(
+                "CREATE TABLE {scope_table} (id CHAR(32) PRIMARY KEY)".format(
+                    scope_table=self.diff_scope_table
+                )
+            )
+        )
+        self.destination.session.execute(
+            text(
+                "INSERT INTO {scope_table} SELECT id FROM {cn_table} WHERE tree_id = {tree_id}".format(
+                    scope_table=self.diff_scope_table,
+                    cn_table=ContentNode._meta.db_table,
+                    tree_id=self.diff_tree_id,
+                )
+            )
+        )
+
+    def drop_diff_scope_table(self):
+        # temporary tables last as long as the connection, which may be reused for a later import
+        if self.diff_tree_id is not None:
+            self.destination.session.execute(
+                text(
+                    "DROP TABLE IF EXISTS {scope_table}".format(
+                        scope_table=self.diff_scope_table
+                    )
+                )
+            )
+
+    def can_use_diff_import(self):
+        """
+        Check whether an older version of the channel can be updated by writing only the rows that differ,
+        which requires the source database to be attached, and every table to be importable from it.
+        """
+        if not self._sqlite_db_attached:
+            return False
+        for model in self.content_models:
+            if model in merge_models:
+                continue
+            mapping = self.schema_mapping.get(model, {})
+            row_mapper = self.generate_row_mapper(mapping.get("per_row"))
+            table_mapper = self.generate_table_mapper(mapping.get("per_table"))
+            if not self.can_use_sqlite_attach_method(
+                model, row_mapper, table_mapper
+            ) or (self.get_diff_scope(model) is None):
+                return False
+        return True
+
+    def _execute_count(self, query):
+        return self.destination.session.execute(text(query)).scalar()
+
+    def _execute_write(self, query):
+        return self.destination.session.execute(text(query)).rowcount
+
+    def diff_attached_sqlite_table_import(self, model):
+        """
+        Update the rows of model for the older version of the channel in the destination database to match
+        the source database, only writing the rows that have been added, changed or removed.
+        Rows are compared by the columns that are copied from the source, so that values set locally,
+        such as availability, do not make every row differ. The comparisons are done by SQLite itself,
+        across the attached databases, so the rows are never loaded into memory.
+        """
+        self.check_cancelled()
+
+        dest_table, dest_columns, source_vals = self.get_attached_sqlite_columns(model)
+        compared_columns = [
+            col for col, val in zip(dest_columns, source_vals) if val == "source." + col
+        ]
+        params = {
+            "table": dest_table.name,
+            "scope": self.get_diff_scope(model),
+            "destcols": ", ".join(dest_columns),
+            "sourcevals": ", ".join(source_vals),
+            "comparecols": ", ".join(compared_columns),
+            "pk": model._meta.pk.column,
+        }
+
+        if params["pk"] in dest_columns:
+            inserted = self._execute_count(
+                """SELECT COUNT(*) FROM sourcedb.{table} AS source
+                    WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {table}.{pk} = source.{pk})""".format(
+                    **params
+                )
+            )
+            changed = self._execute_write(
+                """REPLACE INTO {table} ({destcols}) SELECT {sourcevals} FROM sourcedb.{table} AS source
+                    WHERE source.{pk} IN (
+                        SELECT {pk} FROM (
+                            SELECT {comparecols} FROM sourcedb.{table}
+                            EXCEPT
+                            SELECT {comparecols} FROM {table} WHERE {scope}
+                        )
+                    )""".format(
+                    **params
+                )
+            )
+            updated = changed - inserted
+            self.check_cancelled()
+            deleted = self._execute_write(
+                """DELETE FROM {table} WHERE {scope}
+                    AND {pk} NOT IN (SELECT {pk} FROM sourcedb.{table})""".format(
+                    **params
+                )
+            )
+        else:
+            # rows with auto-incrementing ids, as in the tables for ManyToMany fields, can only be
+            # told apart by all of their other values, so they are only ever inserted or deleted
+            params["match_source"] = " AND ".join(
+                "source.{col} IS {table}.{col}".format(col=col, table=dest_table.name)
+                for col in compared_columns
+            )
+            inserted = self._execute_write(
+                """INSERT INTO {table} ({destcols}) SELECT {sourcevals} FROM sourcedb.{table} AS source
+                    WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {match_source})""".format(
+                    **params
+                )
+            )
+            updated = 0
+            self.check_cancelled()
+            deleted = self._execute_write(
+                """DELETE FROM {table} WHERE {scope}
+                    AND NOT EXISTS (SELECT 1 FROM sourcedb.{table} AS source WHERE {match_source})""".format(
+                    **params
+                )
+            )
+
+        self.diff_counts["inserted"] += inserted
+        self.diff_counts["updated"] += updated
+        self.diff_counts["deleted"] += deleted
+        logger.info(
+            "Updated {model} data: {inserted} inserted, {updated} updated, {deleted} deleted".format(
+                model=model.__name__,
+                inserted=inserted,
+                updated=updated,
+                deleted=deleted,
+            )
+        )
+        if callable(self.progress_update):
+            self.progress_update(
+                0, extra_data=dict(channel_id=self.channel_id, **self.diff_counts)
+            )
+
     def orm_table_import(self, model, row_mapper, table_mapper, unflushed_rows):
         DestinationRecord = self.destination.get_class(model)
         dest_table = self.destination.get_table(model)
@@ -406,7 +599,10 @@ class ChannelImport(object):
         # keep track of which model is currently being imported
         self.current_model_being_imported = model
 
-        if self.can_use_sqlite_attach_method(model, row_mapper, table_mapper):
+        if self.diff_tree_id is not None and model not in merge_models:
+            self.diff_attached_sqlite_table_import(model)
+            result = unflushed_rows
+        elif self.can_use_sqlite_attach_method(model, row_mapper, table_mapper):
             result = self.raw_attached_sqlite_table_import(
                 model, row_mapper, table_mapper, unflushed_rows
             )
@@ -457,7 +653,13 @@ class ChannelImport(object):
                         new_channel_version=self.channel_version,
                     )
                 )
-                self.delete_old_channel_data(existing_channel.root.tree_id)
+                if self.can_use_diff_import():
+                    # only write the differences between the versions, into the existing tree
+                    self.diff_tree_id = existing_channel.root.tree_id
+                    self.available_tree_id = self.diff_tree_id
+                    self.create_diff_scope_table()
+                else:
+                    self.delete_old_channel_data(existing_channel.root.tree_id)
             else:
                 # We have previously loaded this channel, with the same or newer version, so our work here is done
                 logger.warn(
@@ -586,12 +788,14 @@ class ChannelImport(object):
                     unflushed_rows = self.table_import(
                         model, row_mapper, table_mapper, unflushed_rows
                     )
+            self.drop_diff_scope_table()
             self.destination.session.commit()
             self.try_detaching_sqlite_database()
 
         except (SQLAlchemyError, ImportCancelError) as e:
             # Rollback the transaction if any error occurs during the transaction
             self.destination.session.rollback()
+            self.drop_diff_scope_table()
             self.try_detaching_sqlite_database()
             # Reraise the exception to prevent other errors occuring due to the non-completion
             raise e
@@ -721,7 +925,7 @@ class InvalidSchemaVersionError(Exception):
     pass
 
 
-def initialize_import_manager(channel_id, cancel_check=None):
+def initialize_import_manager(channel_id, cancel_check=None, progress_update=None):
     channel_metadata = read_channel_metadata_from_db_file(
         get_content_database_file_path(channel_id)
     )
@@ -757,12 +961,17 @@ def initialize_import_manager(channel_id, cancel_check=None):
                 )
             )
     return ImportClass(
-        channel_id, channel_version=channel_metadata.version, cancel_check=cancel_check
+        channel_id,
+        channel_version=channel_metadata.version,
+        cancel_check=cancel_check,
+        progress_update=progress_update,
     )
 
 
-def import_channel_from_local_db(channel_id, cancel_check=None):
-    import_manager = initialize_import_manager(channel_id, cancel_check=cancel_check)
+def import_channel_from_local_db(channel_id, cancel_check=None, progress_update=None):
+    import_manager = initialize_import_manager(
+        channel_id, cancel_check=cancel_check, progress_update=progress_update
+    )
 
     import_manager.import_channel_data()
 
@@ -770,6 +979,10 @@ def import_channel_from_local_db(channel_id, cancel_check=None):
 
     update_content_metadata(channel_id)
 
+    update_search_index(channel_id)
+
+    update_search_tokens(channel_id)
+
     channel = ChannelMetadata.objects.get(id=channel_id)
     channel.last_updated = local_now()
     try:
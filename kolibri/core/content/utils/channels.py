@@ -1,8 +1,11 @@
 import fnmatch
 import logging
 import os
+import threading
 
 from django.core.cache import cache
+from django.db import connection
+from django.db import IntegrityError
 from sqlalchemy.exc import DatabaseError
 
 from .paths import get_content_database_dir_path
@@ -94,34 +97,94 @@ def read_channel_metadata_from_db_file(channeldbpath):
     return source_channel_metadata
 
 
-def get_channels_for_data_folder(datafolder):
+def _read_channel_data(path):
+    try:
+        channel = read_channel_metadata_from_db_file(path)
+    except DatabaseError:
+        logger.warning(
+            "Tried to import channel from database file {}, but the file was corrupted.".format(
+                path
+            )
+        )
+        return None
+    return {
+        "path": path,
+        "id": channel.id,
+        "name": channel.name,
+        "description": channel.description,
+        "thumbnail": channel.thumbnail,
+        "version": channel.version,
+        "root": channel.root_id,
+        "author": channel.author,
+        "last_updated": getattr(channel, "last_updated", None),
+        "lang_code": getattr(channel, "lang_code", None),
+        "lang_name": getattr(channel, "lang_name", None),
+    }
+
+
+def _update_catalog_entry(drive_id, path, stat, channel):
+    from kolibri.core.discovery.models import DriveChannelCatalogEntry
+
+    defaults = {"size": stat.st_size, "modified": stat.st_mtime, "channel": channel}
+    try:
+        DriveChannelCatalogEntry.objects.update_or_create(
+            drive_id=drive_id, path=path, defaults=defaults
+        )
+    except IntegrityError:
+        # the file was cataloged at the same time by another thread, such as the
+        # background refresh, so update the entry that it created instead
+        DriveChannelCatalogEntry.objects.update_or_create(
+            drive_id=drive_id, path=path, defaults=defaults
+        )
+
+
+def _get_channels_from_catalog(drive_id, paths):
+    """
+    Get the channel data of the content database files at paths, on the drive with drive_id,
+    only reading the files that are not in the catalog, or have changed since they were read.
+    """
+    from kolibri.core.discovery.models import DriveChannelCatalogEntry
+
+    entries = {
+        entry.path: entry
+        for entry in DriveChannelCatalogEntry.objects.filter(drive_id=drive_id)
+    }
     channels = []
-    for path in enumerate_content_database_file_paths(
-        get_content_database_dir_path(datafolder)
-    ):
+    for path in paths:
         try:
-            channel = read_channel_metadata_from_db_file(path)
-        except DatabaseError:
-            logger.warning(
-                "Tried to import channel from database file {}, but the file was corrupted.".format(
-                    path
-                )
-            )
+            stat = os.stat(path)
+        except OSError:
             continue
-        channel_data = {
-            "path": path,
-            "id": channel.id,
-            "name": channel.name,
-            "description": channel.description,
-            "thumbnail": channel.thumbnail,
-            "version": channel.version,
-            "root": channel.root_id,
-            "author": channel.author,
-            "last_updated": getattr(channel, "last_updated", None),
-            "lang_code": getattr(channel, "lang_code", None),
-            "lang_name": getattr(channel, "lang_name", None),
-        }
-        channels.append(channel_data)
+        entry = entries.pop(path, None)
+        if entry and entry.size == stat.st_size and entry.modified == stat.st_mtime:
+            channel = entry.channel
+        else:
+            channel = _read_channel_data(path)
+            _update_catalog_entry(drive_id, path, stat, channel)
+        if channel is not None:
+            channels.append(channel)
+    # the remaining entries are for files that are no longer on the drive
+    DriveChannelCatalogEntry.objects.filter(
+        drive_id=drive_id, path__in=list(entries)
+    ).delete()
+    return channels
+
+
+def get_channels_for_data_folder(datafolder, drive_id=None):
+    """
+    Get the channel data of the content databases in datafolder. If the datafolder is on a drive,
+    given by drive_id, the channel data is kept in a catalog, so that unchanged databases are not read again.
+    """
+    paths = enumerate_content_database_file_paths(
+        get_content_database_dir_path(datafolder)
+    )
+    if drive_id is not None:
+        return _get_channels_from_catalog(drive_id, paths)
+    channels = []
+    for path in paths:
+        channel = _read_channel_data(path)
+        if channel is not None:
+            channels.append(channel)
     return channels
 
 
@@ -134,12 +197,70 @@ def get_mounted_drives_with_channel_info():
     drives = enumerate_mounted_disk_partitions()
     for drive in drives.values():
         drive.metadata["channels"] = (
-            get_channels_for_data_folder(drive.datafolder) if drive.datafolder else []
+            get_channels_for_data_folder(drive.datafolder, drive_id=drive.id)
+            if drive.datafolder
+            else []
         )
     cache.set(MOUNTED_DRIVES_CACHE_KEY, drives, 3600)
     return drives
 
 
+_catalog_refresh_lock = threading.Lock()
+
+
+def _refresh_drive_channel_catalog():
+    try:
+        get_mounted_drives_with_channel_info()
+    except Exception:
+        logger.exception("Failed to refresh the catalog of channels on drives")
+    finally:
+        # this runs on its own thread, so close the database connection it opened
+        connection.close()
+        _catalog_refresh_lock.release()
+
+
+def start_drive_channel_catalog_refresh():
+    """
+    Update the catalog of channels on drives in a background thread, unless an update is already running.
+    """
+    if _catalog_refresh_lock.acquire(False):
+        thread = threading.Thread(target=_refresh_drive_channel_catalog)
+        thread.daemon = True
+        thread.start()
+
+
+def get_mounted_drives_with_cataloged_channel_info():
+    """
+    Get the mounted drives, with the channels last found on them, so that the drives can be listed without
+    waiting for their content databases to be read. The catalog is updated in the background for next time.
+    Drives that are not in the catalog yet have their content databases read now.
+    """
+    from kolibri.core.discovery.models import DriveChannelCatalogEntry
+
+    drives = enumerate_mounted_disk_partitions()
+    cataloged_channels = {}
+    # fetch the entries as objects, as the channel data is only decoded from JSON for those
+    for entry in DriveChannelCatalogEntry.objects.filter(
+        drive_id__in=list(drives)
+    ).only("drive_id", "channel"):
+        channels = cataloged_channels.setdefault(entry.drive_id, [])
+        if entry.channel is not None:
+            channels.append(entry.channel)
+    for drive in drives.values():
+        if not drive.datafolder:
+            drive.metadata["channels"] = []
+        elif drive.id in cataloged_channels:
+            drive.metadata["channels"] = cataloged_channels[drive.id]
+        else:
+            drive.metadata["channels"] = get_channels_for_data_folder(
+                drive.datafolder, drive_id=drive.id
+            )
+    if cataloged_channels:
+        start_drive_channel_catalog_refresh()
+    cache.set(MOUNTED_DRIVES_CACHE_KEY, drives, 3600)
+    return drives
+
+
 def get_mounted_drive_by_id(drive_id):
     drives = cache.get(MOUNTED_DRIVES_CACHE_KEY)
     if drives is None or drives.get(drive_id, None) is None:
@@ -0,0 +1,66 @@
+"""
+A manifest of the content files present on an external drive, so that whether the
+resources in a channel can be imported from the drive can be checked without a
+filesystem call for every file, which is slow on the removable media drives use.
+
+The manifest is built by a single listing of the content storage folder of the drive,
+and kept in memory for a short time, keyed by the identity of that folder, so that
+a different drive mounted at the same path is never checked against a stale manifest.
+"""
+import os
+import threading
+import time
+
+from kolibri.core.content.utils.paths import get_content_dir_path
+from kolibri.core.content.utils.storage_scan import scan_content_storage
+
+# How long, in seconds, a manifest is used for before the drive is listed again
+DRIVE_MANIFEST_TIMEOUT = 300
+
+_manifest_cache = {}
+_manifest_cache_lock = threading.Lock()
+
+
+def _get_storage_dir_key(storage_dir):
+    try:
+        stat = os.stat(storage_dir)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino, stat.st_mtime)
+
+
+def build_drive_file_manifest(storage_dir):
+    """
+    List a content storage folder, returning the set of filenames in it that are
+    stored where Kolibri would look for them, in folders named by their first two characters.
+    """
+    return scan_content_storage(storage_dir)
+
+
+def get_drive_file_manifest(drive_id, datafolder):
+    """
+    Get the, possibly cached, set of the names of the content files stored in datafolder,
+    the data folder of the external drive with drive_id.
+    """
+    storage_dir = os.path.join(get_content_dir_path(datafolder), "storage")
+    key = (drive_id, os.path.realpath(storage_dir))
+    storage_dir_key = _get_storage_dir_key(storage_dir)
+    now = time.time()
+    with _manifest_cache_lock:
+        cached = _manifest_cache.get(key)
+    if cached is not None:
+        expiry, cached_storage_dir_key, manifest = cached
+        if expiry > now and cached_storage_dir_key == storage_dir_key:
+            return manifest
+    if storage_dir_key is None:
+        manifest = frozenset()
+    else:
+        manifest = build_drive_file_manifest(storage_dir)
+    with _manifest_cache_lock:
+        _manifest_cache[key] = (now + DRIVE_MANIFEST_TIMEOUT, storage_dir_key, manifest)
+    return manifest
+
+
+def clear_drive_file_manifest_cache():
+    with _manifest_cache_lock:
+        _manifest_cache.clear()
@@ -1,5 +1,3 @@
-import hashlib
-
 from django.db.models import Sum
 from le_utils.constants import content_kinds
 from requests.exceptions import ChunkedEncodingError
@@ -138,11 +136,9 @@ def retry_import(e, **kwargs):
         raise e
 
 
-def compare_checksums(file_name, file_id):
-    hasher = hashlib.md5()
-    with open(file_name, "rb") as f:
-        # Read chunks of 4096 bytes for memory efficiency
-        for chunk in iter(lambda: f.read(4096), b""):
-            hasher.update(chunk)
-    checksum = hasher.hexdigest()
-    return checksum == file_id
+def compare_checksums(filetransfer, file_id):
+    """
+    Check that the MD5 checksum of a completed transfer matches the file id, using the checksum
+    calculated while the file was transferred, rather than reading the file from disk again.
+    """
+    return filetransfer.checksum == file_id
@@ -1,8 +1,59 @@
+"""
+Utilities for searching content nodes.
+
+Content node titles and descriptions are copied into a full text search index when a
+channel is imported, so that the search API can look up matching nodes with index queries
+rather than scanning the ContentNode table with LIKE '%...%' for each search term.
+
+On SQLite the index is an FTS5 virtual table, on PostgreSQL it is a table holding a
+weighted tsvector with a GIN index. If the index could not be created (for example,
+because the SQLite library in use was compiled without FTS5) then search_index_exists
+will return False and callers should fall back to unindexed queries.
+
+For misspelling tolerant searches, the words of node titles and descriptions are also
+stemmed and double metaphoned (see fuzz) into SearchToken rows, which are looked up
+by exact token matches.
+"""
+from __future__ import unicode_literals
+
+import logging
+import re
+import uuid
+
+from django.apps import apps as django_apps
+from django.db import connection
+from django.db.models import Count
+from django.db.utils import DatabaseError
 from metaphone import doublemetaphone
 from porter2stemmer import Porter2Stemmer
 
+from .stopwords import stopwords_set
+from kolibri.core.content.models import SearchToken
+
+logger = logging.getLogger(__name__)
+
 stemmer = Porter2Stemmer()
 
+SEARCH_INDEX_TABLE = "content_searchindex"
+
+CONTENTNODE_TABLE = "content_contentnode"
+
+TITLE = "title"
+
+DESCRIPTION = "description"
+
+# Relative weight of a match in a title compared to a match in a description,
+# used to order results that fall within the same relevance tier.
+TITLE_WEIGHT = 10.0
+
+DESCRIPTION_WEIGHT = 1.0
+
+# Number of SearchToken objects to create in each query
+TOKEN_BATCH_SIZE = 1000
+
+# Whether the search index table exists, for each database alias
+_search_index_exists = {}
+
 
 def fuzz(text):
     """
@@ -11,3 +62,339 @@ def fuzz(text):
     """
     processed_tokens = [doublemetaphone(stemmer.stem(word)) for word in text.split()]
     return [token for token in sum(processed_tokens, ()) if token]
+
+
+def get_search_tokens(text):
+    """
+    Return the set of fuzzed tokens for the non stopwords in the passed in String.
+    """
+    words = [word for word in _tokens(text) if word not in stopwords_set]
+    max_length = SearchToken._meta.get_field("token").max_length
+    return set(token[:max_length] for token in fuzz(" ".join(words)))
+
+
+def delete_search_tokens(channel_id, apps=django_apps):
+    SearchToken = apps.get_model("content", "SearchToken")
+    SearchToken.objects.filter(channel_id=channel_id).delete()
+
+
+def update_search_tokens(channel_id, apps=django_apps):
+    """
+    (Re)generate the fuzzed search tokens for all the nodes of a channel.
+    The models are looked up from apps, so that this can also be used in migrations.
+    """
+    ContentNode = apps.get_model("content", "ContentNode")
+    SearchToken = apps.get_model("content", "SearchToken")
+    logger.info("Generating search tokens for channel {}".format(channel_id))
+    delete_search_tokens(channel_id, apps=apps)
+    nodes = (
+        ContentNode.objects.filter(channel_id=channel_id)
+        .order_by()
+        .values_list("id", "title", "description")
+    )
+    search_tokens = []
+    for node_id, title, description in nodes.iterator():
+        for token in get_search_tokens("{} {}".format(title, description or "")):
+            search_tokens.append(
+                SearchToken(contentnode_id=node_id, channel_id=channel_id, token=token)
+            )
+        if len(search_tokens) >= TOKEN_BATCH_SIZE:
+            SearchToken.objects.bulk_create(search_tokens)
+            search_tokens = []
+    SearchToken.objects.bulk_create(search_tokens)
+
+
+def search_content_nodes_by_tokens(tokens):
+    """
+    Look up available nodes with any of the passed fuzzed tokens.
+    Returns a list of dicts with the id, content_id, channel_id and kind of each matching node,
+    ordered by the number of distinct tokens that the node matches.
+    """
+    if not tokens:
+        return []
+    matches = (
+        SearchToken.objects.filter(token__in=tokens, contentnode__available=True)
+        .values(
+            "contentnode_id",
+            "contentnode__content_id",
+            "contentnode__channel_id",
+            "contentnode__kind",
+        )
+        .annotate(score=Count("token", distinct=True))
+        .order_by("-score", "contentnode__lft")
+    )
+    return [
+        {
+            "id": match["contentnode_id"],
+            "content_id": match["contentnode__content_id"],
+            "channel_id": match["contentnode__channel_id"],
+            "kind": match["contentnode__kind"],
+        }
+        for match in matches
+    ]
+
+
+def search_index_exists(connection=connection):
+    """
+    Check whether the search index table has been created in the database of connection.
+    """
+    if connection.alias not in _search_index_exists:
+        with connection.cursor() as cursor:
+            _search_index_exists[
+                connection.alias
+            ] = SEARCH_INDEX_TABLE in connection.introspection.table_names(cursor)
+    return _search_index_exists[connection.alias]
+
+
+def create_search_index(connection=connection):
+    """
+    Create the search index table, if the database of connection supports it.
+    Returns True if the table exists after this call.
+    """
+    if connection.vendor == "sqlite":
+        statements = [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            "id UNINDEXED, channel_id, title, description)".format(
+                table=SEARCH_INDEX_TABLE
+            )
+        ]
+    elif connection.vendor == "postgresql":
+        statements = [
+            "CREATE TABLE IF NOT EXISTS {table} ("
+            "id uuid PRIMARY KEY, channel_id uuid NOT NULL, document tsvector)".format(
+                table=SEARCH_INDEX_TABLE
+            ),
+            "CREATE INDEX IF NOT EXISTS {table}_channel_id ON {table} (channel_id)".format(
+                table=SEARCH_INDEX_TABLE
+            ),
+            "CREATE INDEX IF NOT EXISTS {table}_document ON {table} USING GIN (document)".format(
+                table=SEARCH_INDEX_TABLE
+            ),
+        ]
+    else:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    except DatabaseError as e:
+        logger.warning("Could not create content search index: {}".format(e))
+        _search_index_exists[connection.alias] = False
+        return False
+    _search_index_exists[connection.alias] = True
+    return True
+
+
+def delete_search_index(channel_id, connection=connection):
+    """
+    Remove all entries for the nodes of a channel from the search index.
+    """
+    if not search_index_exists(connection):
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            # channel_id is an indexed column, so use the index to find the rows to delete
+            cursor.execute(
+                "DELETE FROM {table} WHERE rowid IN "
+                "(SELECT rowid FROM {table} WHERE {table} MATCH %s)".format(
+                    table=SEARCH_INDEX_TABLE
+                ),
+                ['channel_id : "{}"'.format(_hex(channel_id))],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                "DELETE FROM {table} WHERE channel_id = %s".format(
+                    table=SEARCH_INDEX_TABLE
+                ),
+                [_hex(channel_id)],
+            )
+
+
+def update_search_index(channel_id, connection=connection):
+    """
+    (Re)build the search index entries for all the nodes of a channel.
+    The connection can be passed in, so that this can also be used in migrations.
+    """
+    if not search_index_exists(connection):
+        return
+    logger.info("Building search index for channel {}".format(channel_id))
+    delete_search_index(channel_id, connection)
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "INSERT INTO {table} (id, channel_id, title, description) "
+                "SELECT id, channel_id, title, description FROM {cn_table} "
+                "WHERE channel_id = %s".format(
+                    table=SEARCH_INDEX_TABLE, cn_table=CONTENTNODE_TABLE
+                ),
+                [_hex(channel_id)],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                "INSERT INTO {table} (id, channel_id, document) "
+                "SELECT id, channel_id, "
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(description, '')), 'B') "
+                "FROM {cn_table} WHERE channel_id = %s".format(
+                    table=SEARCH_INDEX_TABLE, cn_table=CONTENTNODE_TABLE
+                ),
+                [_hex(channel_id)],
+            )
+
+
+def _hex(value):
+    if isinstance(value, uuid.UUID):
+        return value.hex
+    return value
+
+
+def _tokens(word):
+    return re.findall(r"\w+", word.lower(), re.UNICODE)
+
+
+def get_search_tiers(all_words, critical_words):
+    """
+    Return a list of (field, words) tuples, ordered by relevance priority.
+    A node matches a tier if all of the words appear in that field.
+    """
+    all_words = [w for w in all_words if _tokens(w)]
+    critical_words = [w for w in critical_words if _tokens(w)]
+    by_length = sorted(critical_words, key=len, reverse=True)
+    tiers = [
+        # all words in title
+        (TITLE, all_words),
+        # all critical words in title
+        (TITLE, critical_words),
+        # all words in description
+        (DESCRIPTION, all_words),
+        # all critical words in description
+        (DESCRIPTION, critical_words),
+    ]
+    # any critical word in title, reverse-sorted by word length
+    tiers += [(TITLE, [w]) for w in by_length]
+    # any critical word in description, reverse-sorted by word length
+    tiers += [(DESCRIPTION, [w]) for w in by_length]
+    # only keep tiers that are meaningful
+    return [(field, words) for field, words in tiers if words]
+
+
+def _sqlite_match(field, words):
+    terms = " AND ".join('"{}"*'.format(w.replace('"', '""')) for w in words)
+    return "{field} : ({terms})".format(field=field, terms=terms)
+
+
+POSTGRES_WEIGHTS = {TITLE: "A", DESCRIPTION: "B"}
+
+
+def _postgres_match(field, words):
+    terms = []
+    for word in words:
+        lexemes = [
+            "{token}:*{weight}".format(token=token, weight=POSTGRES_WEIGHTS[field])
+            for token in _tokens(word)
+        ]
+        terms.append("({})".format(" & ".join(lexemes)))
+    return " & ".join(terms)
+
+
+def _get_matcher():
+    if connection.vendor == "sqlite":
+        return _sqlite_match, " OR "
+    if connection.vendor == "postgresql":
+        return _postgres_match, " | "
+    raise NotImplementedError(
+        "Search index not supported for {}".format(connection.vendor)
+    )
+
+
+def get_match_expression(tiers):
+    """
+    Return a single match expression that matches a node in any of the passed tiers.
+    """
+    match, disjunction = _get_matcher()
+    return disjunction.join("({})".format(match(*tier)) for tier in tiers)
+
+
+def search_content_nodes(tiers):
+    """
+    Query the search index for available nodes matching any of the tiers.
+    Returns a list of dicts with the id, content_id, channel_id and kind of each matching node,
+    ordered by the first tier that the node matches, then by the weighted relevance of the match.
+    """
+    if not tiers:
+        return []
+    match, _ = _get_matcher()
+    matches = [match(*tier) for tier in tiers]
+    params = []
+    cases = []
+    if connection.vendor == "sqlite":
+        for i, expression in enumerate(matches):
+            cases.append(
+                "WHEN {table}.rowid IN (SELECT rowid FROM {table} WHERE {table} MATCH %s) "
+                "THEN {tier}".format(table=SEARCH_INDEX_TABLE, tier=i)
+            )
+            params.append(expression)
+        where = "{table} MATCH %s".format(table=SEARCH_INDEX_TABLE)
+        # bm25 returns lower values for better matches
+        rank = "bm25({table}, 0.0, 0.0, {title}, {description})".format(
+            table=SEARCH_INDEX_TABLE, title=TITLE_WEIGHT, description=DESCRIPTION_WEIGHT
+        )
+        params += [get_match_expression(tiers), True]
+    else:
+        for i, expression in enumerate(matches):
+            cases.append(
+                "WHEN {table}.document @@ to_tsquery('simple', %s) THEN {tier}".format(
+                    table=SEARCH_INDEX_TABLE, tier=i
+                )
+            )
+            params.append(expression)
+        where = "{table}.document @@ to_tsquery('simple', %s)".format(
+            table=SEARCH_INDEX_TABLE
+        )
+        # ts_rank weights are ordered D, C, B, A and must lie between 0 and 1
+        rank = "ts_rank('{{0.0, 0.0, {description}, 1.0}}', {table}.document, to_tsquery('simple', %s)) DESC".format(
+            table=SEARCH_INDEX_TABLE, description=DESCRIPTION_WEIGHT / TITLE_WEIGHT
+        )
+        expression = get_match_expression(tiers)
+        params += [expression, True, expression]
+
+    query = (
+        "SELECT node.id, node.content_id, node.channel_id, node.kind, "
+        "CASE {cases} END AS tier "
+        "FROM {table} INNER JOIN {cn_table} AS node ON node.id = {table}.id "
+        "WHERE {where} AND node.available = %s "
+        "ORDER BY tier, {rank}"
+    ).format(
+        cases=" ".join(cases),
+        table=SEARCH_INDEX_TABLE,
+        cn_table=CONTENTNODE_TABLE,
+        where=where,
+        rank=rank,
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        return [
+            {
+                "id": _hex(row[0]),
+                "content_id": _hex(row[1]),
+                "channel_id": _hex(row[2]),
+                "kind": row[3],
+            }
+            for row in cursor.fetchall()
+        ]
+
+
+def filter_by_search_index(queryset, tiers):
+    """
+    Filter a ContentNode queryset down to nodes matching any of the tiers in the search index.
+    """
+    expression = get_match_expression(tiers)
+    if connection.vendor == "sqlite":
+        where = "{cn_table}.id IN (SELECT id FROM {table} WHERE {table} MATCH %s)"
+    else:
+        where = "{cn_table}.id IN (SELECT id FROM {table} WHERE document @@ to_tsquery('simple', %s))"
+    return queryset.extra(
+        where=[where.format(cn_table=CONTENTNODE_TABLE, table=SEARCH_INDEX_TABLE)],
+        params=[expression],
+    )
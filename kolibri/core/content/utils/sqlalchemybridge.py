@@ -1,6 +1,7 @@
 import logging
 import os
 import pickle
+import threading
 
 from django.apps import apps
 from django.conf import settings
@@ -42,10 +43,38 @@ def sqlite_connection_string(db_path):
     return "sqlite:///{db_path}".format(db_path=os.path.normpath(db_path))
 
 
+# Engines, by connection string, for the process that created them
+_engines = {}
+_engines_pid = [None]
+_engines_lock = threading.Lock()
+
+# Schema versions of content database files, by the path, modification time and size of the file
+_schema_versions = {}
+
+
 def get_engine(connection_string):
     """
     Get a SQLAlchemy engine that allows us to connect to a database.
+    Engines are kept for reuse by the process that created them, as creating them,
+    and preparing the default database for use, is repeated for every Bridge.
     """
+    with _engines_lock:
+        if _engines_pid[0] != os.getpid():
+            # Engines must not be shared with a forked process, so start again
+            _engines.clear()
+            _engines_pid[0] = os.getpid()
+        engine = _engines.get(connection_string)
+        if engine is None:
+            engine = _engines[connection_string] = _create_engine(connection_string)
+    return engine
+
+
+def clear_engine_cache():
+    with _engines_lock:
+        _engines.clear()
+
+
+def _create_engine(connection_string):
     # Set echo to False, as otherwise we get full SQL Query outputted, which can overwhelm the terminal
     engine = create_engine(
         connection_string,
@@ -219,6 +248,44 @@ class SchemaNotFoundError(Exception):
     pass
 
 
+def _get_db_file_key(sqlite_file_path):
+    try:
+        stat = os.stat(sqlite_file_path)
+    except OSError:
+        return None
+    return (os.path.realpath(sqlite_file_path), stat.st_mtime, stat.st_size)
+
+
+def get_schema_version(sqlite_file_path, connection_string):
+    """
+    Find which of our historical database schemas the content database at sqlite_file_path matches.
+    The result is kept for as long as the file is unchanged, as the same databases are checked repeatedly,
+    for example when listing the channels on a drive.
+    """
+    key = _get_db_file_key(sqlite_file_path)
+    schema_version = _schema_versions.get(key)
+    if schema_version is not None:
+        return schema_version
+    # So we try each of our historical database schema in order to see
+    # which glass slipper fits! If none do, just turn into a pumpkin.
+    for version in CONTENT_DB_SCHEMA_VERSIONS:
+        session, engine = make_session(connection_string)
+        try:
+            db_matches_schema(BASES[version], session)
+            schema_version = version
+            break
+        except DBSchemaError as e:
+            logging.debug(e)
+        finally:
+            if hasattr(session, "close"):
+                session.close()
+    else:
+        raise SchemaNotFoundError("No matching schema found for this database")
+    if key is not None:
+        _schema_versions[key] = schema_version
+    return schema_version
+
+
 class Bridge(object):
     def __init__(self, sqlite_file_path=None, schema_version=None, app_name=None):
         if sqlite_file_path is None:
@@ -227,19 +294,10 @@ class Bridge(object):
             self.schema_version = schema_version or CURRENT_SCHEMA_VERSION
         else:
             # Otherwise, we are accessing an external content database.
-            # So we try each of our historical database schema in order to see
-            # which glass slipper fits! If none do, just turn into a pumpkin.
             self.connection_string = sqlite_connection_string(sqlite_file_path)
-            for version in CONTENT_DB_SCHEMA_VERSIONS:
-                self.schema_version = version
-                self.session, self.engine = make_session(self.connection_string)
-                try:
-                    db_matches_schema(BASES[self.schema_version], self.session)
-                    break
-                except DBSchemaError as e:
-                    logging.debug(e)
-            else:
-                raise SchemaNotFoundError("No matching schema found for this database")
+            self.schema_version = get_schema_version(
+                sqlite_file_path, self.connection_string
+            )
 
         self.Base = BASES[self.schema_version]
         # We are using scoped sessions, so should always return the same session
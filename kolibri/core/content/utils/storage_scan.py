@@ -0,0 +1,63 @@
+"""
+Listing of the files in a content storage folder, so that the availability of every LocalFile
+can be checked against a set of names in memory, rather than by a filesystem call per file.
+
+Files are stored in shard folders named by the first and second characters of their names,
+e.g. ``storage/a/b/ab12.mp4``, so each shard folder is listed once, with the shards listed in
+parallel, as listing many folders on slow disks is dominated by waiting on the disk.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from os import scandir
+except ImportError:
+    # os.scandir is only available in Python 3.5+
+    scandir = None
+
+# The number of shard folders to list at once
+STORAGE_SCAN_WORKERS = 8
+
+
+def _list_dirnames(path):
+    try:
+        return [name for name in os.listdir(path) if len(name) == 1]
+    except OSError:
+        return []
+
+
+def _list_shard(shard):
+    """
+    List the names of the files in a shard folder that belong in it.
+    """
+    path, prefix = shard
+    try:
+        if scandir is not None:
+            filenames = [entry.name for entry in scandir(path) if entry.is_file()]
+        else:
+            filenames = os.listdir(path)
+    except OSError:
+        return []
+    return [filename for filename in filenames if filename[:2] == prefix]
+
+
+def scan_content_storage(storage_dir, workers=STORAGE_SCAN_WORKERS):
+    """
+    Return the set of the names of the files stored where Kolibri would look for them in storage_dir.
+    """
+    shards = [
+        (os.path.join(storage_dir, first, second), first + second)
+        for first in _list_dirnames(storage_dir)
+        for second in _list_dirnames(os.path.join(storage_dir, first))
+    ]
+    if not shards:
+        return frozenset()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        return frozenset(
+            filename
+            for filenames in executor.map(_list_shard, shards)
+            for filename in filenames
+        )
+    finally:
+        executor.shutdown()
@@ -1,3 +1,5 @@
+import errno
+import hashlib
 import logging
 import os
 import shutil
@@ -24,6 +26,49 @@ class TransferNotYetClosed(Exception):
     pass
 
 
+def _copy_file_range(src_fd, dest_fd, offset, count):
+    return os.copy_file_range(src_fd, dest_fd, count, offset)
+
+
+def _sendfile(src_fd, dest_fd, offset, count):
+    return os.sendfile(dest_fd, src_fd, offset, count)
+
+
+# Ways of copying data between files in the kernel, without reading it into Python,
+# in order of preference, limited to those available in this Python on this platform.
+KERNEL_COPY_FUNCTIONS = [
+    function
+    for name, function in (
+        ("copy_file_range", _copy_file_range),
+        ("sendfile", _sendfile),
+    )
+    if hasattr(os, name)
+]
+
+# Errors raised when a way of copying is not supported for a particular pair of files,
+# for example when copying across filesystems, or when sendfile requires a socket.
+UNSUPPORTED_COPY_ERRNOS = {
+    getattr(errno, name)
+    for name in ("EXDEV", "ENOSYS", "EINVAL", "ENOTSUP", "EOPNOTSUPP", "ENOTSOCK")
+    if hasattr(errno, name)
+}
+
+
+class CopiedBlock(object):
+    """
+    Stands in for a block of data that was copied by the kernel, so was never read
+    into memory; only its length is available, for progress reporting.
+    """
+
+    __slots__ = ("size",)
+
+    def __init__(self, size):
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+
 class Transfer(object):
     def __init__(
         self,
@@ -32,16 +77,23 @@ class Transfer(object):
         block_size=2097152,
         remove_existing_temp_file=True,
         timeout=20,
+        resumable=False,
     ):
         self.source = source
         self.dest = dest
         self.dest_tmp = dest + ".transfer"
         self.block_size = block_size
         self.timeout = timeout
+        # Whether data from a previous, interrupted, transfer to the same destination
+        # can be kept and continued from, rather than transferring the whole file again.
+        # This is only safe for files whose content never changes for the same destination.
+        self.resumable = resumable
         self.started = False
         self.completed = False
         self.finalized = False
         self.closed = False
+        # MD5 of the data written so far, computed as the data streams through
+        self.hasher = hashlib.md5()
 
         # TODO (aron): Instead of using signals, have bbq/iceqube add
         # hooks that the app calls every so often to determine whether it
@@ -68,7 +120,7 @@ class Transfer(object):
         if os.path.isfile(self.dest_tmp):
             if remove_existing_temp_file:
                 os.remove(self.dest_tmp)
-            else:
+            elif not self.resumable:
                 raise ExistingTransferInProgress(
                     "Temporary transfer destination '{}' already exists!".format(
                         self.dest_tmp
@@ -78,8 +130,8 @@ class Transfer(object):
         # record whether the destination file already exists, so it can be checked, but don't error out
         self.dest_exists = os.path.isfile(dest)
 
-        # open the destination file for writing
-        self.dest_file_obj = open(self.dest_tmp, "wb")
+        # open the destination file for writing, after any data from a previous transfer
+        self.dest_file_obj = open(self.dest_tmp, "ab" if self.resumable else "wb")
 
     def __next__(self):  # proxy this method to fully support Python 3
         return self.next()
@@ -92,9 +144,20 @@ class Transfer(object):
             self.close()
             self.finalize()
             raise
-        self.dest_file_obj.write(chunk)
+        self._write_chunk(chunk)
         return chunk
 
+    def _write_chunk(self, chunk):
+        self.dest_file_obj.write(chunk)
+        self.hasher.update(chunk)
+
+    @property
+    def checksum(self):
+        """
+        The hex MD5 digest of the data transferred, so that it can be verified without reading it again.
+        """
+        return self.hasher.hexdigest()
+
     def _move_tmp_to_dest(self):
         shutil.move(self.dest_tmp, self.dest)
 
@@ -106,8 +169,18 @@ class Transfer(object):
         if not self.closed:
             self.close()
         if not self.completed:
+            if (
+                self.resumable
+                and exc_details[0] is not None
+                and self._has_partial_data()
+            ):
+                # Keep the data transferred before the error, so that the transfer can be resumed
+                return
             self.cancel()
 
+    def _has_partial_data(self):
+        return os.path.isfile(self.dest_tmp) and os.path.getsize(self.dest_tmp) > 0
+
     def _kill_gracefully(self, *args, **kwargs):
         self.cancel()
         raise TransferCanceled("The transfer was canceled.")
@@ -155,11 +228,42 @@ class FileDownload(Transfer):
         # If a file download was stopped by Internet connection error,
         # then open the temp file again.
         if self.started:
-            self.dest_file_obj = open(self.dest_tmp, "wb")
+            self.dest_file_obj = open(self.dest_tmp, "ab" if self.resumable else "wb")
+            self.closed = False
+
+        # Request only the data that has not already been downloaded,
+        # as interrupted downloads are continued with HTTP range requests
+        range_start = os.path.getsize(self.dest_tmp) if self.resumable else 0
 
         # initiate the download, check for status errors, and calculate download size
-        self.response = self.session.get(self.source, stream=True, timeout=self.timeout)
+        self.response = self._get(range_start)
+
+        if range_start and not self._is_range_response(range_start):
+            # The server does not support range requests, or the data we already
+            # have is not valid for this file, so start the download again.
+            logger.info(
+                "Could not resume download of {}, restarting it.".format(self.source)
+            )
+            self.dest_file_obj.close()
+            self.dest_file_obj = open(self.dest_tmp, "wb")
+            range_start = 0
+            if not self.response.ok:
+                self.response.close()
+                self.response = self._get(range_start)
+
         self.response.raise_for_status()
+
+        self.hasher = hashlib.md5()
+        if range_start:
+            logger.info(
+                "Resuming download of {} from byte {}".format(self.source, range_start)
+            )
+            # Include the data already downloaded in the checksum
+            with open(self.dest_tmp, "rb") as f:
+                for block in iter(lambda: f.read(self.block_size), b""):
+                    self.hasher.update(block)
+
+        # The size of the data still to be downloaded, as reported by the server
         try:
             self.total_size = int(self.response.headers["content-length"])
         except Exception:
@@ -169,6 +273,22 @@ class FileDownload(Transfer):
 
         self.started = True
 
+    def _get(self, range_start):
+        headers = {}
+        if range_start:
+            # Byte ranges refer to the encoded content, so ask for it unencoded,
+            # to be able to append it to the data already downloaded.
+            headers["Range"] = "bytes={}-".format(range_start)
+            headers["Accept-Encoding"] = "identity"
+        return self.session.get(
+            self.source, stream=True, timeout=self.timeout, headers=headers
+        )
+
+    def _is_range_response(self, range_start):
+        return self.response.status_code == 206 and self.response.headers.get(
+            "content-range", ""
+        ).startswith("bytes {}-".format(range_start))
+
     def __iter__(self):
         assert self.started, "File download must be started before it can be iterated."
         self._content_iterator = self.response.iter_content(self.block_size)
@@ -193,6 +313,7 @@ class FileCopy(Transfer):
         ), "File copy has already been started, and cannot be started again"
         self.total_size = os.path.getsize(self.source)
         self.source_file_obj = open(self.source, "rb")
+        self._copied_by_kernel = False
         self.started = True
 
     def _read_block_iterator(self):
@@ -202,10 +323,55 @@ class FileCopy(Transfer):
                 break
             yield block
 
+    def _copy_block_iterator(self):
+        src_fd = self.source_file_obj.fileno()
+        dest_fd = self.dest_file_obj.fileno()
+        offset = 0
+        copy_functions = list(KERNEL_COPY_FUNCTIONS)
+        while copy_functions:
+            try:
+                copied = copy_functions[0](src_fd, dest_fd, offset, self.block_size)
+            except OSError as e:
+                if offset or e.errno not in UNSUPPORTED_COPY_ERRNOS:
+                    raise
+                # This way of copying is not supported for these files, try the next one
+                copy_functions.pop(0)
+                continue
+            if not copied:
+                if offset >= self.total_size:
+                    return
+                # Some filesystems report copying nothing, rather than an error,
+                # when this way of copying is not supported for them, so try the next one
+                copy_functions.pop(0)
+                continue
+            self._copied_by_kernel = True
+            offset += copied
+            yield CopiedBlock(copied)
+        # The kernel cannot copy between these files, so copy the rest of the data through Python
+        self.source_file_obj.seek(offset)
+        self.dest_file_obj.seek(offset)
+        for block in self._read_block_iterator():
+            yield block
+
     def __iter__(self):
-        self._content_iterator = self._read_block_iterator()
+        self._content_iterator = self._copy_block_iterator()
         return self
 
+    def _write_chunk(self, chunk):
+        if not isinstance(chunk, CopiedBlock):
+            super(FileCopy, self)._write_chunk(chunk)
+
+    def finalize(self):
+        already_finalized = self.finalized
+        super(FileCopy, self).finalize()
+        if self._copied_by_kernel and not already_finalized:
+            # Some of the data never passed through Python while it was being copied,
+            # so hash the copy, which will still be in the page cache.
+            self.hasher = hashlib.md5()
+            with open(self.dest, "rb") as f:
+                for block in iter(lambda: f.read(self.block_size), b""):
+                    self.hasher.update(block)
+
     def close(self):
         self.source_file_obj.close()
         super(FileCopy, self).close()
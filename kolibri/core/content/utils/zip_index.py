@@ -0,0 +1,193 @@
+"""
+Random access to the files inside zipped content (HTML5 apps, H5P), without
+parsing the central directory of the zip file for every file requested from it.
+
+The parsed index of each zip file is kept in a process wide LRU cache, keyed by the
+path of the file, which includes the hash of its content, so it stays valid for as long
+as the file exists. Files inside the zip are then read with a single seek and read.
+"""
+import io
+import os
+import struct
+import zipfile
+import zlib
+
+from kolibri.utils.lru_cache import lru_cache
+
+# The maximum number of zip file indexes to keep in memory at once
+ZIP_INDEX_CACHE_SIZE = 32
+
+# Structure of the local file header that precedes the data of each file in the zip
+LOCAL_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+LOCAL_FILE_HEADER_SIGNATURE = b"PK\003\004"
+FILENAME_LENGTH_FIELD = 10
+EXTRA_FIELD_LENGTH_FIELD = 11
+
+READ_SIZE = 65536
+
+
+class ZipIndex(object):
+    """
+    The parsed index of a zip file, providing the parts of the zipfile.ZipFile
+    interface needed to read the files inside it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as zf:
+            self._infolist = zf.infolist()
+        self._infos = {info.filename: info for info in self._infolist}
+        # The offset of the data of each file, read from its local header on first access
+        self._data_offsets = {}
+
+    def namelist(self):
+        return [info.filename for info in self._infolist]
+
+    def infolist(self):
+        return list(self._infolist)
+
+    def getinfo(self, name):
+        return self._infos[name]
+
+    def open(self, name):
+        info = self._get_info(name)
+        if info.flag_bits & 0x1 or info.compress_type not in (
+            zipfile.ZIP_STORED,
+            zipfile.ZIP_DEFLATED,
+        ):
+            # Encrypted files or other compression types are rare, leave them to zipfile
+            return _ZipFileMember(self.path, info)
+        return self._open_data(info, 0, info.compress_size)
+
+    def is_stored(self, name):
+        """
+        Whether the file is stored in the zip file as is, so that any range
+        of its bytes can be read directly from the zip file.
+        """
+        info = self._get_info(name)
+        return not info.flag_bits & 0x1 and info.compress_type == zipfile.ZIP_STORED
+
+    def open_range(self, name, start, length):
+        """
+        Open length bytes of a stored file, from start, reading them directly from the zip file.
+        """
+        info = self._get_info(name)
+        assert self.is_stored(info), "Only stored files can be read by range"
+        return self._open_data(info, start, min(length, info.file_size - start))
+
+    def _get_info(self, name):
+        return name if isinstance(name, zipfile.ZipInfo) else self.getinfo(name)
+
+    def _open_data(self, info, start, size):
+        fileobj = open(self.path, "rb")
+        try:
+            fileobj.seek(self._get_data_offset(fileobj, info) + start)
+        except Exception:
+            fileobj.close()
+            raise
+        return ZipMemberReader(fileobj, info, size)
+
+    def read(self, name):
+        with self.open(name) as f:
+            return f.read()
+
+    def _get_data_offset(self, fileobj, info):
+        try:
+            return self._data_offsets[info.filename]
+        except KeyError:
+            pass
+        fileobj.seek(info.header_offset)
+        header = LOCAL_FILE_HEADER.unpack(fileobj.read(LOCAL_FILE_HEADER.size))
+        if header[0] != LOCAL_FILE_HEADER_SIGNATURE:
+            raise zipfile.BadZipfile("Bad magic number for file header")
+        offset = (
+            info.header_offset
+            + LOCAL_FILE_HEADER.size
+            + header[FILENAME_LENGTH_FIELD]
+            + header[EXTRA_FIELD_LENGTH_FIELD]
+        )
+        self._data_offsets[info.filename] = offset
+        return offset
+
+
+class ZipMemberReader(io.RawIOBase):
+    """
+    Reads size bytes of the data of a stored or deflated file inside a zip file,
+    from a file object positioned at the start of that data.
+    """
+
+    def __init__(self, fileobj, info, size):
+        self._fileobj = fileobj
+        self._remaining = size
+        self._decompressor = (
+            zlib.decompressobj(-15)
+            if info.compress_type == zipfile.ZIP_DEFLATED
+            else None
+        )
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+    def _read(self, size):
+        if self._decompressor is None:
+            data = self._fileobj.read(min(size, self._remaining))
+            self._remaining -= len(data)
+            return data
+        while len(self._buffer) < size and self._remaining:
+            data = self._fileobj.read(min(READ_SIZE, self._remaining))
+            if not data:
+                break
+            self._remaining -= len(data)
+            self._buffer += self._decompressor.decompress(data)
+        if not self._remaining:
+            self._buffer += self._decompressor.flush()
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._fileobj.close()
+        super(ZipMemberReader, self).close()
+
+
+class _ZipFileMember(object):
+    """
+    Falls back to zipfile to read a file inside a zip, closing the zip file with it.
+    """
+
+    def __init__(self, path, info):
+        self._zf = zipfile.ZipFile(path)
+        self._member = self._zf.open(info)
+
+    def read(self, *args):
+        return self._member.read(*args)
+
+    def close(self):
+        self._member.close()
+        self._zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_details):
+        self.close()
+
+
+@lru_cache(maxsize=ZIP_INDEX_CACHE_SIZE)
+def _get_zip_index(path, mtime, size):
+    return ZipIndex(path)
+
+
+def get_zip_index(path):
+    """
+    Get the, possibly cached, index of the zip file at path.
+    The modification time and size of the file are included in the cache key,
+    so that a file that has been replaced on disk is not read with a stale index.
+    """
+    stat = os.stat(path)
+    return _get_zip_index(path, stat.st_mtime, stat.st_size)
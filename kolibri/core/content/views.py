@@ -7,7 +7,6 @@ import io
 import json
 import mimetypes
 import os
-import zipfile
 from xml.etree.ElementTree import SubElement
 
 import html5lib
@@ -29,6 +28,7 @@ from .api import cache_forever
 from .decorators import add_security_headers
 from .models import ContentNode
 from .utils.paths import get_content_storage_file_path
+from .utils.zip_index import get_zip_index
 from kolibri import __version__ as kolibri_version
 from kolibri.core.content.errors import InvalidStorageFilenameError
 from kolibri.core.content.hooks import ContentNodeDisplayHook
@@ -81,8 +81,7 @@ def recursive_h5p_dependencies(zf, data, prefix=""):
     for dep in data.get("preloadedDependencies", []):
         packagepath = "{machineName}-{majorVersion}.{minorVersion}/".format(**dep)
         librarypath = packagepath + "library.json"
-        info = zf.getinfo(librarypath)
-        content = json.loads(zf.open(info).read())
+        content = json.loads(zf.read(librarypath))
         newjs, newcss = recursive_h5p_dependencies(zf, content, packagepath)
         cssfiles += newcss
         jsfiles += newjs
@@ -148,9 +147,9 @@ def get_h5p(zf, embedded_filepath):
     if not embedded_filepath:
         # Get the h5p bootloader, and then run it through our hashi templating code.
         # return the H5P bootloader code
-        h5pdata = json.loads(zf.open(zf.getinfo("h5p.json")).read())
+        h5pdata = json.loads(zf.read("h5p.json"))
         jsfiles, cssfiles = recursive_h5p_dependencies(zf, h5pdata)
-        contentdata = zf.open(zf.getinfo("content/content.json")).read()
+        contentdata = zf.read("content/content.json")
         path_includes_version = (
             "true"
             if "-" in [name for name in zf.namelist() if "/" in name][0]
@@ -190,6 +189,63 @@ def get_h5p(zf, embedded_filepath):
     return response
 
 
+def parse_byte_range(range_header, size):
+    """
+    Parse the Range header of a request for a file of the given size, returning
+    the start and (inclusive) end of the range requested, or None to serve the whole file,
+    as for an invalid range. Raises ValueError if the range cannot be satisfied.
+    """
+    units, _, ranges = range_header.partition("=")
+    # multiple ranges are rarely used, so serve the whole file for those
+    if units.strip() != "bytes" or "," in ranges:
+        return None
+    start, _, end = ranges.strip().partition("-")
+    try:
+        if start:
+            start = int(start)
+            if end:
+                # a range ending before it starts is invalid, rather than unsatisfiable
+                if int(end) < start:
+                    return None
+                end = min(int(end), size - 1)
+            else:
+                end = size - 1
+        else:
+            # a suffix range, of the last bytes of the file
+            start = max(size - int(end), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def get_stored_file_response(request, zf, info, content_type):
+    """
+    Serve a file stored without compression directly from the zip file,
+    supporting byte range requests so that media inside the zip can be seeked.
+    """
+    byte_range = None
+    if request.META.get("HTTP_RANGE"):
+        try:
+            byte_range = parse_byte_range(request.META["HTTP_RANGE"], info.file_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = "bytes */{}".format(info.file_size)
+            return response
+    start, end = byte_range or (0, info.file_size - 1)
+    response = FileResponse(
+        zf.open_range(info, start, end - start + 1), content_type=content_type
+    )
+    if byte_range:
+        response.status_code = 206
+        response["Content-Range"] = "bytes {}-{}/{}".format(start, end, info.file_size)
+    response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
 def get_embedded_file(request, zf, zipped_filename, embedded_filepath):
     # if no path, or a directory, is being referenced, look for an index.html file
     if not embedded_filepath or embedded_filepath.endswith("/"):
@@ -213,10 +269,12 @@ def get_embedded_file(request, zf, zipped_filename, embedded_filepath):
     if zipped_filename.endswith("zip") and (
         embedded_filepath.endswith("htm") or embedded_filepath.endswith("html")
     ):
-        content = zf.open(info).read()
+        content = zf.read(info)
         html = parse_html(content)
         response = HttpResponse(html, content_type=content_type)
         file_size = len(response.content)
+    elif zf.is_stored(info) and info.file_size:
+        return get_stored_file_response(request, zf, info, content_type)
     else:
         # generate a streaming response object, pulling data from within the zip  file
         response = FileResponse(zf.open(info), content_type=content_type)
@@ -251,20 +309,22 @@ class ZipContentView(View):
         if request.META.get("HTTP_IF_MODIFIED_SINCE"):
             return HttpResponseNotModified()
 
-        with zipfile.ZipFile(zipped_path) as zf:
-
-            # handle H5P files
-            if zipped_path.endswith("h5p") and (
-                not embedded_filepath or embedded_filepath.startswith("dist/")
-            ):
-                response = get_h5p(zf, embedded_filepath)
-            else:
-                response = get_embedded_file(
-                    request, zf, zipped_filename, embedded_filepath
-                )
+        # use the cached index of the zip file, rather than parsing it for every request
+        zf = get_zip_index(zipped_path)
+
+        # handle H5P files
+        if zipped_path.endswith("h5p") and (
+            not embedded_filepath or embedded_filepath.startswith("dist/")
+        ):
+            response = get_h5p(zf, embedded_filepath)
+        else:
+            response = get_embedded_file(
+                request, zf, zipped_filename, embedded_filepath
+            )
 
-        # ensure the browser knows not to try byte-range requests, as we don't support them here
-        response["Accept-Ranges"] = "none"
+        # ensure the browser knows not to try byte-range requests, unless they are supported for this file
+        if not response.has_header("Accept-Ranges"):
+            response["Accept-Ranges"] = "none"
 
         return response
 
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-17 09:02
+from __future__ import unicode_literals
+
+import jsonfield.fields
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("discovery", "0001_initial")]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriveChannelCatalogEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("drive_id", models.CharField(max_length=32)),
+                ("path", models.TextField()),
+                ("size", models.BigIntegerField()),
+                ("modified", models.FloatField()),
+                ("channel", jsonfield.fields.JSONField(null=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name="drivechannelcatalogentry", unique_together=set([("drive_id", "path")])
+        ),
+    ]
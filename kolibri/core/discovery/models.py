@@ -1,4 +1,5 @@
 from django.db import models
+from jsonfield import JSONField
 
 from .utils.network.client import NetworkClient
 from .utils.network.errors import NetworkClientError
@@ -38,3 +39,22 @@ class NetworkLocation(models.Model):
             return True
         except NetworkClientError:
             return False
+
+
+class DriveChannelCatalogEntry(models.Model):
+    """
+    ``DriveChannelCatalogEntry`` stores the metadata of the channel in a content database file on a drive,
+    along with the size and modification time of the file when it was read, so that the file only needs to
+    be read again when it has changed.
+    """
+
+    drive_id = models.CharField(max_length=32)
+    path = models.TextField()
+    size = models.BigIntegerField()
+    modified = models.FloatField()
+
+    # null when the file could not be read as a content database
+    channel = JSONField(null=True)
+
+    class Meta:
+        unique_together = ("drive_id", "path")
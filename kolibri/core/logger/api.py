@@ -1,7 +1,6 @@
 import logging
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.query import F
 from django.db.utils import IntegrityError
 from django.http import Http404
 from django_filters import ModelChoiceFilter
@@ -30,20 +29,25 @@ from .serializers import ExamLogSerializer
 from .serializers import MasteryLogSerializer
 from .serializers import TotalContentProgressSerializer
 from .serializers import UserSessionLogSerializer
+from .utils.user_session import flush_user_sessions
 from kolibri.core.auth.api import KolibriAuthPermissions
 from kolibri.core.auth.api import KolibriAuthPermissionsFilter
-from kolibri.core.auth.filters import HierarchyRelationsFilter
 from kolibri.core.auth.models import Classroom
 from kolibri.core.auth.models import Collection
 from kolibri.core.auth.models import Facility
 from kolibri.core.auth.models import FacilityUser
 from kolibri.core.auth.models import LearnerGroup
+from kolibri.core.auth.models import MembershipClosure
 from kolibri.core.content.api import OptionalPageNumberPagination
 from kolibri.core.exams.models import Exam
 
 logger = logging.getLogger(__name__)
 
 
+def _get_member_ids(collection):
+    return MembershipClosure.objects.filter(collection=collection).values("user_id")
+
+
 class BaseLogFilter(FilterSet):
     facility = ModelChoiceFilter(
         method="filter_facility", queryset=Facility.objects.all()
@@ -60,14 +64,10 @@ class BaseLogFilter(FilterSet):
         return queryset.filter(user__facility=value)
 
     def filter_classroom(self, queryset, name, value):
-        return HierarchyRelationsFilter(queryset).filter_by_hierarchy(
-            ancestor_collection=value, target_user=F("user")
-        )
+        return queryset.filter(user_id__in=_get_member_ids(value))
 
     def filter_learner_group(self, queryset, name, value):
-        return HierarchyRelationsFilter(queryset).filter_by_hierarchy(
-            ancestor_collection=value, target_user=F("user")
-        )
+        return queryset.filter(user_id__in=_get_member_ids(value))
 
 
 class LoggerViewSet(viewsets.ModelViewSet):
@@ -172,6 +172,12 @@ class UserSessionLogViewSet(LoggerViewSet):
     pagination_class = OptionalPageNumberPagination
     filter_class = UserSessionLogFilter
 
+    def list(self, request, *args, **kwargs):
+        # write out the interactions recorded by this process not yet written to logs, so that the logs are
+        # up to date; other processes write theirs at least every USER_SESSION_FLUSH_INTERVAL seconds
+        flush_user_sessions()
+        return super(UserSessionLogViewSet, self).list(request, *args, **kwargs)
+
 
 class MasteryFilter(FilterSet):
     class Meta:
@@ -250,9 +256,7 @@ class ExamLogFilter(BaseLogFilter):
     )
 
     def filter_collection(self, queryset, name, collection):
-        return HierarchyRelationsFilter(queryset).filter_by_hierarchy(
-            target_user=F("user"), ancestor_collection=collection
-        )
+        return queryset.filter(user_id__in=_get_member_ids(collection))
 
     class Meta:
         model = ExamLog
@@ -11,4 +11,4 @@ class KolibriLoggerConfig(AppConfig):
     verbose_name = "Kolibri Logger"
 
     def ready(self):
-        pass
+        from .signals import remove_progress_from_topic_rollups  # noqa: F401
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.23 on 2026-10-17 06:43
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations
+from django.db import models
+
+import kolibri.core.content.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("logger", "0006_remove_examattemptlog_channel_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TopicProgressRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("topic_id", kolibri.core.content.models.UUIDField()),
+                ("channel_id", kolibri.core.content.models.UUIDField(db_index=True)),
+                ("progress", models.FloatField(default=0)),
+                ("resource_count", models.IntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="topic_progress_rollups",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name="topicprogressrollup", unique_together=set([("user", "topic_id")])
+        ),
+    ]
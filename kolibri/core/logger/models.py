@@ -12,24 +12,17 @@ Eventually, it may also store user feedback on the content and the software.
 """
 from __future__ import unicode_literals
 
-from datetime import timedelta
-
-from django.core.exceptions import ObjectDoesNotExist
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.utils import timezone
 from jsonfield import JSONField
 from morango.models import SyncableModelQuerySet
 
-from .permissions import AnyoneCanWriteAnonymousLogs
-from kolibri.core.auth.constants import role_kinds
+from .permissions import LogPermissions
 from kolibri.core.auth.models import AbstractFacilityDataModel
 from kolibri.core.auth.models import Facility
 from kolibri.core.auth.models import FacilityUser
-from kolibri.core.auth.permissions.base import RoleBasedPermissions
-from kolibri.core.auth.permissions.general import IsOwn
 from kolibri.core.content.models import UUIDField
 from kolibri.core.exams.models import Exam
 from kolibri.core.fields import DateTimeTzField
@@ -55,17 +48,7 @@ class BaseLogQuerySet(SyncableModelQuerySet):
 
 def log_permissions(user_field):
 
-    return (
-        AnyoneCanWriteAnonymousLogs(field_name=user_field + "_id")
-        | IsOwn(field_name=user_field + "_id")
-        | RoleBasedPermissions(
-            target_field=user_field,
-            can_be_created_by=(role_kinds.ADMIN,),
-            can_be_read_by=(role_kinds.ADMIN, role_kinds.COACH),
-            can_be_updated_by=(role_kinds.ADMIN,),
-            can_be_deleted_by=(role_kinds.ADMIN,),
-        )
-    )
+    return LogPermissions(user_field=user_field)
 
 
 class BaseLogModel(AbstractFacilityDataModel):
@@ -154,12 +137,38 @@ class ContentSummaryLog(BaseLogModel):
     def calculate_source_id(self):
         return self.content_id
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(ContentSummaryLog, cls).from_db(db, field_names, values)
+        # Remember the saved progress, so that changes to it can be applied to topic progress rollups
+        instance._saved_progress = instance.__dict__.get("progress")
+        return instance
+
+    def _get_saved_progress(self):
+        saved_progress = getattr(self, "_saved_progress", None)
+        if saved_progress is None and self.id:
+            saved_progress = (
+                ContentSummaryLog.objects.filter(id=self.id)
+                .values_list("progress", flat=True)
+                .first()
+            )
+        return saved_progress or 0
+
     def save(self, *args, **kwargs):
+        from .utils.topic_progress import update_topic_progress_rollups
+
         if self.progress < 0 or self.progress > 1.01:
             raise ValidationError("Content summary progress out of range (0-1)")
 
+        saved_progress = self._get_saved_progress()
+
         super(ContentSummaryLog, self).save(*args, **kwargs)
 
+        update_topic_progress_rollups(
+            self.user_id, self.content_id, self.progress - saved_progress
+        )
+        self._saved_progress = self.progress
+
 
 class UserSessionLog(BaseLogModel):
     """
@@ -179,21 +188,12 @@ class UserSessionLog(BaseLogModel):
     def update_log(cls, user):
         """
         Update the current UserSessionLog for a particular user.
+        Updates are coalesced in memory, and written in batches by ``flush_user_sessions``.
         """
-        if user and isinstance(user, FacilityUser):
-            try:
-                user_session_log = cls.objects.filter(user=user).latest(
-                    "last_interaction_timestamp"
-                )
-            except ObjectDoesNotExist:
-                user_session_log = None
+        from .utils.user_session import record_user_session
 
-            if not user_session_log or timezone.now() - user_session_log.last_interaction_timestamp > timedelta(
-                minutes=5
-            ):
-                user_session_log = cls(user=user)
-            user_session_log.last_interaction_timestamp = local_now()
-            user_session_log.save()
+        if user and isinstance(user, FacilityUser):
+            record_user_session(user.id)
 
 
 class MasteryLog(BaseLogModel):
@@ -325,3 +325,24 @@ class ExamAttemptLog(BaseAttemptLog):
 
     def calculate_partition(self):
         return self.dataset_id
+
+
+class TopicProgressRollup(models.Model):
+    """
+    This model stores the summed progress of a user on the resources inside a topic,
+    so that topic progress can be looked up, rather than calculated from the summary
+    logs for all of the topic's descendants on every request. Rollups are created
+    when first requested, and kept up to date as the user's ContentSummaryLogs change.
+    They are derived data, so are not synced, and are deleted when the channel changes.
+    """
+
+    user = models.ForeignKey(FacilityUser, related_name="topic_progress_rollups")
+    topic_id = UUIDField()
+    channel_id = UUIDField(db_index=True)
+    # sum of the progress of the available resources inside the topic
+    progress = models.FloatField(default=0)
+    # number of available resources inside the topic
+    resource_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "topic_id")
@@ -1,8 +1,17 @@
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
 from rest_framework import permissions
 
+from kolibri.core.auth.constants import role_kinds
 from kolibri.core.auth.permissions.base import BasePermissions
 from kolibri.core.auth.permissions.base import lookup_field_with_fks
+from kolibri.core.auth.permissions.base import PermissionsFromAny
+from kolibri.core.auth.permissions.base import RoleBasedPermissions
+from kolibri.core.auth.permissions.general import IsOwn
+
+# The most ids of readable users that are listed in a query of logs; beyond this,
+# they are selected by a subquery instead, to stay within SQLite's limit on query parameters.
+MAX_LISTED_USER_IDS = 500
 
 
 class AnyoneCanWriteAnonymousLogs(BasePermissions):
@@ -32,6 +41,69 @@ class AnyoneCanWriteAnonymousLogs(BasePermissions):
         return queryset.none()
 
 
+class LogPermissions(PermissionsFromAny):
+    """
+    Permissions class for logs, which can be written anonymously, and are readable by the user they belong to,
+    and by admins and coaches of that user.
+
+    Logs are by far the largest tables, so rather than joining them to the collection hierarchy to find the readable
+    ones, the ids of the users whose logs are readable are found first, and the logs filtered by those.
+    """
+
+    # the filter cannot match a log more than once, so the logs need not be made distinct
+    readable_filter_needs_distinct = False
+
+    def __init__(self, user_field="user"):
+        self.user_field = user_field
+        self.can_be_read_by = (role_kinds.ADMIN, role_kinds.COACH)
+        super(LogPermissions, self).__init__(
+            AnyoneCanWriteAnonymousLogs(field_name=user_field + "_id"),
+            IsOwn(field_name=user_field + "_id"),
+            RoleBasedPermissions(
+                target_field=user_field,
+                can_be_created_by=(role_kinds.ADMIN,),
+                can_be_read_by=self.can_be_read_by,
+                can_be_updated_by=(role_kinds.ADMIN,),
+                can_be_deleted_by=(role_kinds.ADMIN,),
+            ),
+        )
+
+    def get_readable_user_ids(self, user):
+        """
+        Return the ids of the users whose logs are readable by user, as a list if there are
+        few enough of them to be put in a query, or otherwise as a queryset.
+        """
+        from kolibri.core.auth.models import MembershipClosure
+        from kolibri.core.auth.models import RoleClosure
+
+        user_ids = (
+            MembershipClosure.objects.filter(
+                collection_id__in=RoleClosure.objects.filter(
+                    user=user, kind__in=self.can_be_read_by
+                ).values("collection_id")
+            )
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        listed_user_ids = set(user_ids[: MAX_LISTED_USER_IDS + 1])
+        if len(listed_user_ids) > MAX_LISTED_USER_IDS:
+            return user_ids
+        listed_user_ids.add(user.id)
+        return sorted(listed_user_ids)
+
+    def readable_by_user_filter(self, user, queryset):
+        if user.is_anonymous():
+            return queryset.none()
+        user_ids = self.get_readable_user_ids(user)
+        if not isinstance(user_ids, list):
+            # too many users to list, so select their logs along with the user's own
+            return queryset.filter(
+                Q(**{self.user_field + "_id__in": user_ids})
+                | Q(**{self.user_field + "_id": user.id})
+            )
+        return queryset.filter(**{self.user_field + "_id__in": user_ids})
+
+
 def _ensure_raw_dict(d):
     if hasattr(d, "dict"):
         d = d.dict()
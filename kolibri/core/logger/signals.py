@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import ContentSummaryLog
+from .utils.topic_progress import update_topic_progress_rollups
+
+
+@receiver(post_delete, sender=ContentSummaryLog)
+def remove_progress_from_topic_rollups(sender, instance=None, *args, **kwargs):
+    """
+    Remove the progress of a deleted summary log from the rollups of the topics containing its resource.
+    """
+    update_topic_progress_rollups(
+        instance.user_id, instance.content_id, -instance.progress
+    )
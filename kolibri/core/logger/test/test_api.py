@@ -8,6 +8,8 @@ import uuid
 
 from django.core.management import call_command
 from django.core.urlresolvers import reverse
+from django.db import OperationalError
+from django.test import TestCase
 from django.utils import timezone
 from mock import patch
 from rest_framework import status
@@ -19,6 +21,8 @@ from ..models import UserSessionLog
 from ..serializers import ContentSessionLogSerializer
 from ..serializers import ContentSummaryLogSerializer
 from ..serializers import ExamLogSerializer
+from ..utils.user_session import flush_user_sessions
+from ..utils.user_session import start_user_session_flushing
 from .factory_logger import ContentSessionLogFactory
 from .factory_logger import ContentSummaryLogFactory
 from .factory_logger import FacilityUserFactory
@@ -843,3 +847,96 @@ class ExamAttemptLogAPITestCase(APITestCase):
 
     def tearDown(self):
         self.client.logout()
+
+
+class UserSessionLogUpdateTestCase(TestCase):
+    def setUp(self):
+        provision_device()
+        self.facility = FacilityFactory.create()
+        self.user = FacilityUserFactory.create(facility=self.facility)
+        self.now = timezone.now()
+        # write out any interactions recorded by other tests
+        flush_user_sessions()
+
+    def _update_log(self, minutes):
+        with patch(
+            "kolibri.core.logger.utils.user_session.local_now",
+            return_value=self.now + datetime.timedelta(minutes=minutes),
+        ):
+            UserSessionLog.update_log(self.user)
+
+    def test_updates_are_not_written_until_flushed(self):
+        with self.assertNumQueries(0):
+            self._update_log(0)
+            self._update_log(1)
+        self.assertFalse(UserSessionLog.objects.filter(user=self.user).exists())
+        flush_user_sessions()
+        log = UserSessionLog.objects.get(user=self.user)
+        self.assertEqual(log.start_timestamp, self.now)
+        self.assertEqual(
+            log.last_interaction_timestamp, self.now + datetime.timedelta(minutes=1)
+        )
+
+    def test_session_continued_across_flushes(self):
+        self._update_log(0)
+        flush_user_sessions()
+        self._update_log(4)
+        flush_user_sessions()
+        log = UserSessionLog.objects.get(user=self.user)
+        self.assertEqual(
+            log.last_interaction_timestamp, self.now + datetime.timedelta(minutes=4)
+        )
+
+    def test_new_session_after_five_minutes(self):
+        self._update_log(0)
+        self._update_log(2)
+        self._update_log(8)
+        flush_user_sessions()
+        self._update_log(20)
+        flush_user_sessions()
+        logs = UserSessionLog.objects.filter(user=self.user).order_by("start_timestamp")
+        self.assertEqual(
+            [(log.start_timestamp, log.last_interaction_timestamp) for log in logs],
+            [
+                (self.now, self.now + datetime.timedelta(minutes=2)),
+                (
+                    self.now + datetime.timedelta(minutes=8),
+                    self.now + datetime.timedelta(minutes=8),
+                ),
+                (
+                    self.now + datetime.timedelta(minutes=20),
+                    self.now + datetime.timedelta(minutes=20),
+                ),
+            ],
+        )
+
+    def test_deleted_users_are_skipped(self):
+        self._update_log(0)
+        self.user.delete()
+        flush_user_sessions()
+        self.assertFalse(UserSessionLog.objects.exists())
+
+    def test_failed_flush_is_retried(self):
+        self._update_log(0)
+        with patch(
+            "kolibri.core.logger.utils.user_session._write_sessions",
+            side_effect=OperationalError("database is locked"),
+        ):
+            with self.assertRaises(OperationalError):
+                flush_user_sessions()
+        self._update_log(1)
+        flush_user_sessions()
+        log = UserSessionLog.objects.get(user=self.user)
+        self.assertEqual(log.start_timestamp, self.now)
+        self.assertEqual(
+            log.last_interaction_timestamp, self.now + datetime.timedelta(minutes=1)
+        )
+
+    @patch("kolibri.core.logger.utils.user_session.atexit")
+    @patch("kolibri.core.logger.utils.user_session.threading.Thread")
+    @patch("kolibri.core.logger.utils.user_session._flushing_pid", {"pid": None})
+    def test_flushing_started_once_per_process(self, thread_mock, atexit_mock):
+        start_user_session_flushing()
+        start_user_session_flushing()
+        thread_mock.return_value.start.assert_called_once_with()
+        atexit_mock.register.assert_called_once_with(flush_user_sessions)
@@ -3,12 +3,15 @@ Permissions tests on the logging models.
 """
 import uuid
 
+from django.db import connection
 from django.test import TestCase
+from mock import patch
 
 from .factory_logger import ContentSessionLogFactory
 from .factory_logger import ContentSummaryLogFactory
 from .factory_logger import UserSessionLogFactory
 from kolibri.core.auth.test.helpers import create_dummy_facility_data
+from kolibri.core.logger.models import ContentSessionLog
 
 
 class ContentSessionLogPermissionsTestCase(TestCase):
@@ -138,3 +141,52 @@ class UserSessionLogPermissionsTestCase(TestCase):
         self.assertTrue(learner.can_read(self.data["session_log"]))
         self.assertTrue(learner.can_update(self.data["session_log"]))
         self.assertTrue(learner.can_delete(self.data["session_log"]))
+
+
+class LogReadableFilterTestCase(TestCase):
+    def setUp(self):
+        self.data = create_dummy_facility_data()
+        self.logs = {}
+        for user in self.data["all_users"]:
+            self.logs[user.id] = ContentSessionLogFactory.create(
+                user=user, content_id=uuid.uuid4().hex, channel_id=uuid.uuid4().hex
+            )
+
+    def _readable_user_ids(self, user):
+        return set(
+            user.filter_readable(ContentSessionLog.objects.all()).values_list(
+                "user_id", flat=True
+            )
+        )
+
+    def test_learner_reads_own_logs(self):
+        learner = self.data["learners_one_group"][0][0]
+        self.assertEqual(self._readable_user_ids(learner), {learner.id})
+
+    def test_classroom_coach_reads_own_and_classroom_logs(self):
+        coach = self.data["classroom_coaches"][0]
+        expected = {coach.id, self.data["learner_all_groups"].id} | set(
+            learner.id for learner in self.data["learners_one_group"][0]
+        )
+        self.assertEqual(self._readable_user_ids(coach), expected)
+
+    def test_facility_admin_reads_all_logs(self):
+        admin = self.data["facility_admin"]
+        self.assertEqual(self._readable_user_ids(admin), set(self.logs))
+
+    def test_many_readable_users_selected_by_subquery(self):
+        admin = self.data["facility_admin"]
+        with patch("kolibri.core.logger.permissions.MAX_LISTED_USER_IDS", 2):
+            self.assertEqual(self._readable_user_ids(admin), set(self.logs))
+
+    def test_filter_uses_user_index_without_joins(self):
+        coach = self.data["classroom_coaches"][0]
+        queryset = coach.filter_readable(ContentSessionLog.objects.all())
+        sql, params = queryset.query.sql_with_params()
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn("DISTINCT", sql)
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                plan = " ".join(str(row) for row in cursor.fetchall())
+            self.assertIn("logger_contentsessionlog_user_id", plan)
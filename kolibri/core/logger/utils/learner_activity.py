@@ -0,0 +1,81 @@
+"""
+Summaries of the logs of each learner, read from the database, so that summaries of
+their progress that are cached elsewhere can be refreshed for only the learners whose
+logs have changed since the summaries were computed.
+"""
+from collections import defaultdict
+
+from django.db.models import Case
+from django.db.models import Count
+from django.db.models import IntegerField
+from django.db.models import Max
+from django.db.models import Sum
+from django.db.models import When
+
+from kolibri.core.logger.models import AttemptLog
+from kolibri.core.logger.models import ContentSummaryLog
+from kolibri.core.logger.models import ExamAttemptLog
+from kolibri.core.logger.models import ExamLog
+from kolibri.core.notifications.models import LearnerProgressNotification
+
+# The logs and notifications that summaries of progress are calculated from, with aggregates
+# of each that change whenever one of them is added, removed or changed for a learner.
+LEARNER_ACTIVITY_AGGREGATES = (
+    (
+        ContentSummaryLog,
+        (
+            ("count", Count("id")),
+            ("end_timestamp", Max("end_timestamp")),
+            ("progress", Sum("progress")),
+        ),
+    ),
+    (AttemptLog, (("count", Count("id")), ("end_timestamp", Max("end_timestamp")))),
+    (
+        ExamLog,
+        (
+            ("count", Count("id")),
+            (
+                "closed",
+                Sum(
+                    Case(
+                        When(closed=True, then=1),
+                        default=0,
+                        output_field=IntegerField(),
+                    )
+                ),
+            ),
+            ("completion_timestamp", Max("completion_timestamp")),
+        ),
+    ),
+    (
+        ExamAttemptLog,
+        (
+            ("count", Count("id")),
+            ("end_timestamp", Max("end_timestamp")),
+            ("correct", Sum("correct")),
+        ),
+    ),
+    (
+        LearnerProgressNotification,
+        (("count", Count("id")), ("timestamp", Max("timestamp"))),
+    ),
+)
+
+
+def get_learner_activity(user_ids):
+    """
+    Return a dict of a summary of the logs of each of the users that have any, with one
+    query for each kind of log. The summaries can be compared for equality with those read
+    earlier, to tell which users' logs have changed, from any process or by syncing.
+    """
+    activity = defaultdict(dict)
+    for model, aggregates in LEARNER_ACTIVITY_AGGREGATES:
+        for values in (
+            model.objects.filter(user_id__in=user_ids)
+            .order_by()
+            .values("user_id")
+            .annotate(**dict(aggregates))
+            .values_list("user_id", *(name for name, _ in aggregates))
+        ):
+            activity[values[0]][model.__name__] = values[1:]
+    return dict(activity)
@@ -0,0 +1,176 @@
+"""
+Maintenance of TopicProgressRollups, the per user, per topic, sums of progress
+on the resources inside each topic.
+"""
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import Counter
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Q
+from le_utils.constants import content_kinds
+
+from kolibri.core.content.models import ContentNode
+from kolibri.core.logger.models import ContentSummaryLog
+from kolibri.core.logger.models import TopicProgressRollup
+
+# Limit the number of topic ids in a single query, to stay within SQLite's variable limit
+TOPIC_CHUNKSIZE = 500
+
+
+def _resource_nodes():
+    return ContentNode.objects.filter(available=True).exclude(kind=content_kinds.TOPIC)
+
+
+def _calculate_rollups(user, topics):
+    """
+    Calculate the rollups for topics from the user's summary logs,
+    with one query for the resources inside the topics of each tree.
+    """
+    progress = dict(
+        ContentSummaryLog.objects.filter(user=user).values_list(
+            "content_id", "progress"
+        )
+    )
+    topics_by_tree = defaultdict(list)
+    for topic in topics:
+        topics_by_tree[topic.tree_id].append(topic)
+    rollups = []
+    for tree_id, tree_topics in topics_by_tree.items():
+        resources = list(
+            _resource_nodes()
+            .filter(
+                tree_id=tree_id,
+                lft__gt=min(topic.lft for topic in tree_topics),
+                rght__lt=max(topic.rght for topic in tree_topics),
+            )
+            .order_by("lft")
+            .values_list("lft", "content_id")
+        )
+        lfts = [lft for lft, _ in resources]
+        for topic in tree_topics:
+            content_ids = [
+                content_id
+                for _, content_id in resources[
+                    bisect_right(lfts, topic.lft) : bisect_left(lfts, topic.rght)
+                ]
+            ]
+            rollups.append(
+                TopicProgressRollup(
+                    user=user,
+                    topic_id=topic.id,
+                    channel_id=topic.channel_id,
+                    progress=sum(
+                        progress.get(content_id, 0) for content_id in content_ids
+                    ),
+                    resource_count=len(content_ids),
+                )
+            )
+    return rollups
+
+
+def _correct_rollups(user, topics, rollups):
+    """
+    Recalculate rollups that have just been stored, correcting any that a log saved since they
+    were calculated has changed, as the log found no rollups to add its progress to then.
+    """
+    for rollup, recalculated in zip(rollups, _calculate_rollups(user, topics)):
+        if recalculated.progress != rollup.progress:
+            rollup.progress = recalculated.progress
+            TopicProgressRollup.objects.filter(
+                user=user, topic_id=rollup.topic_id
+            ).update(progress=rollup.progress)
+
+
+def get_topic_progress_fractions(user, topics):
+    """
+    Get the progress of the user on each topic, as a dict from topic id to the
+    fraction of the resources inside the topic that have been completed.
+    Rollups that do not exist yet are calculated and stored.
+    """
+    topics = list(topics)
+    rollups = {}
+    for i in range(0, len(topics), TOPIC_CHUNKSIZE):
+        rollups.update(
+            {
+                rollup.topic_id: rollup
+                for rollup in TopicProgressRollup.objects.filter(
+                    user=user,
+                    topic_id__in=[
+                        topic.id for topic in topics[i : i + TOPIC_CHUNKSIZE]
+                    ],
+                )
+            }
+        )
+    missing_topics = [topic for topic in topics if topic.id not in rollups]
+    missing = _calculate_rollups(user, missing_topics)
+    if missing:
+        try:
+            with transaction.atomic():
+                TopicProgressRollup.objects.bulk_create(
+                    missing, batch_size=TOPIC_CHUNKSIZE
+                )
+                _correct_rollups(user, missing_topics, missing)
+        except IntegrityError:
+            # The rollups were stored by a concurrent request
+            pass
+        rollups.update({rollup.topic_id: rollup for rollup in missing})
+    return {
+        topic_id: round(rollup.progress / rollup.resource_count, 4)
+        if rollup.resource_count
+        else 0.0
+        for topic_id, rollup in rollups.items()
+    }
+
+
+def update_topic_progress_rollups(user_id, content_id, delta):
+    """
+    Add a change in the user's progress on a resource to the rollups of all of the topics containing it.
+    """
+    if not delta or not TopicProgressRollup.objects.filter(user_id=user_id).exists():
+        return
+    resources = list(
+        _resource_nodes()
+        .filter(content_id=content_id)
+        .values_list("tree_id", "lft", "rght")
+    )
+    if not resources:
+        return
+    ancestors = ContentNode.objects.filter(
+        reduce(
+            or_,
+            (
+                Q(tree_id=tree_id, lft__lt=lft, rght__gt=rght)
+                for tree_id, lft, rght in resources
+            ),
+        )
+    ).values_list("id", "tree_id", "lft", "rght")
+    # The same resource can appear more than once inside a topic, so count its appearances
+    appearances = Counter()
+    for topic_id, tree_id, lft, rght in ancestors:
+        appearances[topic_id] = sum(
+            1
+            for resource_tree_id, resource_lft, resource_rght in resources
+            if resource_tree_id == tree_id
+            and lft < resource_lft
+            and resource_rght < rght
+        )
+    topic_ids_by_appearances = defaultdict(list)
+    for topic_id, count in appearances.items():
+        topic_ids_by_appearances[count].append(topic_id)
+    for count, topic_ids in topic_ids_by_appearances.items():
+        TopicProgressRollup.objects.filter(
+            user_id=user_id, topic_id__in=topic_ids
+        ).update(progress=F("progress") + delta * count)
+
+
+def delete_topic_progress_rollups(channel_id):
+    """
+    Delete the rollups for the topics in a channel, for when the resources available in it have changed.
+    """
+    TopicProgressRollup.objects.filter(channel_id=channel_id).delete()
@@ -0,0 +1,141 @@
+"""
+Coalescing of updates to UserSessionLogs. Every open tab of every logged in user polls the
+session endpoint, so rather than writing to a UserSessionLog on every poll, the times of
+interactions are kept in memory, and written to the database in a batch once per interval.
+
+The interactions not yet written are kept in the memory of the process that recorded them,
+so when requests are served by several processes, each process only knows of, and writes,
+its own. Each process serving requests should call start_user_session_flushing, so that
+they are written even when no more requests arrive, and when the process exits.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.db import transaction
+
+from kolibri.core.auth.models import FacilityUser
+from kolibri.core.logger.models import UserSessionLog
+from kolibri.utils.time_utils import local_now
+
+logger = logging.getLogger(__name__)
+
+# How often, in seconds, recorded interactions are written to the database
+USER_SESSION_FLUSH_INTERVAL = 60
+
+# How long a user can go without any interaction, before a new session is started for them
+USER_SESSION_TIMEOUT = timedelta(minutes=5)
+
+# For each user, a list of [start, last interaction] timestamps of each of their sessions not yet written
+_pending_sessions = {}
+_pending_sessions_lock = threading.Lock()
+_last_flush = {"time": time.time()}
+# The id of the process the flushing thread was started in, as threads do not survive a fork
+_flushing_pid = {"pid": None}
+
+
+def record_user_session(user_id):
+    """
+    Record an interaction by a user, writing all recorded interactions to the database if it is time to.
+    """
+    now = local_now()
+    with _pending_sessions_lock:
+        sessions = _pending_sessions.setdefault(user_id, [])
+        if sessions and now - sessions[-1][1] <= USER_SESSION_TIMEOUT:
+            sessions[-1][1] = now
+        else:
+            sessions.append([now, now])
+        flush_due = time.time() - _last_flush["time"] >= USER_SESSION_FLUSH_INTERVAL
+    if flush_due:
+        flush_user_sessions()
+
+
+def has_pending_user_session(user_id):
+    """
+    Check whether the user has interactions not yet written, recorded by this process.
+    """
+    with _pending_sessions_lock:
+        return user_id in _pending_sessions
+
+
+def _write_sessions(user_id, sessions):
+    start, last_interaction = sessions[0]
+    try:
+        user_session_log = UserSessionLog.objects.filter(user_id=user_id).latest(
+            "last_interaction_timestamp"
+        )
+    except UserSessionLog.DoesNotExist:
+        user_session_log = None
+    if (
+        user_session_log
+        and start - user_session_log.last_interaction_timestamp <= USER_SESSION_TIMEOUT
+    ):
+        # continue the session that was last written
+        user_session_log.last_interaction_timestamp = last_interaction
+        user_session_log.save()
+        sessions = sessions[1:]
+    for start, last_interaction in sessions:
+        UserSessionLog.objects.create(
+            user_id=user_id,
+            start_timestamp=start,
+            last_interaction_timestamp=last_interaction,
+        )
+
+
+def flush_user_sessions():
+    """
+    Write all the recorded interactions to UserSessionLogs.
+    """
+    with _pending_sessions_lock:
+        pending_sessions = _pending_sessions.copy()
+        _pending_sessions.clear()
+        _last_flush["time"] = time.time()
+    if not pending_sessions:
+        return
+    try:
+        # users may have been deleted since their interactions were recorded
+        user_ids = FacilityUser.objects.filter(
+            id__in=list(pending_sessions)
+        ).values_list("id", flat=True)
+        with transaction.atomic():
+            for user_id in user_ids:
+                _write_sessions(user_id, pending_sessions[user_id])
+    except Exception:
+        # keep the interactions to write them next time, ahead of any recorded since
+        with _pending_sessions_lock:
+            for user_id, sessions in pending_sessions.items():
+                _pending_sessions[user_id] = sessions + _pending_sessions.get(
+                    user_id, []
+                )
+        raise
+
+
+def _flush_user_sessions_periodically():
+    while True:
+        time.sleep(USER_SESSION_FLUSH_INTERVAL)
+        try:
+            flush_user_sessions()
+        except Exception:
+            logger.exception("Failed to write user session logs")
+        finally:
+            # this runs on its own thread, so close the database connection it opened
+            connection.close()
+
+
+def start_user_session_flushing():
+    """
+    Write the interactions recorded by this process every USER_SESSION_FLUSH_INTERVAL seconds
+    in a background thread, and when the process exits, unless that has already been started.
+    """
+    with _pending_sessions_lock:
+        if _flushing_pid["pid"] == os.getpid():
+            return
+        _flushing_pid["pid"] = os.getpid()
+    thread = threading.Thread(target=_flush_user_sessions_periodically)
+    thread.daemon = True
+    thread.start()
+    atexit.register(flush_user_sessions)
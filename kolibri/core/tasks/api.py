@@ -17,7 +17,9 @@ from .queue import get_queue
 from kolibri.core.content.permissions import CanExportLogs
 from kolibri.core.content.permissions import CanManageContent
 from kolibri.core.content.utils.channels import get_mounted_drive_by_id
-from kolibri.core.content.utils.channels import get_mounted_drives_with_channel_info
+from kolibri.core.content.utils.channels import (
+    get_mounted_drives_with_cataloged_channel_info,
+)
 from kolibri.core.content.utils.paths import get_content_database_file_path
 from kolibri.utils import conf
 
@@ -331,7 +333,7 @@ class TasksViewSet(viewsets.ViewSet):
 
     @list_route(methods=["get"])
     def localdrive(self, request):
-        drives = get_mounted_drives_with_channel_info()
+        drives = get_mounted_drives_with_cataloged_channel_info()
 
         # make sure everything is a dict, before converting to JSON
         assert isinstance(drives, dict)
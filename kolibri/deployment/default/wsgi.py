@@ -29,3 +29,8 @@ while not application and tries_remaining:
         application = get_wsgi_application()  # try again one last time
 if not application:
     print("Could not start Kolibri")
+else:
+    from kolibri.core.logger.utils.user_session import start_user_session_flushing
+
+    # user session interactions are kept in the memory of each process serving requests
+    start_user_session_flushing()
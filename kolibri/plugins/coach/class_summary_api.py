@@ -1,24 +1,32 @@
+import hashlib
+import json
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
 from django.db.models import Count
 from django.db.models import Max
-from django.db.models import Sum
 from django.shortcuts import get_object_or_404
 from le_utils.constants import content_kinds
 from rest_framework import permissions
-from rest_framework import serializers
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from six import string_types
 
 from kolibri.core.auth import models as auth_models
 from kolibri.core.auth.constants import role_kinds
 from kolibri.core.auth.models import Collection
 from kolibri.core.content.models import ContentNode
 from kolibri.core.exams.models import Exam
+from kolibri.core.exams.models import ExamAssignment
 from kolibri.core.lessons.models import Lesson
+from kolibri.core.lessons.models import LessonAssignment
 from kolibri.core.logger import models as logger_models
+from kolibri.core.logger.utils.learner_activity import get_learner_activity
 from kolibri.core.notifications.models import LearnerProgressNotification
 from kolibri.core.notifications.models import NotificationEventType
 from kolibri.core.serializers import DateTimeTzField
-from kolibri.core.serializers import KolibriModelSerializer
 
 
 # Intended to match  NotificationEventType
@@ -28,21 +36,168 @@ HELP_NEEDED = "HelpNeeded"
 COMPLETED = "Completed"
 
 
-def content_status_serializer(lesson_data, learners_data, classroom):
+# The per classroom snapshot of the status of each learner on each content item and exam
+CLASS_SUMMARY_CACHE_KEY = "class_summary_statuses_{classroom_id}"
 
-    # First generate a unique set of content node ids from all the lessons
-    lesson_node_ids = set()
-    for lesson in lesson_data:
-        lesson_node_ids |= set(lesson.get("node_ids"))
-
-    # Now create a map of content_id to node_id so that we can map between lessons, and notifications
-    # which use the node id, and summary logs, which use content_id
-    content_map = {
-        n[0]: n[1]
-        for n in ContentNode.objects.filter(id__in=lesson_node_ids).values_list(
-            "content_id", "id"
+# How long, in seconds, the snapshot is kept for after it was last used
+CLASS_SUMMARY_CACHE_TIMEOUT = 3600
+
+# Serializes datetimes in the same format as the serializers used by other coach endpoints
+datetime_field = DateTimeTzField()
+
+
+def serialize_datetime(value):
+    return datetime_field.to_representation(value) if value else None
+
+
+def load_json(value):
+    # JSON fields are not decoded when read with values queries
+    return json.loads(value) if isinstance(value, string_types) else value
+
+
+def map_values(queryset, fields, **renamed_fields):
+    """
+    Read the given fields, and the renamed fields, given as output name => model field
+    name, from a queryset in a single query, returning a list of dicts.
+    """
+    model_fields = list(fields) + list(renamed_fields.values())
+    output_fields = list(fields) + list(renamed_fields.keys())
+    return [
+        dict(zip(output_fields, row)) for row in queryset.values_list(*model_fields)
+    ]
+
+
+def group_values(queryset, key_field, value_field):
+    """
+    Read pairs of values from a queryset in a single query, grouping the second value by the first.
+    """
+    grouped = defaultdict(list)
+    for key, value in queryset.values_list(key_field, value_field):
+        grouped[key].append(value)
+    return grouped
+
+
+def lesson_serializer(classroom_id):
+    """
+    Read the lessons of a classroom, and the collections they are assigned to, returning
+    them along with a map of the node ids of their resources to the resources' content_ids.
+    """
+    lesson_assignments = group_values(
+        LessonAssignment.objects.filter(lesson__collection=classroom_id),
+        "lesson_id",
+        "collection_id",
+    )
+    lesson_data = []
+    content_id_map = {}
+    for (lesson_id, title, active, resources, description) in Lesson.objects.filter(
+        collection=classroom_id
+    ).values_list("id", "title", "is_active", "resources", "description"):
+        resources = load_json(resources)
+        assignments = lesson_assignments[lesson_id]
+        lesson_data.append(
+            {
+                "id": lesson_id,
+                "title": title,
+                "active": active,
+                "node_ids": [resource["contentnode_id"] for resource in resources],
+                "assignments": assignments,
+                # filter classes out of lesson assignments
+                "groups": [g for g in assignments if g != classroom_id],
+                "description": description,
+            }
         )
+        for resource in resources:
+            content_id_map[resource["contentnode_id"]] = resource["content_id"]
+    return lesson_data, content_id_map
+
+
+def exam_serializer(classroom_id):
+    exam_assignments = group_values(
+        ExamAssignment.objects.filter(exam__collection=classroom_id),
+        "exam_id",
+        "collection_id",
+    )
+    exam_data = map_values(
+        Exam.objects.filter(collection=classroom_id),
+        (
+            "id",
+            "title",
+            "active",
+            "question_sources",
+            "data_model_version",
+            "question_count",
+            "learners_see_fixed_order",
+            "seed",
+        ),
+    )
+    for exam in exam_data:
+        exam["question_sources"] = load_json(exam["question_sources"])
+        exam["assignments"] = exam_assignments[exam["id"]]
+        # filter classes out of exam assignments
+        exam["groups"] = [g for g in exam["assignments"] if g != classroom_id]
+    return exam_data
+
+
+def group_serializer(classroom):
+    group_data = map_values(classroom.get_learner_groups(), ("id", "name"))
+    group_members = group_values(
+        auth_models.Membership.objects.filter(
+            collection_id__in=[group["id"] for group in group_data]
+        ),
+        "collection_id",
+        "user_id",
+    )
+    for group in group_data:
+        group["member_ids"] = group_members[group["id"]]
+    return group_data
+
+
+def replace_missing_lesson_nodes(lesson_data, content_id_map, node_content_ids):
+    """
+    Determine a new list of node_ids for each lesson, replacing any missing content items
+    with another node with the same content_id, if one exists, or removing them otherwise.
+    content_id_map maps the node ids in the lessons to their content_ids, and node_content_ids
+    maps the ids of the nodes that are available to their content_ids.
+    Returns a map of content_id to node_id for all the nodes in the lessons.
+    """
+    # Look up all the replacements for the missing nodes at once
+    missing_content_ids = {
+        content_id_map[node_id]
+        for lesson in lesson_data
+        for node_id in lesson["node_ids"]
+        if node_id not in node_content_ids
     }
+    replacement_node_ids = {}
+    if missing_content_ids:
+        for content_id, node_id in ContentNode.objects.filter(
+            content_id__in=missing_content_ids
+        ).values_list("content_id", "id"):
+            replacement_node_ids.setdefault(content_id, node_id)
+
+    content_map = {}
+    for lesson in lesson_data:
+        node_ids = []
+        for node_id in lesson["node_ids"]:
+            if node_id in node_content_ids:
+                content_id = node_content_ids[node_id]
+            else:
+                content_id = content_id_map[node_id]
+                node_id = replacement_node_ids.get(content_id)
+            if node_id is not None:
+                node_ids.append(node_id)
+                content_map[content_id] = node_id
+        # point to new list of node ids
+        lesson["node_ids"] = node_ids
+    return content_map
+
+
+def content_status_serializer(lesson_data, learners_data, classroom, content_map):
+    """
+    Summarize the status of each learner on each of the resources in the lessons,
+    with a fixed number of queries regardless of the number of learners and lessons.
+    content_map maps the content_id of each resource in the lessons to its node id.
+    """
+    lesson_ids = [lesson["id"] for lesson in lesson_data]
 
     # Get all the values we need from the summary logs to be able to summarize current status on the
     # relevant content items.
@@ -52,7 +207,7 @@ def content_status_serializer(lesson_data, learners_data, classroom):
             user__in=[learner["id"] for learner in learners_data],
         )
         .annotate(attempts=Count("masterylogs__attemptlogs"))
-        .values(
+        .values_list(
             "user_id",
             "content_id",
             "end_timestamp",
@@ -63,196 +218,254 @@ def content_status_serializer(lesson_data, learners_data, classroom):
         )
     )
 
-    # In order to make the lookup speedy, generate a unique key for each user/node that we find
-    # listed in the needs help notifications that are relevant. We can then just check
-    # existence of this key in the set in order to see whether this user has been flagged as needing
-    # help.
-    lookup_key = "{user_id}-{node_id}"
-    needs_help = {
-        lookup_key.format(user_id=n[0], node_id=n[1]): n[2]
-        for n in LearnerProgressNotification.objects.filter(
-            classroom_id=classroom.id,
-            notification_event=NotificationEventType.Help,
-            lesson_id__in=[lesson["id"] for lesson in lesson_data],
-        ).values_list("user_id", "contentnode_id", "timestamp")
-    }
-
-    # In case a previously flagged learner has since completed an exercise, check all the completed
-    # notifications also
-    completed = {
-        lookup_key.format(user_id=n[0], node_id=n[1]): n[2]
-        for n in LearnerProgressNotification.objects.filter(
-            classroom_id=classroom.id,
-            notification_event=NotificationEventType.Completed,
-            lesson_id__in=[lesson["id"] for lesson in lesson_data],
-        ).values_list("user_id", "contentnode_id", "timestamp")
+    # The latest needs help and completed notifications for each user and node. A learner
+    # that has been flagged as needing help still needs it, unless they have completed
+    # the content node since.
+    notifications = {
+        NotificationEventType.Help: {},
+        NotificationEventType.Completed: {},
     }
-
-    def get_status(log):
+    for (
+        event,
+        user_id,
+        node_id,
+        timestamp,
+    ) in LearnerProgressNotification.objects.filter(
+        classroom_id=classroom.id,
+        notification_event__in=notifications.keys(),
+        lesson_id__in=lesson_ids,
+    ).values_list(
+        "notification_event", "user_id", "contentnode_id", "timestamp"
+    ):
+        notifications[event][(user_id, node_id)] = timestamp
+    needs_help = notifications[NotificationEventType.Help]
+    completed = notifications[NotificationEventType.Completed]
+
+    def get_status(user_id, content_id, progress, kind, attempts):
         """
-        Read the dict from a content summary log values query and return the status
-        In the case that we have found a needs help notification for the user and content node
-        in question, return that they need help, otherwise return status based on their
-        current progress.
+        Return the status of a user on a content item. In the case that we have found a
+        needs help notification for the user and content node in question, return that
+        they need help, otherwise return status based on their current progress.
         """
-        content_id = log["content_id"]
-        if content_id in content_map:
-            # Don't try to lookup anything if we don't know the content_id
-            # node_id mapping - might happen if a channel has since been deleted
-            key = lookup_key.format(
-                user_id=log["user_id"], node_id=content_map[content_id]
-            )
-            if key in needs_help:
-                # Now check if we have not already registered completion of the content node
-                # or if we have and the timestamp is earlier than that on the needs_help event
-                if key not in completed or completed[key] < needs_help[key]:
-                    return HELP_NEEDED
-        if log["progress"] == 1:
+        # Don't try to lookup anything if we don't know the content_id
+        # node_id mapping - might happen if a channel has since been deleted
+        key = (user_id, content_map.get(content_id))
+        if key in needs_help:
+            # Now check if we have not already registered completion of the content node
+            # or if we have and the timestamp is earlier than that on the needs_help event
+            if key not in completed or completed[key] < needs_help[key]:
+                return HELP_NEEDED
+        if progress == 1:
             return COMPLETED
-        if log["kind"] == content_kinds.EXERCISE:
+        if kind == content_kinds.EXERCISE:
             # if there are no attempt logs for this exercise, status is NOT_STARTED
-            if log["attempts"] == 0:
+            if attempts == 0:
                 return NOT_STARTED
         return STARTED
 
-    def map_content_logs(log):
-        """
-        Parse the content logs to return objects in the expected format.
-        """
-        return {
-            "learner_id": log["user_id"],
-            "content_id": log["content_id"],
-            "status": get_status(log),
-            "last_activity": log["end_timestamp"],
-            "time_spent": log["time_spent"],
+    return [
+        {
+            "learner_id": user_id,
+            "content_id": content_id,
+            "status": get_status(user_id, content_id, progress, kind, attempts),
+            "last_activity": end_timestamp,
+            "time_spent": time_spent,
         }
+        for (
+            user_id,
+            content_id,
+            end_timestamp,
+            time_spent,
+            progress,
+            kind,
+            attempts,
+        ) in content_log_values
+    ]
+
+
+def exam_status_serializer(exam_ids, learner_ids=None):
+    """
+    Summarize the status of each learner on each of the exams, reading the number of
+    questions each learner answered correctly from all the attempt logs in one query.
+    If learner_ids is given, only summarize the status of those learners.
+    """
+    exam_logs = logger_models.ExamLog.objects.filter(exam_id__in=exam_ids)
+    if learner_ids is not None:
+        exam_logs = exam_logs.filter(user_id__in=learner_ids)
+
+    # Count each combination of item and correctness once, as any repeated attempts at
+    # an item are for the same question
+    correct_items = defaultdict(set)
+    for examlog_id, item, correct in logger_models.ExamAttemptLog.objects.filter(
+        examlog__in=exam_logs
+    ).values_list("examlog_id", "item", "correct"):
+        correct_items[examlog_id].add((item, correct))
+
+    return [
+        {
+            "exam_id": exam_id,
+            "learner_id": user_id,
+            "status": COMPLETED if closed else STARTED,
+            "last_activity": serialize_datetime(last_activity),
+            "num_correct": sum(correct for _, correct in correct_items[examlog_id])
+            if examlog_id in correct_items
+            else None,
+        }
+        for examlog_id, exam_id, user_id, closed, last_activity in exam_logs.annotate(
+            last_activity=Max("attemptlogs__end_timestamp")
+        ).values_list("id", "exam_id", "user_id", "closed", "last_activity")
+    ]
 
-    return map(map_content_logs, content_log_values)
-
-
-class ExamStatusSerializer(KolibriModelSerializer):
-    status = serializers.SerializerMethodField()
-    exam_id = serializers.PrimaryKeyRelatedField(source="exam", read_only=True)
-    learner_id = serializers.PrimaryKeyRelatedField(source="user", read_only=True)
-    last_activity = DateTimeTzField()
-    num_correct = serializers.SerializerMethodField()
 
-    def get_status(self, exam_log):
-        if exam_log.closed:
-            return COMPLETED
-        else:
-            return STARTED
-
-    def get_num_correct(self, exam_log):
-        return (
-            exam_log.attemptlogs.values_list("item")
-            .order_by("completion_timestamp")
-            .distinct()
-            .aggregate(Sum("correct"))
-            .get("correct__sum")
+def _update_statuses(
+    statuses, removed, new_statuses, learner_ids, key_field, timestamp
+):
+    """
+    Replace the statuses of the learners with learner_ids in statuses, a dict of
+    (learner_id, key) => (time of last change, status), with their new statuses,
+    only recording a change for statuses that are different. The keys of statuses
+    that no longer exist are recorded in removed, a dict of key => time of removal.
+    """
+    new_statuses = {
+        (status["learner_id"], status[key_field]): status for status in new_statuses
+    }
+    for key in list(statuses):
+        if key[0] in learner_ids and key not in new_statuses:
+            del statuses[key]
+            removed[key] = timestamp
+    for key, status in new_statuses.items():
+        if key not in statuses or statuses[key][1] != status:
+            statuses[key] = (timestamp, status)
+            removed.pop(key, None)
+
+
+def learner_status_serializer(
+    classroom, lesson_data, exam_data, learners_data, content_map, since=None
+):
+    """
+    Summarize the status of each learner on the content in the lessons and on the exams,
+    from a snapshot cached for each classroom. The snapshot is refreshed for only the
+    learners with logs that have changed since it was last refreshed, as told by a summary
+    of their logs read from the database, and is recomputed for everyone if the learners,
+    lessons or exams in the classroom have changed.
+    If since is given, only the statuses that have changed after that time are returned, along with
+    the keys of the statuses removed after it, unless the snapshot has been recomputed since then.
+    Returns a dict of the content and exam statuses, the removed content and exam status keys,
+    whether the statuses replace all those returned before, and the time they are current as of.
+    """
+    timestamp = time.time()
+    learner_ids = [learner["id"] for learner in learners_data]
+    exam_ids = [exam["id"] for exam in exam_data]
+    fingerprint = hashlib.md5(
+        repr(
+            (
+                sorted(learner_ids),
+                sorted(lesson["id"] for lesson in lesson_data),
+                sorted(content_map.items()),
+                sorted(exam_ids),
+            )
+        ).encode("utf-8")
+    ).hexdigest()
+    cache_key = CLASS_SUMMARY_CACHE_KEY.format(classroom_id=classroom.id)
+
+    # The logs are summarized before the statuses are computed from them, so that a change
+    # made in between is seen as a change the next time the snapshot is refreshed
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        snapshot = {
+            "created": timestamp,
+            "content": {},
+            "exams": {},
+            "removed_content": {},
+            "removed_exams": {},
+        }
+    if snapshot.get("fingerprint") != fingerprint:
+        snapshot["fingerprint"] = fingerprint
+        user_ids = set(learner_ids) | set(
+            logger_models.ExamLog.objects.filter(exam_id__in=exam_ids).values_list(
+                "user_id", flat=True
+            )
         )
+        activity = get_learner_activity(user_ids)
+        changed_learner_ids = None
+    else:
+        # Exam statuses are kept for learners that have since left the classroom
+        user_ids = set(learner_ids) | {key[0] for key in snapshot["exams"]}
+        activity = get_learner_activity(user_ids)
+        changed_learner_ids = {
+            user_id
+            for user_id in user_ids
+            if activity.get(user_id) != snapshot["activity"].get(user_id)
+        }
 
-    class Meta:
-        model = logger_models.ExamLog
-        fields = ("exam_id", "learner_id", "status", "last_activity", "num_correct")
-
-
-class GroupSerializer(KolibriModelSerializer):
-    member_ids = serializers.SerializerMethodField()
-
-    def get_member_ids(self, group):
-        return group.get_members().values_list("id", flat=True)
-
-    class Meta:
-        model = auth_models.LearnerGroup
-        fields = ("id", "name", "member_ids")
-
-
-class UserSerializer(KolibriModelSerializer):
-    name = serializers.CharField(source="full_name")
-
-    class Meta:
-        model = auth_models.FacilityUser
-        fields = ("id", "name", "username")
-
-
-class LessonAssignmentsField(serializers.RelatedField):
-    def to_representation(self, assignment):
-        return assignment.collection.id
-
-
-class LessonSerializer(KolibriModelSerializer):
-    active = serializers.BooleanField(source="is_active")
-    node_ids = serializers.SerializerMethodField()
-
-    # classrooms are in here, and filtered out later to create `groups`
-    assignments = LessonAssignmentsField(
-        many=True, read_only=True, source="lesson_assignments"
-    )
-
-    groups = serializers.ListField(default=[])
-
-    class Meta:
-        model = Lesson
-        fields = (
-            "id",
-            "title",
-            "active",
-            "node_ids",
-            "assignments",
-            "groups",
-            "description",
+    if changed_learner_ids is None or changed_learner_ids:
+        content_statuses = content_status_serializer(
+            lesson_data,
+            [
+                learner
+                for learner in learners_data
+                if changed_learner_ids is None or learner["id"] in changed_learner_ids
+            ],
+            classroom,
+            content_map,
         )
-
-    def get_node_ids(self, obj):
-        return [resource["contentnode_id"] for resource in obj.resources]
-
-
-class ExamQuestionSourcesField(serializers.Field):
-    def to_representation(self, values):
-        return values
-
-
-class ExamAssignmentsField(serializers.RelatedField):
-    def to_representation(self, assignment):
-        return assignment.collection.id
-
-
-class ExamSerializer(KolibriModelSerializer):
-
-    question_sources = ExamQuestionSourcesField(default=[])
-
-    # classes are in here, and filtered out later to create `groups`
-    assignments = ExamAssignmentsField(many=True, read_only=True)
-
-    groups = serializers.ListField(default=[])
-
-    class Meta:
-        model = Exam
-        fields = (
-            "id",
-            "title",
-            "active",
-            "question_sources",
-            "assignments",
-            "groups",
-            "data_model_version",
-            "question_count",
-            "learners_see_fixed_order",
-            "seed",
+        exam_statuses = exam_status_serializer(exam_ids, changed_learner_ids)
+        if changed_learner_ids is None:
+            # everyone's statuses are replaced, including those of learners who have left
+            changed_learner_ids = {status["learner_id"] for status in exam_statuses}
+            changed_learner_ids.update(learner_ids)
+            changed_learner_ids.update(key[0] for key in snapshot["content"])
+            changed_learner_ids.update(key[0] for key in snapshot["exams"])
+        _update_statuses(
+            snapshot["content"],
+            snapshot["removed_content"],
+            content_statuses,
+            changed_learner_ids,
+            "content_id",
+            timestamp,
+        )
+        _update_statuses(
+            snapshot["exams"],
+            snapshot["removed_exams"],
+            exam_statuses,
+            changed_learner_ids,
+            "exam_id",
+            timestamp,
         )
 
-
-class ContentSerializer(KolibriModelSerializer):
-    node_id = serializers.CharField(source="id")
-
-    class Meta:
-        model = ContentNode
-        fields = ("node_id", "content_id", "title", "kind", "channel_id")
-
-
-def data(Serializer, queryset):
-    return Serializer(queryset, many=True).data
+    snapshot["activity"] = activity
+    cache.set(cache_key, snapshot, CLASS_SUMMARY_CACHE_TIMEOUT)
+
+    # The changes since a time before the snapshot was created are not known
+    if since is not None and since < snapshot["created"]:
+        since = None
+
+    def changed_statuses(statuses):
+        return [
+            status
+            for changed, status in statuses.values()
+            if since is None or changed > since
+        ]
+
+    def removed_statuses(removed, key_field):
+        return [
+            {"learner_id": learner_id, key_field: key}
+            for (learner_id, key), removed_time in removed.items()
+            if since is not None and removed_time > since
+        ]
+
+    return {
+        "content_learner_status": changed_statuses(snapshot["content"]),
+        "exam_learner_status": changed_statuses(snapshot["exams"]),
+        "removed_content_learner_status": removed_statuses(
+            snapshot["removed_content"], "content_id"
+        ),
+        "removed_exam_learner_status": removed_statuses(
+            snapshot["removed_exams"], "exam_id"
+        ),
+        "replace_learner_status": since is None,
+        "timestamp": timestamp,
+    }
 
 
 class ClassSummaryPermissions(permissions.BasePermission):
@@ -277,23 +490,11 @@ class ClassSummaryViewSet(viewsets.ViewSet):
 
     def retrieve(self, request, pk):
         classroom = get_object_or_404(auth_models.Classroom, id=pk)
-        query_learners = classroom.get_members()
-        query_lesson = Lesson.objects.filter(collection=pk)
-        query_exams = Exam.objects.filter(collection=pk)
-        query_exam_logs = logger_models.ExamLog.objects.filter(
-            exam__in=query_exams
-        ).annotate(last_activity=Max("attemptlogs__end_timestamp"))
-
-        lesson_data = data(LessonSerializer, query_lesson)
-        exam_data = data(ExamSerializer, query_exams)
 
-        # filter classes out of exam assignments
-        for exam in exam_data:
-            exam["groups"] = [g for g in exam["assignments"] if g != pk]
-
-        # filter classes out of lesson assignments
-        for lesson in lesson_data:
-            lesson["groups"] = [g for g in lesson["assignments"] if g != pk]
+        # Read each kind of object with a single values query, rather than serializing
+        # each object, and querying for its related objects, one at a time.
+        lesson_data, content_id_map = lesson_serializer(pk)
+        exam_data = exam_serializer(pk)
 
         all_node_ids = set()
         for lesson in lesson_data:
@@ -304,47 +505,57 @@ class ClassSummaryViewSet(viewsets.ViewSet):
             ]
             all_node_ids |= set(exam_node_ids)
 
-        # map node ids => content_ids so we can replace missing nodes, if another matching content_id node exists
-        content_id_map = {
-            resource["contentnode_id"]: resource["content_id"]
-            for lesson in query_lesson
-            for resource in lesson.resources
-        }
-        query_content = ContentNode.objects.filter(id__in=all_node_ids)
         # final list of available nodes
-        list_of_ids = [node.id for node in query_content]
-        # determine a new list of node_ids for each lesson, removing/replacing missing content items
-        for lesson in lesson_data:
-            node_ids = []
-            for node_id in lesson["node_ids"]:
-                # if resource exists, add to node_ids
-                if node_id in list_of_ids:
-                    node_ids.append(node_id)
-                else:
-                    # if resource does not exist, check if another resource with same content_id exists
-                    nodes = ContentNode.objects.filter(
-                        content_id=content_id_map[node_id]
-                    )
-                    if nodes:
-                        node_ids.append(nodes[0].id)
-            # point to new list of node ids
-            lesson["node_ids"] = node_ids
-
-        learners_data = data(UserSerializer, query_learners)
+        content_data = map_values(
+            ContentNode.objects.filter(id__in=all_node_ids),
+            ("content_id", "title", "kind", "channel_id"),
+            node_id="id",
+        )
+        content_map = replace_missing_lesson_nodes(
+            lesson_data,
+            content_id_map,
+            {node["node_id"]: node["content_id"] for node in content_data},
+        )
+
+        learners_data = map_values(
+            classroom.get_members(), ("id", "username"), name="full_name"
+        )
+
+        try:
+            since = float(request.query_params["since"])
+        except KeyError:
+            since = None
+        except ValueError:
+            raise ValidationError("since must be a timestamp")
+
+        learner_status = learner_status_serializer(
+            classroom, lesson_data, exam_data, learners_data, content_map, since=since
+        )
 
         output = {
             "id": pk,
             "name": classroom.name,
-            "coaches": data(UserSerializer, classroom.get_coaches()),
+            "coaches": map_values(
+                classroom.get_coaches(), ("id", "username"), name="full_name"
+            ),
             "learners": learners_data,
-            "groups": data(GroupSerializer, classroom.get_learner_groups()),
+            "groups": group_serializer(classroom),
             "exams": exam_data,
-            "exam_learner_status": data(ExamStatusSerializer, query_exam_logs),
-            "content": data(ContentSerializer, query_content),
-            "content_learner_status": content_status_serializer(
-                lesson_data, learners_data, classroom
-            ),
+            "exam_learner_status": learner_status["exam_learner_status"],
+            "content": content_data,
+            "content_learner_status": learner_status["content_learner_status"],
             "lessons": lesson_data,
+            # When since is passed, the statuses to remove from those returned before, unless
+            # replace_learner_status is true, when the statuses returned replace all of them
+            "removed_content_learner_status": learner_status[
+                "removed_content_learner_status"
+            ],
+            "removed_exam_learner_status": learner_status[
+                "removed_exam_learner_status"
+            ],
+            "replace_learner_status": learner_status["replace_learner_status"],
+            # Pass as since to receive only the statuses that have changed after this response
+            "timestamp": learner_status["timestamp"],
         }
 
         return Response(output)
@@ -1,16 +1,102 @@
+from collections import defaultdict
+
 from django.db.models import Count
+from django.db.models import Manager
 from rest_framework import serializers
 
 from kolibri.core.auth.models import FacilityUser
+from kolibri.core.auth.models import MembershipClosure
 from kolibri.core.content.models import ContentNode
 from kolibri.core.exams.models import Exam
 from kolibri.core.lessons.models import Lesson
+from kolibri.core.lessons.models import LessonAssignment
 from kolibri.core.logger.models import ContentSummaryLog
 from kolibri.core.notifications.models import LearnerProgressNotification
 from kolibri.core.notifications.models import NotificationEventType
 from kolibri.core.notifications.models import NotificationObjectType
 from kolibri.core.notifications.utils import memoize
 
+# Limit the number of content ids in a single query, to stay within SQLite's variable limit
+CONTENT_ID_CHUNKSIZE = 500
+
+
+def get_lessons_progress(lessons):
+    """
+    Calculate, for each lesson, the number of learners assigned the lesson who have
+    completed each of its resources, and the total number of learners assigned it.
+    Lessons assigned to the same collections are counted together, with the completions
+    of their resources counted by the database, so the number of queries depends only on
+    the number of distinct sets of collections the lessons are assigned to, and their resources.
+    Returns a dict of lesson id => (progress, total_learners).
+    """
+    lesson_collections = defaultdict(set)
+    for lesson_id, collection_id in LessonAssignment.objects.filter(
+        lesson__in=lessons
+    ).values_list("lesson_id", "collection_id"):
+        lesson_collections[lesson_id].add(collection_id)
+
+    lessons_by_collections = defaultdict(list)
+    for lesson in lessons:
+        lessons_by_collections[frozenset(lesson_collections[lesson.id])].append(lesson)
+
+    lessons_progress = {}
+    for collection_ids, assigned_lessons in lessons_by_collections.items():
+        learners = MembershipClosure.objects.filter(
+            collection_id__in=collection_ids
+        ).values("user_id")
+        total_learners = learners.distinct().count() if collection_ids else 0
+
+        completed = {}
+        if total_learners:
+            content_ids = sorted(
+                {
+                    resource["content_id"]
+                    for lesson in assigned_lessons
+                    for resource in lesson.resources
+                }
+            )
+            for i in range(0, len(content_ids), CONTENT_ID_CHUNKSIZE):
+                completed.update(
+                    ContentSummaryLog.objects.filter(
+                        content_id__in=content_ids[i : i + CONTENT_ID_CHUNKSIZE],
+                        progress=1.0,
+                        user_id__in=learners,
+                    )
+                    .order_by()
+                    .values("content_id")
+                    .annotate(num_learners_completed=Count("user_id", distinct=True))
+                    .values_list("content_id", "num_learners_completed")
+                )
+
+        for lesson in assigned_lessons:
+            progress = [
+                {
+                    "contentnode_id": resource["contentnode_id"],
+                    "num_learners_completed": completed.get(resource["content_id"], 0),
+                }
+                for resource in lesson.resources
+            ]
+            lessons_progress[lesson.id] = (
+                progress if total_learners else [],
+                total_learners,
+            )
+    return lessons_progress
+
+
+class LessonReportListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Dealing with nested relationships, data can be a Manager,
+        # so, first get a queryset from the Manager if needed
+        lessons = list(data.all() if isinstance(data, Manager) else data)
+        lessons_progress = get_lessons_progress(lessons)
+
+        return [
+            self.child.to_representation(
+                lesson, lesson_progress=lessons_progress[lesson.id]
+            )
+            for lesson in lessons
+        ]
+
 
 class LessonReportSerializer(serializers.ModelSerializer):
     """
@@ -19,42 +105,17 @@ class LessonReportSerializer(serializers.ModelSerializer):
     been assigned the Lesson and have 'mastered' the Resource.
     """
 
-    progress = serializers.SerializerMethodField()
-    total_learners = serializers.SerializerMethodField()
-
     class Meta:
         model = Lesson
-        fields = ("id", "title", "progress", "total_learners")
-
-    def get_progress(self, instance):
-        learners = instance.get_all_learners()
-        if learners.count() == 0:
-            return []
-
-        return [self._resource_progress(r, learners) for r in instance.resources]
-
-    def get_total_learners(self, instance):
-        return instance.get_all_learners().count()
-
-    def _resource_progress(self, resource, learners):
-        response = {
-            "contentnode_id": resource["contentnode_id"],
-            "num_learners_completed": 0,
-        }
-        completed_content_logs = (
-            ContentSummaryLog.objects.filter(
-                content_id=resource["content_id"], user__in=learners, progress=1.0
-            )
-            .values("content_id")
-            .annotate(total=Count("pk"))
-        )
-
-        # If no logs for the Content Item,
-        if completed_content_logs.count() == 0:
-            return response
-        else:
-            response["num_learners_completed"] = completed_content_logs[0]["total"]
-            return response
+        fields = ("id", "title")
+        list_serializer_class = LessonReportListSerializer
+
+    def to_representation(self, instance, lesson_progress=None):
+        if lesson_progress is None:
+            lesson_progress = get_lessons_progress([instance])[instance.id]
+        value = super(LessonReportSerializer, self).to_representation(instance)
+        value["progress"], value["total_learners"] = lesson_progress
+        return value
 
 
 def get_lesson_title(lesson_id):
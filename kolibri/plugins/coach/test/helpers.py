@@ -1,4 +1,18 @@
+from le_utils.constants import content_kinds
+
 from kolibri.core.auth.models import FacilityUser
+from kolibri.core.content.models import ContentNode
+from kolibri.core.exams.models import Exam
+from kolibri.core.exams.models import ExamAssignment
+from kolibri.core.lessons.models import Lesson
+from kolibri.core.lessons.models import LessonAssignment
+from kolibri.core.logger.models import ContentSummaryLog
+from kolibri.core.logger.models import ExamAttemptLog
+from kolibri.core.logger.models import ExamLog
+from kolibri.core.notifications.models import LearnerProgressNotification
+from kolibri.core.notifications.models import NotificationEventType
+from kolibri.core.notifications.models import NotificationObjectType
+from kolibri.utils.time_utils import local_now
 
 
 def create_learner(username, password, facility, classroom=None, learner_group=None):
@@ -53,3 +67,109 @@ def create_facility_admin(username, password, facility):
     facility.add_admin(admin)
 
     return admin
+
+
+def create_class_summary_fixture(
+    facility,
+    classroom,
+    coach,
+    num_learners=60,
+    num_lessons=30,
+    num_exams=10,
+    resources_per_lesson=5,
+):
+    """
+    Populate a classroom with learners, lessons and quizzes, and the logs and notifications
+    of the learners' progress through them, for the class summary.
+    The defaults are sized like a class in a real school, for benchmarking.
+    Requires content to have been imported.
+    """
+    nodes = list(ContentNode.objects.exclude(kind=content_kinds.TOPIC))
+    exercises = [node for node in nodes if node.kind == content_kinds.EXERCISE]
+    now = local_now()
+
+    learners = [
+        create_learner(
+            username="summary_learner_{}".format(i),
+            password=None,
+            facility=facility,
+            classroom=classroom,
+        )
+        for i in range(num_learners)
+    ]
+
+    for i in range(num_lessons):
+        lesson_nodes = [
+            nodes[(i + j) % len(nodes)] for j in range(resources_per_lesson)
+        ]
+        lesson = Lesson.objects.create(
+            title="lesson {}".format(i),
+            is_active=True,
+            collection=classroom,
+            created_by=coach,
+            resources=[
+                {
+                    "contentnode_id": node.id,
+                    "content_id": node.content_id,
+                    "channel_id": node.channel_id,
+                }
+                for node in lesson_nodes
+            ],
+        )
+        LessonAssignment.objects.create(
+            lesson=lesson, collection=classroom, assigned_by=coach
+        )
+        for k, learner in enumerate(learners):
+            node = lesson_nodes[k % len(lesson_nodes)]
+            ContentSummaryLog.objects.get_or_create(
+                user=learner,
+                content_id=node.content_id,
+                defaults={
+                    "channel_id": node.channel_id,
+                    "kind": node.kind,
+                    "start_timestamp": now,
+                    "end_timestamp": now,
+                    "progress": (k % 3) / 2.0,
+                    "time_spent": k,
+                },
+            )
+            if k % 4 == 0:
+                LearnerProgressNotification.objects.create(
+                    notification_object=NotificationObjectType.Resource,
+                    notification_event=NotificationEventType.Help,
+                    user_id=learner.id,
+                    classroom_id=classroom.id,
+                    lesson_id=lesson.id,
+                    contentnode_id=node.id,
+                    timestamp=now,
+                )
+
+    for i in range(num_exams if exercises else 0):
+        exam = Exam.objects.create(
+            title="quiz {}".format(i),
+            active=True,
+            collection=classroom,
+            creator=coach,
+            question_count=len(exercises),
+            question_sources=[
+                {"exercise_id": node.id, "question_id": node.id, "title": node.title}
+                for node in exercises
+            ],
+        )
+        ExamAssignment.objects.create(
+            exam=exam, collection=classroom, assigned_by=coach
+        )
+        for k, learner in enumerate(learners):
+            examlog = ExamLog.objects.create(exam=exam, user=learner, closed=k % 2 == 0)
+            for node in exercises:
+                ExamAttemptLog.objects.create(
+                    examlog=examlog,
+                    user=learner,
+                    item=node.id,
+                    content_id=node.content_id,
+                    start_timestamp=now,
+                    end_timestamp=now,
+                    correct=k % 2,
+                )
+
+    return learners
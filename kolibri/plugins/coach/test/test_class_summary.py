@@ -4,16 +4,21 @@ from __future__ import unicode_literals
 
 import uuid
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from le_utils.constants import content_kinds
 from rest_framework.test import APITestCase
 
 from . import helpers
 from kolibri.core.auth.models import Classroom
 from kolibri.core.auth.models import Facility
+from kolibri.core.auth.models import LearnerGroup
 from kolibri.core.auth.test.helpers import provision_device
 from kolibri.core.content.models import ContentNode
 from kolibri.core.lessons import models
+from kolibri.core.logger.models import ContentSummaryLog
 
 DUMMY_PASSWORD = "password"
 
@@ -99,6 +104,75 @@ class ClassSummaryTestCase(APITestCase):
         self.assertIn(last_node.id, node_ids)
         self.assertNotIn(fake_data["contentnode_id"], node_ids)
 
+    def _count_detail_queries(self):
+        self.client.login(
+            username=self.facility_admin.username, password=DUMMY_PASSWORD
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse(self.detail_name, kwargs={"pk": self.classroom.id})
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_number_of_queries_does_not_grow_with_class_size(self):
+        helpers.create_class_summary_fixture(
+            self.facility,
+            self.classroom,
+            self.facility_admin,
+            num_learners=2,
+            num_lessons=1,
+            num_exams=1,
+        )
+        small_class_queries, _ = self._count_detail_queries()
+        for i in range(6):
+            learner = helpers.create_learner(
+                username="another_learner_{}".format(i),
+                password=DUMMY_PASSWORD,
+                facility=self.facility,
+                classroom=self.classroom,
+            )
+            LearnerGroup.objects.create(
+                name="group {}".format(i), parent=self.classroom
+            ).add_member(learner)
+        helpers.create_class_summary_fixture(
+            self.facility,
+            self.classroom,
+            self.facility_admin,
+            num_learners=0,
+            num_lessons=4,
+            num_exams=3,
+        )
+        large_class_queries, data = self._count_detail_queries()
+        self.assertEqual(len(data["lessons"]), 6)
+        self.assertEqual(len(data["exams"]), 4)
+        self.assertEqual(small_class_queries, large_class_queries)
+
+    def test_content_learner_status(self):
+        learners = helpers.create_class_summary_fixture(
+            self.facility,
+            self.classroom,
+            self.facility_admin,
+            num_learners=5,
+            num_lessons=1,
+            num_exams=1,
+        )
+        _, data = self._count_detail_queries()
+        statuses = {
+            status["learner_id"]: status["status"]
+            for status in data["content_learner_status"]
+        }
+        # Every fourth learner is flagged as needing help
+        self.assertEqual(statuses[learners[4].id], "HelpNeeded")
+        self.assertEqual(statuses[learners[2].id], "Completed")
+        exam_statuses = {
+            status["learner_id"]: status for status in data["exam_learner_status"]
+        }
+        self.assertEqual(exam_statuses[learners[0].id]["status"], "Completed")
+        self.assertEqual(exam_statuses[learners[0].id]["num_correct"], 0)
+        self.assertEqual(exam_statuses[learners[1].id]["status"], "Started")
+        self.assertEqual(exam_statuses[learners[1].id]["num_correct"], 1)
+
     def test_anon_user_cannot_access_detail(self):
         response = self.client.get(
             reverse(self.detail_name, kwargs={"pk": self.classroom.id})
@@ -153,3 +227,114 @@ class ClassSummaryTestCase(APITestCase):
         )
 
         self.assertEqual(response.status_code, 200)
+
+
+class ClassSummaryCacheTestCase(APITestCase):
+
+    fixtures = ["content_test.json"]
+
+    def setUp(self):
+        provision_device()
+        self.facility = Facility.objects.create(name="MyFac")
+        self.classroom = Classroom.objects.create(name="classrom", parent=self.facility)
+        self.facility_admin = helpers.create_facility_admin(
+            username="facility_admin", password=DUMMY_PASSWORD, facility=self.facility
+        )
+        self.learners = helpers.create_class_summary_fixture(
+            self.facility,
+            self.classroom,
+            self.facility_admin,
+            num_learners=3,
+            num_lessons=1,
+            num_exams=1,
+        )
+        self.client.login(
+            username=self.facility_admin.username, password=DUMMY_PASSWORD
+        )
+        self.url = reverse(
+            "kolibri:coach:classsummary-detail", kwargs={"pk": self.classroom.id}
+        )
+
+    def test_cached_summary_is_refreshed_with_fewer_queries(self):
+        with CaptureQueriesContext(connection) as first_context:
+            first_response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as second_context:
+            second_response = self.client.get(self.url)
+        self.assertLess(
+            len(second_context.captured_queries), len(first_context.captured_queries)
+        )
+        for field in ("content_learner_status", "exam_learner_status"):
+            self.assertEqual(
+                len(first_response.data[field]), len(second_response.data[field])
+            )
+
+    def test_since_returns_only_changed_statuses(self):
+        timestamp = self.client.get(self.url).data["timestamp"]
+        response = self.client.get(self.url, {"since": timestamp})
+        self.assertEqual(response.data["content_learner_status"], [])
+        self.assertEqual(response.data["exam_learner_status"], [])
+
+        log = ContentSummaryLog.objects.get(user=self.learners[1])
+        log.progress = 1
+        log.save()
+        response = self.client.get(self.url, {"since": response.data["timestamp"]})
+        self.assertEqual(len(response.data["content_learner_status"]), 1)
+        status = response.data["content_learner_status"][0]
+        self.assertEqual(status["learner_id"], self.learners[1].id)
+        self.assertEqual(status["status"], "Completed")
+        self.assertEqual(response.data["exam_learner_status"], [])
+
+        # All the statuses are returned without since
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data["content_learner_status"]), 3)
+        self.assertTrue(response.data["replace_learner_status"])
+
+    def test_since_returns_removed_statuses(self):
+        timestamp = self.client.get(self.url).data["timestamp"]
+        log = ContentSummaryLog.objects.get(user=self.learners[1])
+        log.delete()
+        response = self.client.get(self.url, {"since": timestamp})
+        self.assertFalse(response.data["replace_learner_status"])
+        self.assertEqual(response.data["content_learner_status"], [])
+        self.assertEqual(
+            response.data["removed_content_learner_status"],
+            [{"learner_id": self.learners[1].id, "content_id": log.content_id}],
+        )
+        self.assertEqual(response.data["removed_exam_learner_status"], [])
+
+    def test_since_returns_statuses_of_learner_who_left_as_removed(self):
+        timestamp = self.client.get(self.url).data["timestamp"]
+        self.classroom.remove_member(self.learners[2])
+        response = self.client.get(self.url, {"since": timestamp})
+        self.assertFalse(response.data["replace_learner_status"])
+        self.assertEqual(
+            [
+                status["learner_id"]
+                for status in response.data["removed_content_learner_status"]
+            ],
+            [self.learners[2].id],
+        )
+        self.assertEqual(len(response.data["content_learner_status"]), 0)
+
+    def test_since_before_summary_was_cached_replaces_statuses(self):
+        timestamp = self.client.get(self.url).data["timestamp"]
+        cache.clear()
+        response = self.client.get(self.url, {"since": timestamp})
+        self.assertTrue(response.data["replace_learner_status"])
+        self.assertEqual(len(response.data["content_learner_status"]), 3)
+        self.assertEqual(response.data["removed_content_learner_status"], [])
+
+    def test_changes_made_without_saving_models_are_seen(self):
+        # as when logs are written by another process, or by syncing
+        self.client.get(self.url)
+        ContentSummaryLog.objects.filter(user=self.learners[2]).update(progress=1)
+        response = self.client.get(self.url)
+        statuses = {
+            status["learner_id"]: status["status"]
+            for status in response.data["content_learner_status"]
+        }
+        self.assertEqual(statuses[self.learners[2].id], "Completed")
+
+    def test_invalid_since(self):
+        response = self.client.get(self.url, {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
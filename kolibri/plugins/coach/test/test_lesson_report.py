@@ -4,8 +4,11 @@ from __future__ import unicode_literals
 
 import datetime
 import json
+import uuid
 
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 
 from . import helpers
@@ -284,3 +287,138 @@ class LessonReportTestCase(APITestCase):
             )
         )
         self.assertEqual(get_response.data["total_learners"], 1)
+
+    def _create_lesson_with_progress(self, num_resources):
+        nodes = [
+            ContentNode.objects.create(
+                title="Node",
+                available=True,
+                id=uuid.uuid4().hex,
+                content_id=uuid.uuid4().hex,
+                channel_id=self.channel_id,
+            )
+            for _ in range(num_resources)
+        ]
+        lesson = Lesson.objects.create(
+            title="Another Lesson",
+            created_by=self.facility_and_classroom_coach,
+            collection=self.classroom,
+            resources=[
+                {
+                    "contentnode_id": node.id,
+                    "content_id": node.content_id,
+                    "channel_id": self.channel_id,
+                }
+                for node in nodes
+            ],
+        )
+        LessonAssignment.objects.create(
+            lesson=lesson,
+            assigned_by=self.facility_and_classroom_coach,
+            collection=self.classroom,
+        )
+        ContentSummaryLog.objects.create(
+            user=self.classroom_learner,
+            content_id=nodes[0].content_id,
+            channel_id=self.channel_id,
+            kind="video",
+            progress=1.0,
+            start_timestamp=datetime.datetime.now(),
+        )
+        # Not assigned the lesson, so not counted
+        ContentSummaryLog.objects.create(
+            user=self.learner,
+            content_id=nodes[0].content_id,
+            channel_id=self.channel_id,
+            kind="video",
+            progress=1.0,
+            start_timestamp=datetime.datetime.now(),
+        )
+        return lesson
+
+    def _list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(self.lessonreport_basename + "-list"))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data
+
+    def test_list_queries_do_not_grow_with_lessons_and_resources(self):
+        self.client.login(
+            username=self.facility_admin.username, password=DUMMY_PASSWORD
+        )
+        lesson = self._create_lesson_with_progress(2)
+        # Make a first request to fill any per session caches
+        self._list_queries()
+        few_queries, data = self._list_queries()
+        report = next(report for report in data if report["id"] == lesson.id)
+        self.assertEqual(report["total_learners"], 1)
+        self.assertEqual(
+            [p["num_learners_completed"] for p in report["progress"]], [1, 0]
+        )
+        for _ in range(3):
+            self._create_lesson_with_progress(4)
+        many_queries, data = self._list_queries()
+        self.assertEqual(len(data), 5)
+        self.assertEqual(few_queries, many_queries)
+
+    def test_list_with_more_resources_than_query_variables(self):
+        self.client.login(
+            username=self.facility_admin.username, password=DUMMY_PASSWORD
+        )
+        content_ids = [uuid.uuid4().hex for _ in range(1200)]
+        lesson = Lesson.objects.create(
+            title="Long Lesson",
+            created_by=self.facility_and_classroom_coach,
+            collection=self.classroom,
+            resources=[
+                {
+                    "contentnode_id": uuid.uuid4().hex,
+                    "content_id": content_id,
+                    "channel_id": self.channel_id,
+                }
+                for content_id in content_ids
+            ],
+        )
+        LessonAssignment.objects.create(
+            lesson=lesson,
+            assigned_by=self.facility_and_classroom_coach,
+            collection=self.classroom,
+        )
+        ContentSummaryLog.objects.create(
+            user=self.classroom_learner,
+            content_id=content_ids[-1],
+            channel_id=self.channel_id,
+            kind="video",
+            progress=1.0,
+            start_timestamp=datetime.datetime.now(),
+        )
+        _, data = self._list_queries()
+        report = next(report for report in data if report["id"] == lesson.id)
+        self.assertEqual(len(report["progress"]), 1200)
+        self.assertEqual(report["progress"][-1]["num_learners_completed"], 1)
+
+    def test_learner_in_several_assigned_collections_counted_once(self):
+        self.another_classroom.add_member(self.classroom_learner)
+        LessonAssignment.objects.create(
+            lesson=self.lesson,
+            assigned_by=self.facility_and_classroom_coach,
+            collection=self.another_classroom,
+        )
+        ContentSummaryLog.objects.create(
+            user=self.classroom_learner,
+            content_id=self.node_1.content_id,
+            channel_id=self.node_1.channel_id,
+            kind="video",
+            progress=1.0,
+            start_timestamp=datetime.datetime.now(),
+        )
+        self.client.login(
+            username=self.facility_admin.username, password=DUMMY_PASSWORD
+        )
+        get_response = self.client.get(
+            reverse(
+                self.lessonreport_basename + "-detail", kwargs={"pk": self.lesson.id}
+            )
+        )
+        self.assertEqual(get_response.data["total_learners"], 1)
+        self.assertEqual(get_response.data["progress"][0]["num_learners_completed"], 1)
@@ -1,12 +1,11 @@
 from django.db.models import Q
 from django.db.models import Sum
-from django.db.models.query import F
 from rest_framework.serializers import JSONField
 from rest_framework.serializers import ModelSerializer
 from rest_framework.serializers import SerializerMethodField
 
-from kolibri.core.auth.filters import HierarchyRelationsFilter
 from kolibri.core.auth.models import Classroom
+from kolibri.core.auth.models import MembershipClosure
 from kolibri.core.exams.models import Exam
 from kolibri.core.exams.models import ExamAssignment
 from kolibri.core.lessons.models import Lesson
@@ -92,10 +91,12 @@ class LearnerClassroomSerializer(ModelSerializer):
 
         # Return only active Lessons that are assigned to the requesting user's groups
         # TODO move this to a permission_class on Lesson
-        lesson_assignments = HierarchyRelationsFilter(
-            LessonAssignment.objects.all()
-        ).filter_by_hierarchy(
-            target_user=current_user, ancestor_collection=F("collection")
+        # The collections the user is a member of, that anything assigned to applies to them
+        collection_ids = MembershipClosure.objects.filter(user=current_user).values(
+            "collection_id"
+        )
+        lesson_assignments = LessonAssignment.objects.filter(
+            collection_id__in=collection_ids
         )
         filtered_lessons = Lesson.objects.filter(
             lesson_assignments__in=lesson_assignments,
@@ -103,10 +104,8 @@ class LearnerClassroomSerializer(ModelSerializer):
             collection=instance,
         ).distinct()
 
-        exam_assignments = HierarchyRelationsFilter(
-            ExamAssignment.objects.all()
-        ).filter_by_hierarchy(
-            target_user=current_user, ancestor_collection=F("collection")
+        exam_assignments = ExamAssignment.objects.filter(
+            collection_id__in=collection_ids
         )
 
         filtered_exams = (
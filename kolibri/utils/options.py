@@ -161,6 +161,11 @@ base_option_spec = {
             "envvars": ("KOLIBRI_URL_PATH_PREFIX",),
             "clean": lambda x: x.lstrip("/").rstrip("/") + "/",
         },
+        "CONTENT_DOWNLOAD_THREADS": {
+            "type": "integer",
+            "default": 4,
+            "envvars": ("KOLIBRI_CONTENT_DOWNLOAD_THREADS",),
+        },
     },
 }
 
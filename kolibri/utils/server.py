@@ -246,9 +246,13 @@ def run_server(port):
 
     # Mount the application
     from kolibri.deployment.default.wsgi import application
+    from kolibri.core.logger.utils.user_session import flush_user_sessions
 
     cherrypy.tree.graft(application, "/")
 
+    # Write the user session interactions held in memory before the server stops
+    cherrypy.engine.subscribe("stop", flush_user_sessions)
+
     cherrypy.config.update(
         {
             "environment": "production",